@@ -1,21 +1,17 @@
 # dspyfun/__init__.py
-from pathlib import Path
-from confz import BaseConfig, FileSource
+# The config lives in dspyfun.utils.config_tools and is re-exported here on first access, so that
+# importing the package stays free of confz and pydantic (the daemon client relies on this).
+_CONFIG_EXPORTS = ("DspyfunConfig", "config_path", "load_config", "current_config")
 
-from pydantic import BaseModel
-from dspyfun.utils.path_tools import config_dir
 
+def __getattr__(name: str):
+    if name in _CONFIG_EXPORTS:
+        from dspyfun.utils import config_tools
 
-class DspyfunConfig(BaseConfig):
-    cluster_name: str
-    zone: str
-    project_id: str
+        return getattr(config_tools, name)
+    # `dspyfun.config` used to be parsed at import time; it is now loaded on first access.
+    if name == "config":
+        from dspyfun.utils.config_tools import load_config
 
-    CONFIG_SOURCES = FileSource(file=config_dir() / "dspyfun_config.yaml")
-
-
-def load_config() -> DspyfunConfig:
-    return DspyfunConfig()
-
-
-config = load_config()
+        return load_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -117,7 +117,7 @@ class CoderAgent(FSMMixin):
 
 
 def main():
-    from dspygen.utils.dspy_tools import init_ol
+    from dspyfun.utils.dspy_tools import init_ol
 
     init_ol(max_tokens=3000)
     agent = CoderAgent("Make a request to an API and return the response.", output_file="api_request.py")
@@ -82,7 +82,7 @@ class GanttAgent(FSMMixin):
 
 # Example usage of GanttAgent and GanttChart
 def main():
-    from dspygen.utils.dspy_tools import init_dspy
+    from dspyfun.utils.dspy_tools import init_dspy
     init_dspy()
     # Initialize the Gantt chart data
     gantt_chart = GanttChart(
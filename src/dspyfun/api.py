@@ -1,14 +1,80 @@
 """dspyfun REST API."""
 
 import asyncio
+import json
 import logging
-from collections.abc import AsyncGenerator
+import multiprocessing
+import os
+import re
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 import coloredlogs
 import dspy
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
+import httpx
+from fastapi import Body, FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from pydantic import BaseModel, Field, NonNegativeInt
+
+from dspyfun import current_config
+from dspyfun.utils.async_tools import AdmissionGate, KeyedSemaphores, Overloaded, SingleFlight
+from dspyfun.utils.cache_tools import cached_call
+from dspyfun.utils.checkpoint_tools import checkpoint_store
+from dspyfun.utils.config_tools import watch_config
+from dspyfun.utils.dspy_tools import LMPool, SessionOllamaLocal, instrument, lm_registry
+from dspyfun.utils.fib_tools import allow_long_decimals, fib_sweep_ndjson, fibonacci_text
+from dspyfun.utils.metrics_tools import (
+    CONFIG_VERSION,
+    POOL_TASKS,
+    MetricsMiddleware,
+    monitor_event_loop,
+    observe_lm_call,
+    observe_lm_requests,
+    render_metrics,
+)
+
+# Processes per API worker that run CPU-bound /compute work.
+COMPUTE_WORKERS = int(os.environ.get("DSPYFUN_COMPUTE_WORKERS", "2"))
+# Requests per API worker that may wait for a compute process before new ones are rejected.
+COMPUTE_QUEUE_SIZE = int(os.environ.get("DSPYFUN_COMPUTE_QUEUE_SIZE", "8"))
+# Sorted n values of a /compute/batch request swept per trip to a compute process.
+COMPUTE_BATCH_CHUNK = int(os.environ.get("DSPYFUN_COMPUTE_BATCH_CHUNK", "256"))
+# Seconds a rejected client is asked to wait before retrying.
+COMPUTE_RETRY_AFTER = int(os.environ.get("DSPYFUN_COMPUTE_RETRY_AFTER", "1"))
+# LM backend behind /io, either "openai" or "ollama".
+IO_LM_BACKEND = os.environ.get("DSPYFUN_IO_LM_BACKEND", "openai")
+IO_LM_MODEL = os.environ.get(
+    "DSPYFUN_IO_LM_MODEL", "phi3:instruct" if IO_LM_BACKEND == "ollama" else "gpt-3.5-turbo-instruct")
+IO_LM_POOL_SIZE = int(os.environ.get("DSPYFUN_IO_LM_POOL_SIZE", "4"))
+# LM calls per API worker that may be in flight to one model at a time.
+IO_LM_CONCURRENCY = int(os.environ.get("DSPYFUN_IO_LM_CONCURRENCY", str(IO_LM_POOL_SIZE)))
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+# Ollama model whose tokens /io/stream relays.
+IO_STREAM_MODEL = os.environ.get("DSPYFUN_IO_STREAM_MODEL", "phi3:instruct")
+# Seconds between checks of the config file for edits.
+CONFIG_POLL_INTERVAL = float(os.environ.get("DSPYFUN_CONFIG_POLL_INTERVAL", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+def io_lm() -> dspy.LM:
+    """Build one LM client for the /io pool."""
+    if IO_LM_BACKEND == "ollama":
+        lm = SessionOllamaLocal(model=IO_LM_MODEL, base_url=OLLAMA_BASE_URL, max_tokens=800, timeout_s=30)
+    else:
+        lm = dspy.OpenAI(model=IO_LM_MODEL, max_tokens=800)
+    return observe_lm_requests(instrument(lm))
+
+
+def sample_pools(app: FastAPI) -> None:
+    """Copy the compute pool's admission counts and the config version into their gauges."""
+    gate = app.state.compute_gate
+    POOL_TASKS.labels(pool="compute", state="running").set(gate.running)
+    POOL_TASKS.labels(pool="compute", state="waiting").set(gate.waiting)
+    CONFIG_VERSION.set(current_config().version)
 
 
 @asynccontextmanager
@@ -20,44 +86,203 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logging.root.removeHandler(handler)
     # - Add coloredlogs' colored StreamHandler to the root logger.
     coloredlogs.install()
+    # - Lift the int -> str digit limit so large Fibonacci numbers can be serialized.
+    allow_long_decimals()
+    # - Start the process pool for CPU-bound work, behind a bounded admission queue. Spawned
+    #   processes start with the default digit limit, so they lift it too.
+    app.state.compute_pool = ProcessPoolExecutor(
+        max_workers=COMPUTE_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+        initializer=allow_long_decimals)
+    app.state.compute_gate = AdmissionGate(limit=COMPUTE_WORKERS, queue_size=COMPUTE_QUEUE_SIZE)
+    # - Build the LM clients for /io once and open their connections.
+    app.state.lm_pool = LMPool(io_lm, size=IO_LM_POOL_SIZE)
+    if os.environ.get("DSPYFUN_LM_WARMUP", "1") == "1":
+        await asyncio.to_thread(app.state.lm_pool.warmup)
+    # - Run the blocking LM calls off the event loop, capped per model and coalesced per prompt.
+    app.state.lm_executor = ThreadPoolExecutor(max_workers=IO_LM_POOL_SIZE, thread_name_prefix="lm")
+    app.state.lm_limits = KeyedSemaphores(IO_LM_CONCURRENCY)
+    app.state.io_flights = SingleFlight()
+    # - Open a keep-alive HTTP client for streaming from the Ollama backend.
+    app.state.ollama_client = httpx.AsyncClient(
+        base_url=OLLAMA_BASE_URL, timeout=httpx.Timeout(10, read=None))
+    # - Pick up config edits without a restart.
+    config_watcher = asyncio.create_task(watch_config(CONFIG_POLL_INTERVAL))
+    # - Sample event loop lag and pool queue depths for /metrics.
+    monitor = asyncio.create_task(monitor_event_loop(lambda: sample_pools(app)))
     yield
-    # Shutdown events.
+    # Shutdown events:
+    # - Stop sampling metrics and watching the config.
+    monitor.cancel()
+    config_watcher.cancel()
+    # - Stop the process pool, dropping work that has not started.
+    app.state.compute_pool.shutdown(wait=True, cancel_futures=True)
+    # - Finish running LM calls and close the HTTP sessions of the pooled and shared LM clients.
+    app.state.lm_executor.shutdown(wait=True, cancel_futures=True)
+    app.state.lm_pool.close()
+    lm_registry.close()
+    await app.state.ollama_client.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 
-def fibonacci(n: int, memo=None) -> int:
-    if n in memo:
-        return memo[n]
-    if n <= 1:
-        return n
-    memo[n] = fibonacci(n - 1, memo) + fibonacci(n - 2, memo)
-    return memo[n]
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded) -> JSONResponse:
+    """Shed load with a fast 503 instead of queueing past the admission limit."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, retry later."},
+        headers={"Retry-After": str(COMPUTE_RETRY_AFTER)},
+    )
 
 
 @app.get("/compute")
-async def compute(n: int = 42) -> int:
-    """Compute the result of a CPU-bound function."""
+async def compute(n: int = Query(42, ge=0)) -> Response:
+    """Compute the result of a CPU-bound function, returned as a JSON number."""
+    async with app.state.compute_gate.admit():
+        loop = asyncio.get_running_loop()
+        # The compute process also writes the number out in decimal, which for large n takes about
+        # as long as computing it and would otherwise block the event loop.
+        text = await loop.run_in_executor(app.state.compute_pool, fibonacci_text, n, checkpoint_store())
+    return Response(text, media_type="application/json")
+
 
-    result = await asyncio.to_thread(fibonacci, n, {})
-    return result
+class ReservedStreamingResponse(StreamingResponse):
+    """Stream a response and give back an admission reservation however the response ends.
+
+    The reservation is released even when the client disconnects or the response is cancelled
+    before its body starts.
+    """
+
+    def __init__(self, content, gate: AdmissionGate, **kwargs):
+        super().__init__(content, **kwargs)
+        self.gate = gate
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.gate.release()
+
+
+@app.post("/compute/batch")
+async def compute_batch(ns: list[NonNegativeInt] = Body(..., description="The n values to compute.")) -> StreamingResponse:
+    """Compute a batch of CPU-bound results in one sweep, streamed as NDJSON in ascending n."""
+    # Admit the batch before the response starts, so an overloaded server can still answer 503.
+    gate = app.state.compute_gate
+    gate.reserve()
+    ns = sorted(ns)
+
+    async def lines() -> AsyncGenerator[str, None]:
+        async with gate.slot():
+            loop = asyncio.get_running_loop()
+            # Sweep in the compute processes, a chunk at a time, so results stream as they are ready.
+            for start in range(0, len(ns), COMPUTE_BATCH_CHUNK):
+                chunk = ns[start:start + COMPUTE_BATCH_CHUNK]
+                yield await loop.run_in_executor(app.state.compute_pool, fib_sweep_ndjson, chunk)
+
+    try:
+        return ReservedStreamingResponse(lines(), gate, media_type="application/x-ndjson")
+    except BaseException:
+        gate.release()
+        raise
 
 
 class LastFibInt(BaseModel):
     last_fib_int: int = Field(..., description="The last Fibonacci number.")
 
 
+def ask_lm(n: int) -> LastFibInt:
+    """Ask a pooled LM client for the n-th Fibonacci number, through the response cache."""
+    from dspygen.modules.json_module import json_call
+    text = f"What is the {n}th Fibonacci number?"
+    with app.state.lm_pool.borrow():
+        return LastFibInt.model_validate(cached_call(
+            "json_call:LastFibInt", {"text": text}, lambda: json_call(LastFibInt, text=text).model_dump()))
+
+
+async def ask_lm_async(n: int) -> LastFibInt:
+    """Run ask_lm on the LM executor once the model has a free concurrency slot."""
+    limit = app.state.lm_limits(IO_LM_MODEL)
+    with POOL_TASKS.labels(pool="lm", state="waiting").track_inprogress():
+        await limit.acquire()
+    try:
+        with POOL_TASKS.labels(pool="lm", state="running").track_inprogress():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(app.state.lm_executor, ask_lm, n)
+    finally:
+        limit.release()
+
+
 @app.get("/io")
 async def io(n: int = 42) -> int:
     """Compute the result of an I/O-bound function."""
-    from dspygen.utils.dspy_tools import init_dspy
-    init_dspy()
-
-    from dspygen.modules.json_module import json_call
-    last = json_call(LastFibInt, text=f"What is the {n}th Fibonacci number?")
-    # print(f"Last Fibonacci number for {n=}: {fibonacci(n, {})}")
+    # Concurrent requests for the same n share one in-flight LM call.
+    last = await app.state.io_flights.do(n, lambda: ask_lm_async(n))
+    # print(f"Last Fibonacci number for {n=}: {fibonacci(n)}")
 
     # fib = dspy.Predict("n -> last_fib_int")(n=str(n)).last_fib_int
 
     return last.last_fib_int
+
+
+def sse(data: dict, event: str) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_lm_answer(n: int) -> AsyncIterator[str]:
+    """Relay the LM's tokens as they arrive, then send the parsed answer as the final event."""
+    prompt = f"What is the {n}th Fibonacci number? Answer with the number only."
+    payload = {"model": IO_STREAM_MODEL, "prompt": prompt, "stream": True}
+    start = time.perf_counter()
+    ttfb = None
+    tokens = []
+    try:
+        async with app.state.lm_limits(IO_STREAM_MODEL):
+            async with app.state.ollama_client.stream("POST", "/api/generate", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if not isinstance(chunk, dict):
+                        raise ValueError(f"Expected a JSON object per line, got {line[:100]!r}")
+                    if token := chunk.get("response"):
+                        if ttfb is None:
+                            ttfb = time.perf_counter() - start
+                            logger.info("/io/stream n=%d first token after %.1f ms", n, ttfb * 1000)
+                        tokens.append(token)
+                        yield sse({"token": token}, event="token")
+                    if chunk.get("done"):
+                        observe_lm_call(IO_STREAM_MODEL, time.perf_counter() - start, {
+                            "prompt_tokens": chunk.get("prompt_eval_count"),
+                            "completion_tokens": chunk.get("eval_count"),
+                        })
+                        break
+    except (httpx.HTTPError, ValueError) as exc:
+        # ValueError covers malformed or truncated lines from the backend.
+        yield sse({"detail": f"LM backend error: {exc}"}, event="error")
+        return
+
+    numbers = re.findall(r"\d+", "".join(tokens))
+    if not numbers:
+        yield sse({"detail": "No number found in the LM's answer."}, event="error")
+        return
+    last = LastFibInt(last_fib_int=int(numbers[-1]))
+    yield sse({**last.model_dump(), "ttfb_ms": None if ttfb is None else ttfb * 1000,
+               "total_ms": (time.perf_counter() - start) * 1000}, event="result")
+
+
+@app.get("/io/stream")
+async def io_stream(n: int = 42) -> StreamingResponse:
+    """Stream the result of an I/O-bound function as Server-Sent Events."""
+    return StreamingResponse(stream_lm_answer(n), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Expose the Prometheus metrics of every API worker."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1 @@
+"""dspyfun benchmarks."""
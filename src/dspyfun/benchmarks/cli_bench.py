@@ -0,0 +1,87 @@
+"""Compare cold CLI starts against commands run through the warm daemon."""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from dspyfun.utils.daemon_tools import daemon_status
+from dspyfun.utils.manifest_tools import load_manifest
+
+app = typer.Typer()
+
+COLD = [sys.executable, "-m", "dspyfun.cli"]
+WARM = [sys.executable, "-m", "dspyfun.utils.daemon_tools"]
+
+
+def invocations() -> list[list[str]]:
+    """Side-effect free invocations covering every subcommand: its help, and the help of its first
+    command, which imports the subcommand module."""
+    args = [["--help"]]
+    for name, entry in sorted(load_manifest().items()):
+        args.append([name, "--help"])
+        if entry["commands"]:
+            args.append([name, entry["commands"][0]["name"], "--help"])
+    return args
+
+
+def _time(command: list[str], env: dict[str, str], runs: int) -> tuple[float, int]:
+    """Return the median wall time of ``command`` in milliseconds and its exit code."""
+    samples, code = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        code = subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, code
+
+
+@contextmanager
+def warm_daemon(env: dict[str, str], timeout: float = 60) -> Iterator[None]:
+    """Serve a daemon on the socket named in ``env`` until the block exits."""
+    process = subprocess.Popen([*COLD, "daemon", "start", "--foreground"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + timeout
+        while daemon_status(Path(env["DSPYFUN_DAEMON_SOCKET"])) is None:
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("The daemon did not start")
+            time.sleep(0.1)
+        yield
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+@app.command()
+def main(runs: int = typer.Option(5, help="Runs per invocation and mode; the median is reported")) -> None:
+    """Report the latency of every subcommand's --help started cold and through the warm daemon."""
+    table = Table(title=f"CLI latency, median of {runs} runs")
+    table.add_column("invocation")
+    table.add_column("cold (ms)", justify="right")
+    table.add_column("warm (ms)", justify="right")
+    table.add_column("speedup", justify="right")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DSPYFUN_DAEMON_SOCKET": str(Path(tmp) / "daemon.sock")}
+        with warm_daemon(env):
+            for args in invocations():
+                cold, cold_code = _time([*COLD, *args], env, runs)
+                warm, warm_code = _time([*WARM, *args], env, runs)
+                if cold_code != warm_code:
+                    raise RuntimeError(f"dspyfun {' '.join(args)} exited with {cold_code} cold "
+                                       f"but {warm_code} warm")
+                table.add_row(" ".join(args), f"{cold:.0f}", f"{warm:.0f}", f"{cold / warm:.1f}x")
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,35 @@
+"""Benchmark the Fibonacci engine behind GET /compute."""
+
+import timeit
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from dspyfun.utils.fib_tools import fibonacci
+
+app = typer.Typer()
+
+
+@app.command()
+def main(max_exponent: int = typer.Option(7, help="Benchmark n = 10 ... 10**max_exponent"),
+         repeat: int = typer.Option(5, help="Number of timing runs per n")) -> None:
+    """Print the best-of-repeat latency of fibonacci(n) for increasing powers of ten."""
+    table = Table(title="fibonacci(n) latency (fast doubling)")
+    table.add_column("n", justify="right")
+    table.add_column("digits", justify="right")
+    table.add_column("best (ms)", justify="right")
+
+    for exponent in range(1, max_exponent + 1):
+        n = 10 ** exponent
+        timer = timeit.Timer(lambda n=n: fibonacci(n))
+        loops, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=loops)) / loops
+        digits = int(fibonacci(n).bit_length() * 0.30103) + 1
+        table.add_row(f"10^{exponent}", f"{digits:,}", f"{best * 1000:.3f}")
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,67 @@
+"""Benchmark per-request LM setup against the pooled LM clients behind GET /io."""
+
+import statistics
+import time
+from contextlib import nullcontext
+
+import dspy
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from dspyfun.mock_lm import serve_in_thread
+from dspyfun.utils.dspy_tools import LMPool, SessionOllamaLocal
+
+app = typer.Typer()
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float]:
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49] * 1000, cuts[98] * 1000
+
+
+@app.command()
+def main(requests: int = typer.Option(300, help="Number of /io calls per strategy"),
+         base_url: str = typer.Option("", help="Ollama base URL (default: start the mock LM server)"),
+         model: str = typer.Option("phi3:instruct", help="Model name to request")) -> None:
+    """Report p50/p99 latency of the /io LM call with per-request setup and with the LM pool."""
+    from dspygen.modules.json_module import json_call
+
+    from dspyfun.api import LastFibInt
+
+    def per_request() -> None:
+        # The old /io path: build a fresh client and reconfigure dspy globally on every call.
+        lm = dspy.OllamaLocal(model=model, base_url=url, max_tokens=800)
+        dspy.settings.configure(lm=lm)
+        json_call(LastFibInt, text="What is the 42th Fibonacci number?")
+
+    def pooled() -> None:
+        with pool.borrow():
+            json_call(LastFibInt, text="What is the 42th Fibonacci number?")
+
+    def run(call) -> list[float]:
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    table = Table(title=f"/io LM call latency over {requests} requests")
+    table.add_column("strategy")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p99 (ms)", justify="right")
+
+    with nullcontext(base_url) if base_url else serve_in_thread() as url:
+        pool = LMPool(lambda: SessionOllamaLocal(model=model, base_url=url, max_tokens=800), size=1)
+        pool.warmup()
+        for name, call in [("per-request init (before)", per_request), ("LM pool (after)", pooled)]:
+            p50, p99 = _percentiles(run(call))
+            table.add_row(name, f"{p50:.2f}", f"{p99:.2f}")
+        pool.close()
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    app()
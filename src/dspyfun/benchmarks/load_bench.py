@@ -0,0 +1,200 @@
+"""Load-test GET /compute and GET /io of a locally served API against the mock LM server."""
+
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+
+import httpx
+import typer
+from rich.console import Console
+from rich.table import Table
+
+app = typer.Typer()
+
+RESULTS_DIR = Path("bench-results")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server behind {url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Server behind {url} did not come up within {timeout}s")
+
+
+@contextmanager
+def _serve(command: list[str], url: str, env: dict[str, str]) -> Iterator[None]:
+    """Run a server in a subprocess until the block exits."""
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_until_up(url, process)
+        yield
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+@contextmanager
+def serve_stack(server: str, workers: int, lm_latency: float) -> Iterator[str]:
+    """Start the mock LM and the API wired to it, with fresh caches, and yield the API's base URL."""
+    with tempfile.TemporaryDirectory(prefix="dspyfun-load-") as scratch:
+        mock_port, api_port = _free_port(), _free_port()
+        env = {
+            **os.environ,
+            "DSPYFUN_MOCK_LM_LATENCY": str(lm_latency),
+            "DSPYFUN_IO_LM_BACKEND": "ollama",
+            "DSPYFUN_IO_LM_MODEL": "mock",
+            "OLLAMA_BASE_URL": f"http://127.0.0.1:{mock_port}",
+            "DSPYFUN_LM_CACHE_PATH": str(Path(scratch) / "lm_cache.sqlite3"),
+            "DSPYFUN_FIB_STORE_DIR": str(Path(scratch) / "fib"),
+            "PROMETHEUS_MULTIPROC_DIR": str(Path(scratch) / "metrics"),
+        }
+        mock = [sys.executable, "-m", "uvicorn", "--port", str(mock_port), "--log-level", "warning",
+                "dspyfun.mock_lm:app"]
+        if server == "gunicorn":
+            api = [sys.executable, "-m", "gunicorn", "--config", "python:dspyfun.gunicorn_conf",
+                   "--bind", f"127.0.0.1:{api_port}", "--worker-class", "uvicorn.workers.UvicornWorker",
+                   "--workers", str(workers), "dspyfun.api:app"]
+        else:
+            Path(env["PROMETHEUS_MULTIPROC_DIR"]).mkdir()
+            api = [sys.executable, "-m", "uvicorn", "--port", str(api_port), "--log-level", "warning",
+                   "dspyfun.api:app"]
+        with _serve(mock, f"http://127.0.0.1:{mock_port}/docs", env):
+            base_url = f"http://127.0.0.1:{api_port}"
+            with _serve(api, f"{base_url}/metrics", env):
+                yield base_url
+
+
+async def drive(base_url: str, paths: list[str], concurrency: int) -> dict[str, float]:
+    """Send every request with at most ``concurrency`` in flight and summarize the latencies."""
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                ok = response.is_success
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else [0.0] * 99
+    return {
+        "requests": len(paths),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _delta(now: float, before: float | None) -> str:
+    if not before:
+        return ""
+    return f" ({(now - before) / before:+.0%})"
+
+
+@app.command()
+def main(requests: int = typer.Option(500, help="Number of requests per endpoint"),
+         concurrency: int = typer.Option(16, help="Requests in flight at once"),
+         n: int = typer.Option(10_000, help="The n sent to /compute"),
+         warmup: int = typer.Option(50, help="Unmeasured requests per endpoint sent first"),
+         server: str = typer.Option("gunicorn", help="Serve the API with gunicorn or uvicorn"),
+         workers: int = typer.Option(2, help="Number of gunicorn workers"),
+         lm_latency: float = typer.Option(0.05, help="Seconds the mock LM takes per answer"),
+         output: Path = typer.Option(None, help="Results file (default: bench-results/load-<commit>.json)"),
+         compare: Path = typer.Option(None, help="Earlier results file to compare against")) -> None:
+    """Report throughput and p50/p95/p99 latency of /compute and /io and save them as JSON.
+
+    Every /io request asks for a different n, so each one reaches the mock LM instead of the
+    response cache. The warmup requests give the workers time to spawn their compute processes and
+    open their LM connections.
+    """
+    commit = _git_commit()
+    workload = {
+        "/compute": [f"/compute?n={n}"] * (warmup + requests),
+        "/io": [f"/io?n={i}" for i in range(warmup + requests)],
+    }
+    with serve_stack(server, workers, lm_latency) as base_url:
+        results = {}
+        for route, paths in workload.items():
+            asyncio.run(drive(base_url, paths[:warmup], concurrency))
+            results[route] = asyncio.run(drive(base_url, paths[warmup:], concurrency))
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(UTC).isoformat(),
+        "config": {"requests": requests, "concurrency": concurrency, "n": n, "warmup": warmup, "server": server,
+                   "workers": workers, "lm_latency": lm_latency},
+        "results": results,
+    }
+    output = output or RESULTS_DIR / f"load-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    baseline = json.loads(compare.read_text())["results"] if compare else {}
+    title = f"Load test at {commit} ({server}, {concurrency} concurrent)"
+    if compare:
+        title += f", compared to {compare}"
+    table = Table(title=title)
+    table.add_column("route")
+    for column in ("req/s", "p50 (ms)", "p95 (ms)", "p99 (ms)", "errors"):
+        table.add_column(column, justify="right")
+    for route, result in results.items():
+        before = baseline.get(route, {})
+        table.add_row(route, *(f"{result[key]:.1f}{_delta(result[key], before.get(key))}"
+                               for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")),
+                      str(result["errors"]))
+    console = Console()
+    console.print(table)
+    console.print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,13 +1,26 @@
 """dspyfun CLI."""
 
+import sys
+
 import typer
 
-from dspyfun.utils.cli_tools import load_commands
+from dspyfun.utils.cli_tools import LazyGroup
+
+app = typer.Typer(cls=LazyGroup)
+
+
+def close_lms() -> None:
+    """Close the shared LM clients, if the command used any."""
+    # Checked through sys.modules so that commands which never touched an LM don't import dspy here.
+    if (dspy_tools := sys.modules.get("dspyfun.utils.dspy_tools")) is not None:
+        dspy_tools.lm_registry.close()
+
+
+@app.callback()
+def main(ctx: typer.Context) -> None:
+    """dspyfun CLI."""
+    ctx.call_on_close(close_lms)
 
-app = typer.Typer()
 
 if __name__ == "__main__":
-    load_commands()
     app()
-else:
-    load_commands()
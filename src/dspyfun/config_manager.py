@@ -1,13 +1,13 @@
 # dspyfun/config_manager.py
 import yaml
 from pydantic import BaseModel
-from dspyfun import DspyfunConfig
-from dspyfun.utils.path_tools import config_dir
+from dspyfun import DspyfunConfig, config_path, load_config
+from dspyfun.utils.config_tools import atomic_write
 
 
 class ConfigManager:
     def __init__(self):
-        self.config = DspyfunConfig()
+        self.config = load_config()
 
     def update_config(self, **kwargs):
         # Convert the frozen pydantic model to a dictionary
@@ -25,9 +25,11 @@ class ConfigManager:
         self.save_config()
 
     def save_config(self):
-        config_path = config_dir() / "dspyfun_config.yaml"
-        with open(config_path, 'w') as file:
-            yaml.dump(self.config.model_dump(), file)
+        # Bump the version and replace the file in one rename, so running API workers that poll it
+        # never read a half-written config.
+        self.config = self.config.model_copy(update={"version": self.config.version + 1})
+        atomic_write(config_path(), yaml.dump(self.config.model_dump()))
+        self.config = load_config()
 
 
 config_manager = ConfigManager()
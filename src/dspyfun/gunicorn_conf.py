@@ -0,0 +1,22 @@
+"""gunicorn settings for serving the REST API with Prometheus metrics aggregated across workers."""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+def on_starting(server) -> None:
+    """Give the workers a fresh shared directory for their metric samples before they fork."""
+    shm = Path("/dev/shm")
+    default_dir = (shm if shm.is_dir() else Path(tempfile.gettempdir())) / "dspyfun-metrics"
+    metrics_dir = Path(os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(default_dir)))
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    metrics_dir.mkdir(parents=True)
+
+
+def child_exit(server, worker) -> None:
+    """Drop the live gauges of a worker that exited."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,312 @@
+"""Local mock LM server speaking the Ollama and OpenAI completion APIs, for offline benchmarks.
+
+Answers come from fixture rules, matched against the prompt, or fall back to MOCK_LM_RESPONSE.
+Latency, token rate and injected errors are drawn from a seeded random generator, so a benchmark
+run can be repeated exactly. Every setting can be given as an environment variable, for a server
+started with ``uvicorn dspyfun.mock_lm:app``, or as keyword arguments to ``serve_in_thread``:
+
+- DSPYFUN_MOCK_LM_FIXTURES: a JSON file with a list of ``{"match": regex, "response": text}``
+  rules. ``"responses": [...]`` instead of ``"response"`` scripts successive answers to matching
+  prompts (the last one repeats), ``"status"`` makes matching prompts fail, and a rule without
+  ``"match"`` matches every prompt.
+- DSPYFUN_MOCK_LM_LATENCY: time to the first token, as seconds or a distribution:
+  ``fixed:S``, ``uniform:LOW,HIGH``, ``normal:MEAN,STDDEV``, ``lognormal:MEDIAN,SIGMA`` or
+  ``exponential:MEAN``.
+- DSPYFUN_MOCK_LM_TOKENS_PER_SECOND: generation speed after the first token, unlimited if 0.
+- DSPYFUN_MOCK_LM_ERRORS: injected failures as ``STATUS:PROBABILITY`` pairs, e.g. ``429:0.05,500:0.01``.
+- DSPYFUN_MOCK_LM_SEED: seed of the random generator.
+
+``poe mock-lm`` serves it on Ollama's default port, so ``init_ol()`` talks to it unchanged; point
+OpenAI clients at it with ``OPENAI_BASE_URL=http://127.0.0.1:11434/v1``.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+# The completion returned for prompts that no fixture rule matches.
+MOCK_LM_RESPONSE = os.environ.get("DSPYFUN_MOCK_LM_RESPONSE", '{"last_fib_int": 267914296}')
+
+app = FastAPI()
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Parse a latency distribution into a sampler of non-negative seconds.
+
+    >>> parse_latency("uniform:0.5,0.5")(random.Random(0))
+    0.5
+    """
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    params = [float(arg) for arg in args.split(",")]
+    samplers = {
+        "fixed": lambda rng, seconds: seconds,
+        "uniform": lambda rng, low, high: rng.uniform(low, high),
+        "normal": lambda rng, mean, stddev: rng.gauss(mean, stddev),
+        "lognormal": lambda rng, median, sigma: median * rng.lognormvariate(0, sigma),
+        "exponential": lambda rng, mean: rng.expovariate(1 / mean),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution {kind!r}, expected one of {sorted(samplers)}")
+    sampler = samplers[kind]
+    return lambda rng: max(sampler(rng, *params), 0.0)
+
+
+def parse_errors(spec: str) -> dict[int, float]:
+    """Parse ``STATUS:PROBABILITY`` pairs, e.g. ``429:0.05,500:0.01``."""
+    errors = {}
+    for pair in filter(None, spec.split(",")):
+        status, probability = pair.split(":")
+        errors[int(status)] = float(probability)
+    return errors
+
+
+@dataclass
+class MockSettings:
+    fixtures: list[dict] = field(default_factory=list)
+    latency: str = "0"
+    tokens_per_second: float = 0.0
+    errors: dict[int, float] = field(default_factory=dict)
+    seed: int | None = None
+
+    @classmethod
+    def from_env(cls) -> "MockSettings":
+        fixtures = os.environ.get("DSPYFUN_MOCK_LM_FIXTURES")
+        seed = os.environ.get("DSPYFUN_MOCK_LM_SEED")
+        return cls(fixtures=json.loads(Path(fixtures).read_text()) if fixtures else [],
+                   latency=os.environ.get("DSPYFUN_MOCK_LM_LATENCY", "0"),
+                   tokens_per_second=float(os.environ.get("DSPYFUN_MOCK_LM_TOKENS_PER_SECOND", "0")),
+                   errors=parse_errors(os.environ.get("DSPYFUN_MOCK_LM_ERRORS", "")),
+                   seed=int(seed) if seed else None)
+
+
+@dataclass
+class Answer:
+    text: str
+    # Seconds until the first token, and between the following ones.
+    first_token: float
+    token_interval: float
+    # An injected HTTP error status, if this request fails.
+    status: int | None = None
+
+    def tokens(self) -> list[str]:
+        return re.findall(r"\S+\s*", self.text)
+
+
+class MockBehavior:
+    """Decide the answer, timing and failure of each request from the settings."""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.latency = parse_latency(settings.latency)
+        self._rng = random.Random(settings.seed)
+        self._rules = [({**rule}, re.compile(rule.get("match", ""), re.DOTALL)) for rule in settings.fixtures]
+        self._counters = [itertools.count() for _ in self._rules]
+        self._lock = threading.Lock()
+
+    def answer(self, prompt: str) -> Answer:
+        with self._lock:
+            text, status = MOCK_LM_RESPONSE, None
+            for (rule, pattern), counter in zip(self._rules, self._counters):
+                if pattern.search(prompt):
+                    responses = rule.get("responses") or [rule.get("response", MOCK_LM_RESPONSE)]
+                    text = responses[min(next(counter), len(responses) - 1)]
+                    status = rule.get("status")
+                    break
+            # Always draw, so that fixture errors don't shift the random sequence of later requests.
+            roll = self._rng.random()
+            for error, probability in self.settings.errors.items():
+                if roll < probability:
+                    status = status or error
+                    break
+                roll -= probability
+            rate = self.settings.tokens_per_second
+            return Answer(text, self.latency(self._rng), 1 / rate if rate else 0.0, status)
+
+
+behavior = MockBehavior(MockSettings.from_env())
+
+
+def _error(status: int, openai: bool) -> JSONResponse:
+    message = f"Injected mock LM error {status}"
+    body = ({"error": {"message": message, "type": "mock_error", "code": status}} if openai
+            else {"error": message})
+    headers = {"Retry-After": "1"} if status in (429, 503) else None
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+async def _wait_for_answer(answer: Answer) -> None:
+    """Sleep for the time to the first token and, for a complete answer, the generation of the rest."""
+    await asyncio.sleep(answer.first_token + answer.token_interval * max(len(answer.tokens()) - 1, 0))
+
+
+class GenerateRequest(BaseModel):
+    model: str
+    prompt: str = ""
+    messages: list[dict] = Field(default_factory=list)
+    # Ollama streams unless asked not to.
+    stream: bool = True
+    options: dict = Field(default_factory=dict)
+
+
+def _prompt(request: BaseModel) -> str:
+    messages = getattr(request, "messages", None) or []
+    prompt = getattr(request, "prompt", "")
+    if isinstance(prompt, list):
+        prompt = "\n".join(prompt)
+    return prompt or " ".join(str(message.get("content", "")) for message in messages)
+
+
+def _completion(request: GenerateRequest, answer: Answer) -> dict:
+    return {
+        "model": request.model,
+        "created_at": datetime.now(UTC).isoformat(),
+        "done": True,
+        "prompt_eval_count": len(_prompt(request).split()),
+        "eval_count": len(answer.tokens()),
+    }
+
+
+async def _stream(request: GenerateRequest, answer: Answer, chat: bool) -> AsyncIterator[str]:
+    """Stream the completion one whitespace-delimited token per NDJSON line, like Ollama does.
+
+    Chat chunks carry the token as an assistant ``message``, text completion chunks as ``response``.
+    """
+    def content(text: str) -> dict:
+        return {"message": {"role": "assistant", "content": text}} if chat else {"response": text}
+
+    await asyncio.sleep(answer.first_token)
+    for i, token in enumerate(answer.tokens()):
+        if i:
+            await asyncio.sleep(answer.token_interval)
+        yield json.dumps({"model": request.model, **content(token), "done": False}) + "\n"
+    yield json.dumps({**_completion(request, answer), **content("")}) + "\n"
+
+
+@app.post("/api/generate", response_model=None)
+async def generate(request: GenerateRequest) -> dict | StreamingResponse | JSONResponse:
+    """Answer an Ollama text completion request."""
+    answer = behavior.answer(_prompt(request))
+    if answer.status is not None:
+        await asyncio.sleep(answer.first_token)
+        return _error(answer.status, openai=False)
+    if request.stream:
+        return StreamingResponse(_stream(request, answer, chat=False), media_type="application/x-ndjson")
+    await _wait_for_answer(answer)
+    return {**_completion(request, answer), "response": answer.text}
+
+
+@app.post("/api/chat", response_model=None)
+async def chat(request: GenerateRequest) -> dict | StreamingResponse | JSONResponse:
+    """Answer an Ollama chat completion request."""
+    answer = behavior.answer(_prompt(request))
+    if answer.status is not None:
+        await asyncio.sleep(answer.first_token)
+        return _error(answer.status, openai=False)
+    if request.stream:
+        return StreamingResponse(_stream(request, answer, chat=True), media_type="application/x-ndjson")
+    await _wait_for_answer(answer)
+    return {**_completion(request, answer), "message": {"role": "assistant", "content": answer.text}}
+
+
+class OpenAIRequest(BaseModel):
+    model: str
+    prompt: str | list[str] = ""
+    messages: list[dict] = Field(default_factory=list)
+    stream: bool = False
+    n: int = 1
+
+
+def _usage(request: OpenAIRequest, answer: Answer) -> dict:
+    prompt_tokens, completion_tokens = len(_prompt(request).split()), len(answer.tokens()) * request.n
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+async def _openai_stream(request: OpenAIRequest, answer: Answer, chat: bool) -> AsyncIterator[str]:
+    """Stream the completion one token per server-sent event, like the OpenAI API does."""
+    base = {"id": f"mock-{uuid.uuid4().hex}", "object": "chat.completion.chunk" if chat else "text_completion",
+            "created": int(time.time()), "model": request.model}
+    await asyncio.sleep(answer.first_token)
+    for i, token in enumerate(answer.tokens()):
+        if i:
+            await asyncio.sleep(answer.token_interval)
+        choice = {"delta": {"content": token}} if chat else {"text": token}
+        yield f"data: {json.dumps({**base, 'choices': [{'index': 0, **choice, 'finish_reason': None}]})}\n\n"
+    final = {"delta": {}} if chat else {"text": ""}
+    yield f"data: {json.dumps({**base, 'choices': [{'index': 0, **final, 'finish_reason': 'stop'}]})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+async def _openai_answer(request: OpenAIRequest, chat: bool) -> dict | StreamingResponse | JSONResponse:
+    answer = behavior.answer(_prompt(request))
+    if answer.status is not None:
+        await asyncio.sleep(answer.first_token)
+        return _error(answer.status, openai=True)
+    if request.stream:
+        return StreamingResponse(_openai_stream(request, answer, chat), media_type="text/event-stream")
+    await _wait_for_answer(answer)
+    if chat:
+        choices = [{"index": i, "message": {"role": "assistant", "content": answer.text}, "finish_reason": "stop"}
+                   for i in range(request.n)]
+    else:
+        choices = [{"index": i, "text": answer.text, "logprobs": None, "finish_reason": "stop"}
+                   for i in range(request.n)]
+    return {"id": f"mock-{uuid.uuid4().hex}", "object": "chat.completion" if chat else "text_completion",
+            "created": int(time.time()), "model": request.model, "choices": choices,
+            "usage": _usage(request, answer)}
+
+
+@app.post("/v1/completions", response_model=None)
+async def openai_completions(request: OpenAIRequest) -> dict | StreamingResponse | JSONResponse:
+    """Answer an OpenAI text completion request."""
+    return await _openai_answer(request, chat=False)
+
+
+@app.post("/v1/chat/completions", response_model=None)
+async def openai_chat_completions(request: OpenAIRequest) -> dict | StreamingResponse | JSONResponse:
+    """Answer an OpenAI chat completion request."""
+    return await _openai_answer(request, chat=True)
+
+
+@contextmanager
+def serve_in_thread(host: str = "127.0.0.1", port: int = 0, **settings) -> Iterator[str]:
+    """Serve the mock LM from a background thread and yield its base URL.
+
+    Keyword arguments override the MockSettings read from the environment while the server runs.
+    """
+    global behavior
+    previous = behavior
+    if settings:
+        behavior = MockBehavior(MockSettings(**{**MockSettings.from_env().__dict__, **settings}))
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError("Mock LM server failed to start")
+            time.sleep(0.01)
+        bound_port = server.servers[0].sockets[0].getsockname()[1]
+        yield f"http://{host}:{bound_port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+        behavior = previous
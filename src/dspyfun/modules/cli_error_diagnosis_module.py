@@ -0,0 +1,11 @@
+import dspy
+
+
+class CLIErrorDiagnosis(dspy.Signature):
+    """
+    Diagnose CLI errors and provide recommended CLI commands from a Google Cloud Systems Architect's perspective.
+    """
+    error_message = dspy.InputField(desc="The failed CLI command with its exit code, duration and the tail of its output.")
+
+    diagnosis = dspy.OutputField(desc="Detailed diagnosis of the error.")
+    recommended_commands = dspy.OutputField(desc="List of recommended CLI commands to resolve or further investigate the error.")
@@ -4,6 +4,9 @@ import dspy
 from pydantic import BaseModel
 import re
 
+from dspyfun.utils.cache_tools import cached_predict
+from dspyfun.utils.program_tools import compiled_program
+
 class Property(BaseModel):
     key: str
     value: Union[str, int, float, bool]
@@ -163,14 +166,16 @@ class CypherConverter(dspy.Signature):
 
 
 class CypherModule(dspy.Module):
+    def __init__(self):
+        super().__init__()
+        self.convert = dspy.ChainOfThought(CypherConverter)
+
     def forward(self, text):
-        pred = dspy.ChainOfThought(CypherConverter)
-        response = pred.forward(text=text, cypher_language="cypher").valid_cypher_text
-        print(response)
+        return cached_predict(self.convert, text=text, cypher_language="cypher").valid_cypher_text
 
 
 def cypher_call(text: str):
-    mod = CypherModule()
+    mod = compiled_program(CypherModule)
     return mod.forward(text)
 
 
@@ -188,7 +193,7 @@ CREATE (person2)-[:MEET]->(meeting)"""
 
 def main():
     """Main function"""
-    from dspygen.utils.dspy_tools import init_ol
+    from dspyfun.utils.dspy_tools import init_ol
     init_ol()
 
     print(cypher_call("Meet me at the park at 5PM"))
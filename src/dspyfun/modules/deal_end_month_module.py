@@ -19,7 +19,7 @@ class DealEndMonthSignature(dspy.Signature):
 
 def main():
     """Main function"""
-    from dspygen.utils.dspy_tools import init_dspy
+    from dspyfun.utils.dspy_tools import init_dspy
     init_dspy()
 
     # Create the Typed Predictor
@@ -2,7 +2,10 @@
 
 """
 import dspy
-from dspygen.utils.dspy_tools import init_dspy
+from dspyfun.utils.dspy_tools import init_dspy
+
+from dspyfun.utils.cache_tools import cached_predict
+from dspyfun.utils.program_tools import compiled_program
 
 
 deal = {"dealTerms": "2 month free, after that 10% discount for 3 month"}
@@ -45,16 +48,14 @@ class DealTermSplitModule(dspy.Module):
     def __init__(self, **forward_args):
         super().__init__()
         self.forward_args = forward_args
-        self.output = None
+        self.split = dspy.ChainOfThought(SplitDealTerms)
 
     def forward(self, deal_terms):
-        pred = dspy.ChainOfThought(SplitDealTerms)
-        self.output = pred(deal_terms=deal_terms)
-        return self.output
+        return cached_predict(self.split, deal_terms=deal_terms)
 
 
 def deal_term_split_call(deal_terms):
-    deal_term_split = DealTermSplitModule()
+    deal_term_split = compiled_program(DealTermSplitModule)
     return deal_term_split.forward(deal_terms=deal_terms)
 
 
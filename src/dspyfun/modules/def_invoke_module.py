@@ -1,7 +1,9 @@
 import dspy
 
+from dspyfun.utils.cache_tools import cached_predict
 from dspyfun.utils.dspy_tools import init_ol
 from dspyfun.utils.markdown_tools import extract_triple_backticks
+from dspyfun.utils.program_tools import compiled_program
 
 
 class GenerateFunctionInvocation(dspy.Signature):
@@ -21,17 +23,15 @@ class DefInvokeModule(dspy.Module):
     def __init__(self, **forward_args):
         super().__init__()
         self.forward_args = forward_args
-        self.output = None
+        self.generate = dspy.Predict(GenerateFunctionInvocation)
 
     def forward(self, function_declaration, additional_instructions):
-        pred = dspy.Predict(GenerateFunctionInvocation)
-        self.output = pred(function_declaration=function_declaration,
-                           additional_instructions=additional_instructions).invocation_command
-        return self.output
+        return cached_predict(self.generate, function_declaration=function_declaration,
+                              additional_instructions=additional_instructions).invocation_command
 
 
 def def_invoke_call(function_declaration, additional_instructions=""):
-    def_invoke = DefInvokeModule()
+    def_invoke = compiled_program(DefInvokeModule)
     code = extract_triple_backticks(def_invoke.forward(function_declaration=function_declaration,
                                                        additional_instructions=additional_instructions))
 
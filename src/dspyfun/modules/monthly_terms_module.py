@@ -39,7 +39,7 @@ class DealEndMonth(dspy.Signature):
 
 
 def main2():
-    from dspygen.utils.dspy_tools import init_dspy
+    from dspyfun.utils.dspy_tools import init_dspy
     init_dspy()
     deal_terms = "2 months free, after that 10% discount for 3 months"
 
@@ -51,7 +51,7 @@ def main2():
 
 def main():
     """Main function"""
-    from dspygen.utils.dspy_tools import init_dspy
+    from dspyfun.utils.dspy_tools import init_dspy
     init_dspy(model="gpt-4o")
     # deal_terms = "2 months free, after that 10% discount for 3 months"
     #
@@ -1,15 +1,27 @@
 """AWS operations."""
-import subprocess
+from pathlib import Path
+from typing import Optional
+
 import inquirer
 
 import typer
 
-from dspyfun.utils.cli_tools import run_command
+from dspyfun.utils.cli_tools import (
+    Step,
+    parallel_option,
+    parse_targets,
+    run_command,
+    run_steps,
+    run_targets,
+    targets_file_option,
+    targets_option,
+)
+from dspyfun.utils.inventory_tools import listing
 
-from dspyfun import DspyfunConfig
+from dspyfun import load_config
 
 app = typer.Typer()
-config = DspyfunConfig()
+config = load_config()
 
 
 @app.command(name="install")
@@ -24,10 +36,19 @@ def install_aws_cli() -> None:
 @app.command(name="create")
 def create_cluster(name: str = typer.Argument(config.cluster_name),
                    region: str = typer.Argument(config.region),
-                   profile: str = typer.Argument(config.profile)) -> None:
+                   profile: str = typer.Argument(config.profile),
+                   target: Optional[list[str]] = targets_option("NAME[:REGION[:PROFILE]]"),
+                   targets_file: Optional[Path] = targets_file_option("NAME[:REGION[:PROFILE]]"),
+                   parallel: int = parallel_option()) -> None:
     """Create a new EKS cluster"""
+    create = "aws eks create-cluster --name {} --region {} --profile {} --role-arn <role-arn> --resources-vpc-config subnetIds=<subnet-ids>,securityGroupIds=<security-group-ids>"
+    if target or targets_file:
+        clusters = parse_targets(target or [], targets_file, (name, region, profile))
+        print(f"Creating {len(clusters)} EKS clusters...")
+        run_targets({":".join(cluster): [create.format(*cluster)] for cluster in clusters}, concurrency=parallel)
+        return
     print(f"Creating EKS cluster: {name} {region} {profile}...")
-    run_command(f"aws eks create-cluster --name {name} --region {region} --profile {profile} --role-arn <role-arn> --resources-vpc-config subnetIds=<subnet-ids>,securityGroupIds=<security-group-ids>")
+    run_command(create.format(name, region, profile))
 
 
 @app.command(name="firewall")
@@ -36,16 +57,29 @@ def setup_firewall(cluster_name: str = typer.Argument(config.cluster_name),
                    profile: str = typer.Argument(config.profile)) -> None:
     """Setup firewall rules for sidecar injection"""
     print(f"Setting up firewall rules for cluster: {cluster_name} in region: {region}...")
-    run_command(f"aws ec2 authorize-security-group-ingress --group-id <security-group-id> --protocol tcp --port 10250 --cidr 0.0.0.0/0 --region {region} --profile {profile}")
-    run_command(f"aws ec2 authorize-security-group-ingress --group-id <security-group-id> --protocol tcp --port 443 --cidr 0.0.0.0/0 --region {region} --profile {profile}")
-    run_command(f"aws ec2 authorize-security-group-ingress --group-id <security-group-id> --protocol tcp --port 4000 --cidr 0.0.0.0/0 --region {region} --profile {profile}")
+    # The three rules are independent, so they are authorized concurrently.
+    run_steps([
+        Step(f"port-{port}", f"aws ec2 authorize-security-group-ingress --group-id <security-group-id> --protocol tcp --port {port} --cidr 0.0.0.0/0 --region {region} --profile {profile}")
+        for port in (10250, 443, 4000)
+    ])
 
 
 @app.command(name="creds")
 def get_credentials(name: str = typer.Argument(config.cluster_name),
                     region: str = typer.Argument(config.region),
-                    profile: str = typer.Argument(config.profile)) -> None:
+                    profile: str = typer.Argument(config.profile),
+                    target: Optional[list[str]] = targets_option("NAME[:REGION[:PROFILE]]"),
+                    targets_file: Optional[Path] = targets_file_option("NAME[:REGION[:PROFILE]]"),
+                    # Every target writes to the same kubeconfig, so they run one at a time by default.
+                    parallel: int = parallel_option(1)) -> None:
     """Retrieve credentials for kubectl"""
+    if target or targets_file:
+        clusters = parse_targets(target or [], targets_file, (name, region, profile))
+        print(f"Retrieving credentials for {len(clusters)} clusters...")
+        run_targets({":".join(cluster): [
+            f"aws eks update-kubeconfig --name {cluster[0]} --region {cluster[1]} --profile {cluster[2]}",
+        ] for cluster in clusters}, concurrency=parallel)
+        return
     print(f"Retrieving credentials for cluster: {name}...")
     run_command(f"aws eks update-kubeconfig --name {name} --region {region} --profile {profile}")
 
@@ -100,25 +134,18 @@ def retry_enable_service(profile: str = typer.Argument(config.profile)) -> None:
 
 
 @app.command(name="list")
-def list_profiles() -> None:
+def list_profiles(refresh: bool = typer.Option(False, help="Fetch the profiles instead of using the cache")) -> None:
     """List available AWS profiles"""
     print("Listing available AWS profiles...")
-    run_command("aws configure list-profiles")
+    print("\n".join(listing("aws-profiles", refresh=refresh)))
 
 
 @app.command(name="set")
-def set_profile_interactive() -> None:
+def set_profile_interactive(
+        refresh: bool = typer.Option(False, help="Fetch the profiles instead of using the cache")) -> None:
     """Set the AWS profile using an interactive menu"""
     print("Fetching list of available AWS profiles...")
-    result = subprocess.run(
-        "aws configure list-profiles",
-        shell=True,
-        check=True,
-        capture_output=True,
-        text=True
-    )
-
-    profiles = result.stdout.strip().split("\n")
+    profiles = listing("aws-profiles", refresh=refresh)
 
     if not profiles:
         print("No profiles found.")
@@ -0,0 +1,45 @@
+"""Batch operations."""
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+app = typer.Typer()
+
+
+@app.command(name="run")
+def run_batch_file(input_path: Path = typer.Argument(..., exists=True, dir_okay=False,
+                                                     help="JSONL file with one object of call arguments per line"),
+                   call: str = typer.Option(..., help="def-invoke, cypher, deal-terms or module:function"),
+                   output: Optional[Path] = typer.Option(None, help="Results JSONL (default: INPUT.out.jsonl)"),
+                   concurrency: int = typer.Option(4, min=1, help="Calls running at once"),
+                   rate: Optional[float] = typer.Option(None, min=0.01, help="Most calls started per second"),
+                   retries: int = typer.Option(2, min=0, help="Retries of a failing call"),
+                   lm: str = typer.Option("ollama", help="LM backend: ollama or openai"),
+                   model: Optional[str] = typer.Option(None, help="Model name (default: the backend's default)"),
+                   restart: bool = typer.Option(False, help="Discard earlier results instead of resuming")) -> None:
+    """Run a module over every line of a JSONL file, resuming where an interrupted run stopped"""
+    from rich.progress import Progress
+
+    from dspyfun.utils.batch_tools import pending_path, resolve_call, run_batch
+    from dspyfun.utils.dspy_tools import init_dspy, init_ol
+
+    output = output or input_path.with_suffix(".out.jsonl")
+    if restart:
+        output.unlink(missing_ok=True)
+        pending_path(output).unlink(missing_ok=True)
+    function = resolve_call(call)
+    init = init_ol if lm == "ollama" else init_dspy
+    init(**({"model": model} if model else {}))
+
+    with open(input_path) as file:
+        total = sum(1 for line in file if line.strip())
+    with Progress() as progress:
+        task = progress.add_task(f"{call} over {input_path.name}", total=total)
+        summary = asyncio.run(run_batch(function, input_path, output, concurrency=concurrency, rate=rate,
+                                        retries=retries, on_result=lambda _: progress.advance(task)))
+    print(f"{summary.total} items, {summary.resumed} resumed from an earlier run, {summary.failed} failed, "
+          f"in {summary.seconds:.1f}s. Results: {output}")
+    if summary.failed:
+        raise typer.Exit(1)
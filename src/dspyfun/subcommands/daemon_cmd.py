@@ -0,0 +1,55 @@
+"""Warm CLI daemon operations."""
+import subprocess
+import sys
+import time
+
+import typer
+
+from dspyfun.utils.daemon_tools import daemon_status, serve, socket_path, stop_daemon
+from dspyfun.utils.path_tools import cache_dir
+
+app = typer.Typer()
+
+
+@app.command(name="start")
+def start_daemon(foreground: bool = typer.Option(False, help="Serve in this process instead of detaching"),
+                 timeout: float = typer.Option(30.0, help="Seconds to wait for the daemon to come up")) -> None:
+    """Start the daemon that runs dspyfun-client commands in a preloaded interpreter"""
+    path = socket_path()
+    if (status := daemon_status(path)) is not None:
+        print(f"Daemon already running with pid {status['pid']} on {path}")
+        return
+    if foreground:
+        print(f"Serving on {path}")
+        serve(path)
+        return
+    log_path = cache_dir() / "daemon.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "ab") as log:
+        subprocess.Popen([sys.executable, "-m", "dspyfun.cli", "daemon", "start", "--foreground"],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while (status := daemon_status(path)) is None:
+        if time.monotonic() > deadline:
+            print(f"The daemon did not start within {timeout:g}s, see {log_path}")
+            raise typer.Exit(1)
+        time.sleep(0.1)
+    print(f"Daemon started with pid {status['pid']} on {path}")
+
+
+@app.command(name="stop")
+def stop() -> None:
+    """Stop the daemon"""
+    status = stop_daemon()
+    print("Daemon is not running" if status is None else f"Stopped daemon with pid {status['pid']}")
+
+
+@app.command(name="status")
+def status() -> None:
+    """Show whether the daemon is running and how many commands it has served"""
+    status = daemon_status()
+    if status is None:
+        print("Daemon is not running")
+        raise typer.Exit(1)
+    print(f"Daemon running with pid {status['pid']} on {socket_path()}, "
+          f"up {status['uptime']:.0f}s, {status['served']} commands served")
@@ -1,15 +1,28 @@
 """Google Cloud (gc) operations."""
 import subprocess
+from pathlib import Path
+from typing import Optional
+
 import inquirer
 
 import typer
 
-from dspyfun.utils.cli_tools import run_command
+from dspyfun.utils.cli_tools import (
+    Step,
+    parallel_option,
+    parse_targets,
+    run_command,
+    run_steps,
+    run_targets,
+    targets_file_option,
+    targets_option,
+)
+from dspyfun.utils.inventory_tools import listing
 
-from dspyfun import DspyfunConfig
+from dspyfun import load_config
 
 app = typer.Typer()
-config = DspyfunConfig()
+config = load_config()
 
 
 @app.command(name="install")
@@ -24,8 +37,19 @@ def install_gcloud_sdk() -> None:
 @app.command(name="create")
 def create_cluster(name: str = typer.Argument(config.cluster_name),
                    zone: str = typer.Argument(config.zone),
-                   project: str = typer.Argument(config.project_id)) -> None:
+                   project: str = typer.Argument(config.project_id),
+                   target: Optional[list[str]] = targets_option("NAME[:ZONE[:PROJECT]]"),
+                   targets_file: Optional[Path] = targets_file_option("NAME[:ZONE[:PROJECT]]"),
+                   parallel: int = parallel_option()) -> None:
     """Create a new GKE cluster"""
+    if target or targets_file:
+        clusters = parse_targets(target or [], targets_file, (name, zone, project))
+        print(f"Creating {len(clusters)} GKE clusters...")
+        run_targets({":".join(cluster): [
+            f"gcloud services enable container.googleapis.com --project {cluster[2]}",
+            f"gcloud container clusters create {cluster[0]} --zone {cluster[1]} --project {cluster[2]}",
+        ] for cluster in clusters}, concurrency=parallel)
+        return
     print(f"Creating GKE cluster: {name} {zone} {project}...")
     run_command("gcloud services enable container.googleapis.com")
     run_command(f"gcloud container clusters create {name} --zone {zone} --project {project}")
@@ -45,8 +69,19 @@ def setup_firewall(name: str = typer.Argument(config.cluster_name)) -> None:
 @app.command(name="creds")
 def get_credentials(name: str = typer.Argument(config.cluster_name),
                     zone: str = typer.Argument(config.zone),
-                    project: str = typer.Argument(config.project_id)) -> None:
+                    project: str = typer.Argument(config.project_id),
+                    target: Optional[list[str]] = targets_option("NAME[:ZONE[:PROJECT]]"),
+                    targets_file: Optional[Path] = targets_file_option("NAME[:ZONE[:PROJECT]]"),
+                    # Every target writes to the same kubeconfig, so they run one at a time by default.
+                    parallel: int = parallel_option(1)) -> None:
     """Retrieve credentials for kubectl"""
+    if target or targets_file:
+        clusters = parse_targets(target or [], targets_file, (name, zone, project))
+        print(f"Retrieving credentials for {len(clusters)} clusters...")
+        run_targets({":".join(cluster): [
+            f"gcloud container clusters get-credentials {cluster[0]} --zone {cluster[1]} --project {cluster[2]}",
+        ] for cluster in clusters}, concurrency=parallel)
+        return
     print(f"Retrieving credentials for cluster: {name}...")
     run_command(f"gcloud container clusters get-credentials {name} --zone {zone} --project {project}")
 
@@ -90,8 +125,10 @@ def check_network_connectivity() -> None:
 def check_service_quotas() -> None:
     """Check the service quotas for the current project"""
     print("Checking service quotas for the current project...")
-    run_command("gcloud services list --available")
-    run_command("gcloud services list --enabled")
+    run_steps([
+        Step("available", "gcloud services list --available"),
+        Step("enabled", "gcloud services list --enabled"),
+    ])
 
 
 @app.command(name="retry")
@@ -101,25 +138,18 @@ def retry_enable_service() -> None:
     run_command("gcloud services enable container.googleapis.com")
 
 @app.command(name="list")
-def list_projects() -> None:
+def list_projects(refresh: bool = typer.Option(False, help="Fetch the projects instead of using the cache")) -> None:
     """List available Google Cloud projects"""
     print("Listing available Google Cloud projects...")
-    run_command("gcloud projects list")
+    print("\n".join(listing("gc-projects", refresh=refresh)))
 
 
 @app.command(name="set")
-def set_project() -> None:
+def set_project(
+        refresh: bool = typer.Option(False, help="Fetch the projects instead of using the cache")) -> None:
     """Set the Google Cloud project using an interactive menu"""
     print("Fetching list of available Google Cloud projects...")
-    result = subprocess.run(
-        "gcloud projects list --format='value(projectId)'",
-        shell=True,
-        check=True,
-        capture_output=True,
-        text=True
-    )
-
-    projects = result.stdout.strip().split("\n")
+    projects = listing("gc-project-ids", refresh=refresh)
 
     if not projects:
         print("No projects found.")
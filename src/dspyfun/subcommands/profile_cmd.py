@@ -0,0 +1,65 @@
+"""Profiling operations."""
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from dspyfun.utils.trace_tools import disable_tracing, enable_tracing, read_trace, summarize
+
+app = typer.Typer()
+
+
+def print_summary(records: list[dict], top: int) -> None:
+    """Print the ``top`` signatures by total LM wall time."""
+    from rich import print
+    from rich.table import Table
+
+    table = Table(title=f"Hottest signatures over {len(records)} LM calls")
+    table.add_column("signature", overflow="fold")
+    for column in ("calls", "cached", "prompt tok", "compl tok", "queue s", "wall s", "mean ms", "max ms"):
+        table.add_column(column, justify="right")
+    for total in summarize(records)[:top]:
+        table.add_row(total["name"], str(total["calls"]), str(total["cache_hits"]), str(total["prompt_tokens"]),
+                      str(total["completion_tokens"]), f"{total['queue_s']:.2f}", f"{total['wall_s']:.2f}",
+                      f"{total['wall_s'] / total['calls'] * 1000:.0f}", f"{total['max_wall_s'] * 1000:.0f}")
+    print(table)
+
+
+@app.command(name="run", context_settings={"allow_extra_args": True, "ignore_unknown_options": True})
+def profile_run(ctx: typer.Context,
+                trace: Optional[Path] = typer.Option(
+                    None, help="Keep the trace here: .json for a Chrome trace, anything else for JSON lines"),
+                top: int = typer.Option(10, help="Number of signatures to show")) -> None:
+    """Run a dspyfun command with LM tracing, e.g. `dspyfun profile run -- pyd text`, and print its hottest signatures"""
+    import click
+
+    from dspyfun.cli import app as cli
+
+    if not ctx.args:
+        raise typer.BadParameter("Give the dspyfun command to profile after --")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = trace or Path(tmp) / "trace.jsonl"
+        enable_tracing(path)
+        code = 0
+        try:
+            cli(args=ctx.args, prog_name="dspyfun", standalone_mode=False)
+        except SystemExit as exc:
+            code = exc.code if isinstance(exc.code, int) else 1
+        except click.ClickException as exc:
+            exc.show()
+            code = exc.exit_code
+        finally:
+            disable_tracing()
+        print_summary(read_trace(path), top)
+    if trace is not None:
+        print(f"Trace written to {trace}")
+    if code:
+        raise typer.Exit(code)
+
+
+@app.command(name="show")
+def profile_show(trace: Path = typer.Argument(..., exists=True, dir_okay=False, help="A trace file to summarize"),
+                 top: int = typer.Option(10, help="Number of signatures to show")) -> None:
+    """Print the hottest signatures of a trace written by `profile run` or DSPYFUN_TRACE"""
+    print_summary(read_trace(trace), top)
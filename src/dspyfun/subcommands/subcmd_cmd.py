@@ -1,6 +1,7 @@
 """Generating subcommands."""
 import typer
 
+from dspyfun.utils.manifest_tools import load_manifest
 from dspyfun.utils.path_tools import src_dir
 
 app = typer.Typer(help="Subcommand to generate subcommands")
@@ -45,6 +46,9 @@ def cmd_new(subcommand_name: str, new_command_name: str):
         source = template.render(subcommand_name=subcommand_name, new_command_name=new_command_name, sub_command_name=subcommand_name)
         file.write(source)
 
+    # Describe the new subcommand in the CLI's manifest right away.
+    load_manifest(refresh=True)
+
     typer.echo(f"Subcommand module '{subcommand_name}' generated successfully!")
 
 
@@ -0,0 +1,129 @@
+"""Concurrency helpers for the asyncio-based REST API."""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from contextlib import asynccontextmanager
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+    """Raised when an AdmissionGate has no room left for another task."""
+
+
+class AdmissionGate:
+    """Bound the work admitted by a server: ``limit`` tasks run at once and ``queue_size`` wait.
+
+    Anything beyond that is rejected immediately with Overloaded, so callers can shed load instead
+    of letting requests pile up behind a saturated executor.
+    """
+
+    def __init__(self, limit: int, queue_size: int):
+        self.limit = limit
+        self.queue_size = queue_size
+        self._slots = asyncio.Semaphore(limit)
+        self._admitted = 0
+        self._running = 0
+
+    @property
+    def running(self) -> int:
+        """Number of admitted tasks currently holding a slot."""
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        """Number of admitted tasks queued for a slot."""
+        return self._admitted - self._running
+
+    def reserve(self) -> None:
+        """Admit a task, or raise Overloaded if both the slots and the queue are full."""
+        if self._admitted >= self.limit + self.queue_size:
+            raise Overloaded(f"{self._admitted} tasks already admitted")
+        self._admitted += 1
+
+    def release(self) -> None:
+        """Give back a reservation made with reserve()."""
+        self._admitted -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for one of the ``limit`` running slots."""
+        async with self._slots:
+            self._running += 1
+            try:
+                yield
+            finally:
+                self._running -= 1
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Reserve a place and then wait for a running slot."""
+        self.reserve()
+        try:
+            async with self.slot():
+                yield
+        finally:
+            self.release()
+
+
+class KeyedSemaphores:
+    """Hand out one semaphore per key, for example to cap concurrent calls per model."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphores: dict[Hashable, asyncio.Semaphore] = {}
+
+    def __call__(self, key: Hashable) -> asyncio.Semaphore:
+        """Get the semaphore for ``key``, creating it on first use."""
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self.limit)
+        return self._semaphores[key]
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into a single in-flight call.
+
+    Callers that arrive while a call for their key is running await that call's result instead of
+    starting another one. A caller that gets cancelled does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running."""
+        return len(self._calls)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of ``call()``, sharing it with concurrent callers for ``key``."""
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, done: asyncio.Future) -> None:
+        if self._calls.get(key) is done:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter was cancelled.
+        if not done.cancelled():
+            done.exception()
+
+
+class RateLimiter:
+    """Space out calls so that no more than ``rate`` start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        """Wait for the next free start time."""
+        now = asyncio.get_running_loop().time()
+        start = max(self._next, now)
+        # Claim the slot before sleeping, so concurrent waiters queue up behind each other.
+        self._next = start + self.interval
+        await asyncio.sleep(start - now)
@@ -0,0 +1,223 @@
+"""Run a module's call function over every line of a JSONL file, with resumable progress.
+
+Each input line is a JSON object of keyword arguments for the call. Results are written to the
+output JSONL in input order, one ``{"index", "input", "output", "error", "attempts"}`` object per
+line. Results that finish ahead of an earlier, slower item are kept in a ``.pending`` file next to
+the output until they can be written in order, so an interrupted run resumes after the last
+finished item without calling the LM again for anything it already answered. Items that failed
+count as unfinished, so running again over the same output retries them.
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from importlib import import_module
+from pathlib import Path
+from typing import Any
+
+from dspyfun.utils.async_tools import RateLimiter
+from dspyfun.utils.config_tools import atomic_write
+
+# Short names for the modules' call functions.
+CALLS = {
+    "def-invoke": "dspyfun.modules.def_invoke_module:def_invoke_call",
+    "cypher": "dspyfun.modules.cypher_module:cypher_call",
+    "deal-terms": "dspyfun.modules.deal_terms_module:deal_term_split_call",
+}
+
+
+def resolve_call(spec: str) -> Callable[..., Any]:
+    """Import a call function given by short name or as ``package.module:function``."""
+    module_name, _, function_name = CALLS.get(spec, spec).partition(":")
+    if not function_name:
+        raise ValueError(f"Expected one of {sorted(CALLS)} or module:function, got {spec!r}")
+    return getattr(import_module(module_name), function_name)
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert a call's result, such as a dspy Prediction or a pydantic model, into JSON data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if hasattr(value, "toDict"):
+        return to_jsonable(value.toDict())
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def pending_path(output_path: Path) -> Path:
+    return output_path.with_name(output_path.name + ".pending")
+
+
+def _read_results(path: Path) -> list[dict]:
+    """Read the complete result lines of ``path``, cutting off a line left half-written by a crash."""
+    if not path.exists():
+        return []
+    results, valid_bytes = [], 0
+    with open(path, "rb") as file:
+        for line in file:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                results.pop()
+                break
+            valid_bytes += len(line)
+    with open(path, "r+b") as file:
+        file.truncate(valid_bytes)
+    return results
+
+
+def _inputs(input_path: Path) -> Iterator[tuple[int, str]]:
+    """Yield the index and text of every non-blank input line, reading the file lazily."""
+    index = 0
+    with open(input_path) as file:
+        for line in file:
+            if line.strip():
+                yield index, line
+                index += 1
+
+
+def _resume(output_path: Path) -> tuple[list[dict], dict[int, dict]]:
+    """Return the results of an earlier run to keep: the output lines before its first failure,
+    and the other successful results by index.
+
+    Output lines from the first failure on are moved back to the pending file, so the failed
+    items can be retried and the output rewritten in order.
+    """
+    done = _read_results(output_path)
+    pending = {result["index"]: result for result in _read_results(pending_path(output_path))
+               if result["index"] >= len(done)}
+    first_failed = next((position for position, result in enumerate(done) if result["error"] is not None),
+                        len(done))
+    if first_failed < len(done):
+        with open(pending_path(output_path), "a") as pending_file:
+            pending_file.writelines(json.dumps(result) + "\n" for result in done[first_failed:])
+        pending.update((result["index"], result) for result in done[first_failed:])
+        done = done[:first_failed]
+        atomic_write(output_path, "".join(json.dumps(result) + "\n" for result in done))
+    return done, {index: result for index, result in pending.items() if result["error"] is None}
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    # Items answered in an earlier, interrupted run.
+    resumed: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+
+async def _call_with_retries(call: Callable[..., Any], kwargs: dict, retries: int, backoff: float,
+                             limiter: RateLimiter | None) -> tuple[Any, str | None, int]:
+    """Call in a worker thread, retrying failures with jittered exponential backoff."""
+    attempt = 1
+    while True:
+        if limiter is not None:
+            await limiter.wait()
+        try:
+            return to_jsonable(await asyncio.to_thread(call, **kwargs)), None, attempt
+        except Exception as exc:
+            if attempt > retries:
+                return None, f"{type(exc).__name__}: {exc}", attempt
+        await asyncio.sleep(backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+        attempt += 1
+
+
+async def run_batch(call: Callable[..., Any], input_path: Path, output_path: Path, concurrency: int = 4,
+                    rate: float | None = None, retries: int = 2, backoff: float = 1.0,
+                    on_result: Callable[[dict], None] | None = None) -> BatchSummary:
+    """Run ``call`` over the JSONL inputs, up to ``concurrency`` at once and ``rate`` starts per second.
+
+    Items that still fail after ``retries`` retries are written with their ``error``, and are
+    called again by the next run over the same output. ``on_result`` is called with every result
+    as it is written, including resumed ones.
+    """
+    start = time.perf_counter()
+    summary = BatchSummary()
+    done, pending = _resume(output_path)
+    summary.resumed = len(done) + len(pending)
+
+    def report(result: dict) -> None:
+        summary.failed += result["error"] is not None
+        if on_result is not None:
+            on_result(result)
+
+    for result in done:
+        report(result)
+
+    limiter = RateLimiter(rate) if rate else None
+    # Items may start at most this far ahead of the next one to be written, which bounds how many
+    # finished results wait in memory behind a slow item.
+    window = concurrency * 4
+    slots = asyncio.Semaphore(concurrency)
+    progress = asyncio.Condition()
+    next_index = len(done)
+    finished: dict[int, dict] = {}
+
+    with open(output_path, "a") as output, open(pending_path(output_path), "a") as pending_file:
+        def flush() -> None:
+            nonlocal next_index
+            while next_index in finished:
+                result = finished.pop(next_index)
+                output.write(json.dumps(result) + "\n")
+                report(result)
+                next_index += 1
+            output.flush()
+            progress.notify_all()
+
+        async def run_item(index: int, line: str) -> None:
+            error: str | None
+            try:
+                try:
+                    kwargs = json.loads(line)
+                    if not isinstance(kwargs, dict):
+                        raise ValueError("expected a JSON object of keyword arguments")
+                except ValueError as exc:
+                    output_value, error, attempts = None, f"Invalid input line: {exc}", 0
+                    kwargs = line.strip()
+                else:
+                    output_value, error, attempts = await _call_with_retries(call, kwargs, retries, backoff,
+                                                                            limiter)
+                result = {"index": index, "input": kwargs, "output": output_value, "error": error,
+                          "attempts": attempts}
+                pending_file.write(json.dumps(result) + "\n")
+                pending_file.flush()
+                # Recorded only once the result exists; a cancelled item is left for the next run.
+                async with progress:
+                    finished[index] = result
+                    flush()
+            finally:
+                slots.release()
+
+        tasks: set[asyncio.Task] = set()
+        for index, line in _inputs(input_path):
+            summary.total += 1
+            if index < len(done):
+                continue
+            if index in pending:
+                async with progress:
+                    finished[index] = pending[index]
+                    flush()
+                continue
+            async with progress:
+                await progress.wait_for(lambda: index - next_index < window)
+            await slots.acquire()
+            task = asyncio.create_task(run_item(index, line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        async with progress:
+            flush()
+
+    pending_path(output_path).unlink(missing_ok=True)
+    summary.seconds = time.perf_counter() - start
+    return summary
@@ -0,0 +1,189 @@
+"""Persistent LM response cache shared by every process on the machine."""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from dspyfun.utils.path_tools import cache_dir
+from dspyfun.utils.trace_tools import note_cache, signature_name, span
+
+if TYPE_CHECKING:
+    import dspy
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0);
+"""
+
+
+class ResponseCache:
+    """A SQLite cache of LM responses keyed by (model, signature, inputs, temperature).
+
+    The database runs in WAL mode so the API workers and CLI processes can read and write it
+    concurrently. Entries expire ``ttl`` seconds after they are written, and once there are more
+    than ``max_entries`` the least recently read ones are dropped. Hit and miss counts are stored in
+    the database too, so the hit rate covers every process that uses the cache.
+    """
+
+    def __init__(self, path: Path | None = None, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path) if path is not None else cache_dir() / "lm_cache.sqlite3"
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def key(model: str, signature: str, inputs: dict[str, Any], temperature: float | None) -> str:
+        """Hash the parts of an LM call that determine its response."""
+        raw = json.dumps([model, signature, inputs, temperature], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _count(self, name: str) -> None:
+        self._connection().execute("UPDATE counters SET value = value + 1 WHERE name = ?", (name,))
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for ``key``, or None if it is missing or expired."""
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute(
+            "SELECT value FROM responses WHERE key = ? AND created_at > ?", (key, now - self.ttl)
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value and evict expired and least recently used entries."""
+        connection = self._connection()
+        now = time.time()
+        connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, json.dumps(value), now, now)
+        )
+        connection.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+        connection.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def get_or_call(self, key: str, call: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, calling ``call`` and caching its result on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = call()
+            self.set(key, value)
+        return value
+
+    def stats(self) -> dict[str, float]:
+        """Return the shared hit and miss counts, the hit rate and the number of entries."""
+        connection = self._connection()
+        counters = dict(connection.execute("SELECT name, value FROM counters").fetchall())
+        entries = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        connection = self._connection()
+        connection.execute("DELETE FROM responses")
+        connection.execute("UPDATE counters SET value = 0")
+
+
+@functools.cache
+def response_cache() -> ResponseCache:
+    """Get the process-wide response cache."""
+    return ResponseCache(
+        path=os.environ.get("DSPYFUN_LM_CACHE_PATH") or None,
+        ttl=float(os.environ.get("DSPYFUN_LM_CACHE_TTL", DEFAULT_TTL)),
+        max_entries=int(os.environ.get("DSPYFUN_LM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+    )
+
+
+def cache_enabled() -> bool:
+    """Check whether LM response caching is turned on (DSPYFUN_LM_CACHE, on by default)."""
+    return os.environ.get("DSPYFUN_LM_CACHE", "1") == "1"
+
+
+def lm_identity(lm: "dspy.LM") -> tuple[str, float | None]:
+    """Return the model name and default temperature of an LM client."""
+    model = getattr(lm, "model_name", None) or lm.kwargs.get("model", type(lm).__name__)
+    return model, lm.kwargs.get("temperature")
+
+
+def cached_call(signature: str, inputs: dict[str, Any], call: Callable[[], Any],
+                temperature: float | None = None) -> Any:
+    """Run ``call`` through the response cache, keyed on the current dspy LM.
+
+    ``call`` must return something JSON-serializable. The model and, unless given, the
+    temperature are taken from the LM configured in ``dspy.settings``.
+    """
+    import dspy
+
+    if not cache_enabled() or dspy.settings.lm is None:
+        return call()
+    model, lm_temperature = lm_identity(dspy.settings.lm)
+    temperature = lm_temperature if temperature is None else temperature
+    cache = response_cache()
+    note_cache("hit")
+
+    def miss() -> Any:
+        note_cache("miss")
+        return call()
+
+    return cache.get_or_call(cache.key(model, signature, inputs, temperature), miss)
+
+
+def cached_predict(predictor: "dspy.Predict", **inputs) -> "dspy.Prediction":
+    """Call a dspy predictor through the response cache and return its prediction."""
+    import dspy
+
+    signature = predictor.signature
+    name = f"{type(predictor).__name__}:{signature.signature}:{signature.instructions}"
+    if predictor.demos:
+        # Compiled predictors prompt with their demos, so they get answers of their own.
+        name += ":" + json.dumps([dict(demo) for demo in predictor.demos], sort_keys=True, default=str)
+    with span(signature_name(predictor)):
+        values = cached_call(name, inputs, lambda: dict(predictor(**inputs).items()),
+                             temperature=predictor.config.get("temperature"))
+    return dspy.Prediction(**values)
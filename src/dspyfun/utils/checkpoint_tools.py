@@ -0,0 +1,207 @@
+"""Memory-mapped Fibonacci checkpoint store shared by all worker processes."""
+
+import bisect
+import fcntl
+import functools
+import itertools
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+# Each checkpoint file is named after k and its size in hex, e.g. "1000-a2c.ckpt". It holds a header
+# with the byte lengths of F(k) and F(k + 1), followed by both numbers as little-endian unsigned
+# integers.
+_HEADER = struct.Struct("<QQ")
+# The shared counters file holds the hit, miss and eviction counts.
+_COUNTERS = struct.Struct("<QQQ")
+_SUFFIX = ".ckpt"
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_store_dir() -> Path:
+    """Get the checkpoint directory, preferring the shared memory filesystem."""
+    if env_dir := os.environ.get("DSPYFUN_FIB_STORE_DIR"):
+        return Path(env_dir)
+    shm = Path("/dev/shm")
+    base = shm if shm.is_dir() else Path(tempfile.gettempdir())
+    return base / "dspyfun-fib"
+
+
+class CheckpointStore:
+    """Store (F(k), F(k + 1)) pairs in memory-mapped files that every worker can read.
+
+    Entries are written atomically with write-and-rename, so readers never see a partial pair.
+    Each process keeps a sorted index of the stored k with their sizes, taken from the file names,
+    and rescans the directory only when its mtime shows that an entry was added or removed. A
+    lookup is then a bisect and one file read, and the size of the store is a running total.
+    Once the store grows past ``max_bytes``, the entries this process used least recently are
+    evicted. Hit, miss and eviction counters live in a small memory-mapped file guarded by
+    ``flock`` so they aggregate across processes.
+    """
+
+    def __init__(self, root: Path | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root) if root is not None else default_store_dir()
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._counters_path = self.root / "counters"
+        self._lock = threading.RLock()
+        # The index: stored k in ascending order, each one's file name and size, and their total.
+        self._keys: list[int] = []
+        self._files: dict[int, tuple[str, int]] = {}
+        self._bytes = 0
+        # Directory mtime when the index was built.
+        self._scanned: int | None = None
+        # When this process last read or wrote each k, for eviction.
+        self._used: dict[int, int] = {}
+        self._clock = itertools.count(1)
+
+    def __reduce__(self):
+        # Worker processes share one store object per directory, so their index outlives a call.
+        return _open_store, (self.root, self.max_bytes)
+
+    @contextmanager
+    def _counters(self):
+        """Lock the counters file and yield it memory-mapped for writing."""
+        fd = os.open(self._counters_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size < _COUNTERS.size:
+                os.ftruncate(fd, _COUNTERS.size)
+            with mmap.mmap(fd, _COUNTERS.size) as counters:
+                yield counters
+        finally:
+            os.close(fd)
+
+    def record(self, hits: int = 0, misses: int = 0, evictions: int = 0) -> None:
+        """Add to the shared hit, miss and eviction counters."""
+        with self._counters() as counters:
+            old = _COUNTERS.unpack_from(counters)
+            _COUNTERS.pack_into(counters, 0, old[0] + hits, old[1] + misses, old[2] + evictions)
+
+    def _refresh(self) -> None:
+        """Rebuild the index if an entry was added or removed since it was built."""
+        mtime = os.stat(self.root).st_mtime_ns
+        if mtime == self._scanned:
+            return
+        files = {}
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name.endswith(_SUFFIX):
+                    k, _, size = entry.name[:-len(_SUFFIX)].partition("-")
+                    files[int(k, 16)] = (entry.name, int(size, 16))
+        self._files = files
+        self._keys = sorted(files)
+        self._bytes = sum(size for _, size in files.values())
+        self._scanned = mtime
+
+    def get(self, k: int) -> tuple[int, int] | None:
+        """Return the stored (F(k), F(k + 1)) pair, or None if it is not in the store."""
+        with self._lock:
+            self._refresh()
+            if k not in self._files:
+                return None
+            path = self.root / self._files[k][0]
+            self._used[k] = next(self._clock)
+        try:
+            with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                len_a, len_b = _HEADER.unpack_from(view)
+                start = _HEADER.size
+                a = int.from_bytes(view[start:start + len_a], "little")
+                b = int.from_bytes(view[start + len_a:start + len_a + len_b], "little")
+        except FileNotFoundError:
+            # Evicted by another process; the next lookup rescans.
+            self._scanned = None
+            return None
+        except (ValueError, struct.error):
+            return None
+        return a, b
+
+    def nearest(self, n: int) -> tuple[int, tuple[int, int] | None]:
+        """Return the largest stored index k <= n with its pair, or (0, None) if there is none."""
+        with self._lock:
+            self._refresh()
+            keys = self._keys
+        for position in range(bisect.bisect_right(keys, n) - 1, -1, -1):
+            if (pair := self.get(keys[position])) is not None:
+                return keys[position], pair
+        return 0, None
+
+    def put(self, k: int, pair: tuple[int, int]) -> None:
+        """Store the (F(k), F(k + 1)) pair and evict old entries if the store is over budget."""
+        a, b = pair
+        raw_a = a.to_bytes((a.bit_length() + 7) // 8, "little")
+        raw_b = b.to_bytes((b.bit_length() + 7) // 8, "little")
+        size = _HEADER.size + len(raw_a) + len(raw_b)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(_HEADER.pack(len(raw_a), len(raw_b)))
+                file.write(raw_a)
+                file.write(raw_b)
+            os.replace(tmp, self.root / f"{k:x}-{size:x}{_SUFFIX}")
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._used[k] = next(self._clock)
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the store fits in ``max_bytes``."""
+        with self._lock:
+            self._refresh()
+            if self._bytes <= self.max_bytes:
+                return 0
+            total, evicted = self._bytes, 0
+            # Entries this process never used go first, smallest (cheapest to recompute) first.
+            for k in sorted(self._keys, key=lambda k: (self._used.get(k, 0), k)):
+                if total <= self.max_bytes:
+                    break
+                name, size = self._files[k]
+                try:
+                    os.unlink(self.root / name)
+                except FileNotFoundError:
+                    pass
+                else:
+                    evicted += 1
+                self._used.pop(k, None)
+                total -= size
+        if evicted:
+            self.record(evictions=evicted)
+        return evicted
+
+    def stats(self) -> dict[str, int]:
+        """Return the shared counters together with the current size of the store."""
+        with self._counters() as counters:
+            hits, misses, evictions = _COUNTERS.unpack_from(counters)
+        with self._lock:
+            self._refresh()
+            return {"hits": hits, "misses": misses, "evictions": evictions,
+                    "entries": len(self._keys), "bytes": self._bytes}
+
+    def clear(self) -> None:
+        """Remove every checkpoint and reset the counters."""
+        with self._lock:
+            self._refresh()
+            for name, _ in self._files.values():
+                (self.root / name).unlink(missing_ok=True)
+            self._used.clear()
+        with self._counters() as counters:
+            _COUNTERS.pack_into(counters, 0, 0, 0, 0)
+
+
+@functools.cache
+def _open_store(root: Path, max_bytes: int) -> CheckpointStore:
+    return CheckpointStore(root, max_bytes)
+
+
+@functools.cache
+def checkpoint_store() -> CheckpointStore:
+    """Get this process's handle on the shared checkpoint store."""
+    max_bytes = int(os.environ.get("DSPYFUN_FIB_STORE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    return CheckpointStore(max_bytes=max_bytes)
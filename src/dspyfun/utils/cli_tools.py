@@ -1,55 +1,454 @@
+import asyncio
+import codecs
 import os
-import subprocess
+import struct
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from graphlib import TopologicalSorter
 from importlib import import_module
+from pathlib import Path
+from typing import NoReturn, TextIO
 
-import dspy
-import openai
-from rich import print
+import typer
+from typer.core import TyperCommand, TyperGroup
 
-from dspyfun.utils.path_tools import subcommand_dir
+try:
+    # Newer typer releases bundle their own copy of click and type TyperGroup with it.
+    from typer import _click as click  # type: ignore[attr-defined]
+except ImportError:
+    import click  # type: ignore[no-redef]
 
-from rich.markdown import Markdown
+from dspyfun.utils.manifest_tools import load_manifest
 
+# dspy, openai and rich are imported inside the functions that need them, so that commands which
+# never talk to an LM don't pay for importing them.
 
-def run_command(command: str) -> None:
+
+# Lines of stdout and of stderr kept from a command's output for diagnosing failures.
+TAIL_LINES = 100
+# Longest output line kept in a tail; the rest of the line is dropped.
+TAIL_LINE_CHARS = 2000
+
+
+@dataclass
+class CommandResult:
+    """The outcome of a shell command, with only the tail of its output kept."""
+    command: str
+    returncode: int
+    seconds: float
+    stdout_tail: list[str]
+    stderr_tail: list[str]
+
+    def describe(self) -> str:
+        """Summarize the failure for diagnose_error."""
+        parts = [f"Command: {self.command}", f"Exit code: {self.returncode}",
+                 f"Duration: {self.seconds:.1f}s"]
+        for name, tail in (("stderr", self.stderr_tail), ("stdout", self.stdout_tail)):
+            if tail:
+                parts.append(f"Last {len(tail)} lines of {name}:\n" + "\n".join(tail))
+        return "\n".join(parts)
+
+
+# Bytes read from a command's output at a time. Output is echoed as it arrives rather than line
+# by line, so prompts without a trailing newline show up before the command waits for an answer.
+READ_CHUNK = 64 * 1024
+
+
+class _Tail:
+    """Split decoded output into lines, keeping only the last ones."""
+
+    def __init__(self, lines: int):
+        self.lines: deque[str] = deque(maxlen=lines)
+        self._partial = ""
+
+    @staticmethod
+    def _clean(line: str) -> str:
+        # Progress bars redraw a line with carriage returns; keep what was drawn last.
+        return line.rstrip("\r").rsplit("\r", 1)[-1][:TAIL_LINE_CHARS]
+
+    def feed(self, text: str) -> None:
+        *complete, partial = (self._partial + text).split("\n")
+        self.lines.extend(self._clean(line) for line in complete)
+        # Keep the start of an over-long line, like the complete lines are cut.
+        self._partial = partial[:TAIL_LINE_CHARS + 1]
+
+    def close(self) -> list[str]:
+        if self._partial:
+            self.lines.append(self._clean(self._partial))
+            self._partial = ""
+        return list(self.lines)
+
+
+async def _pump(stream: asyncio.StreamReader, sink: TextIO | None, prefix: str, tail: _Tail) -> None:
+    """Echo ``stream`` to ``sink``, if any, as it arrives, keeping its last lines in ``tail``."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    at_line_start = True
+    while chunk := await stream.read(READ_CHUNK):
+        text = decoder.decode(chunk)
+        tail.feed(text)
+        if sink is None:
+            continue
+        if prefix:
+            pieces = []
+            for piece in text.splitlines(keepends=True):
+                pieces.append(prefix + piece if at_line_start else piece)
+                at_line_start = piece.endswith("\n")
+            text = "".join(pieces)
+        sink.write(text)
+        sink.flush()
+    tail.feed(decoder.decode(b"", final=True))
+
+
+async def stream_command(command: str, prefix: str = "", tail_lines: int = TAIL_LINES,
+                         echo: bool = True) -> CommandResult:
+    """Run a shell command, streaming its stdout and stderr live as they are written.
+
+    Only the last ``tail_lines`` lines of each stream are kept, so memory stays bounded however
+    much the command prints. With ``echo`` off the output is only kept, not streamed.
+    """
+    start = time.perf_counter()
+    stdout_tail, stderr_tail = _Tail(tail_lines), _Tail(tail_lines)
+    process = await asyncio.create_subprocess_shell(
+        command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    assert process.stdout is not None and process.stderr is not None
+    await asyncio.gather(_pump(process.stdout, sys.stdout if echo else None, prefix, stdout_tail),
+                         _pump(process.stderr, sys.stderr if echo else None, prefix, stderr_tail))
+    returncode = await process.wait()
+    return CommandResult(command, returncode, time.perf_counter() - start, stdout_tail.close(), stderr_tail.close())
+
+
+def tee_terminal(command: str, tail_lines: int = TAIL_LINES) -> CommandResult:
+    """Run a shell command on a pseudo-terminal, copying its output to ours and keeping a tail.
+
+    The command sees a terminal, so prompts, colours and progress bars work as if it ran
+    directly, and it reads its answers straight from our stdin. Its stdout and stderr share the
+    terminal, so the tail of both is kept as ``stdout_tail``.
+    """
+    import fcntl
+    import pty
+    import subprocess
+    import termios
+
+    start = time.perf_counter()
+    tail = _Tail(tail_lines)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    leader, follower = pty.openpty()
+    try:
+        size = os.get_terminal_size(sys.stdout.fileno())
+        fcntl.ioctl(follower, termios.TIOCSWINSZ, struct.pack("HHHH", size.lines, size.columns, 0, 0))
+    except OSError:
+        pass
+    # Pass newlines through untranslated; our own terminal turns them into line breaks.
+    attributes = termios.tcgetattr(follower)
+    attributes[1] &= ~termios.OPOST
+    termios.tcsetattr(follower, termios.TCSANOW, attributes)
     try:
-        subprocess.run(command, check=True, shell=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error: Command '{command}' failed with exit code {e.returncode}")
-        diagnose_error(str(e))
-        # Kill the script if the command fails
-        raise SystemExit
+        process = subprocess.Popen(command, shell=True, stdout=follower, stderr=follower)
+    finally:
+        os.close(follower)
+    try:
+        while True:
+            try:
+                chunk = os.read(leader, READ_CHUNK)
+            except OSError:
+                # EIO: the command and everything it started closed the terminal.
+                break
+            if not chunk:
+                break
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            tail.feed(decoder.decode(chunk))
+    finally:
+        os.close(leader)
+    returncode = process.wait()
+    tail.feed(decoder.decode(b"", final=True))
+    return CommandResult(command, returncode, time.perf_counter() - start, tail.close(), [])
+
+
+def fail(result: CommandResult) -> NoReturn:
+    """Report a failed command, diagnose it and exit."""
+    print(f"Error: Command '{result.command}' failed with exit code {result.returncode}")
+    diagnose_error(result.describe())
+    # Kill the script if the command fails
+    raise SystemExit
 
 
-class CLIErrorDiagnosis(dspy.Signature):
+def run_command(command: str) -> CommandResult:
+    """Run a shell command, diagnosing it and exiting if it fails.
+
+    When our stdout is a terminal the command runs on one too (see ``tee_terminal``), so
+    interactive commands such as ``gcloud init`` and ``aws configure`` behave as usual.
     """
-    Diagnose CLI errors and provide recommended CLI commands from a Google Cloud Systems Architect's perspective.
+    if os.name == "posix" and sys.stdout.isatty():
+        result = tee_terminal(command)
+    else:
+        result = asyncio.run(stream_command(command))
+    if result.returncode != 0:
+        fail(result)
+    return result
+
+
+@dataclass(frozen=True)
+class Step:
+    """A named shell command for run_steps, started once the steps named in ``after`` succeed."""
+    name: str
+    command: str
+    after: tuple[str, ...] = ()
+
+
+@dataclass
+class StepResult:
+    step: Step
+    status: str = "skipped"
+    result: CommandResult | None = None
+
+
+async def _run_step(step: Step, limit: asyncio.Semaphore, width: int) -> StepResult:
+    """Run one step, echoing its output line by line behind a ``[name]`` prefix."""
+    async with limit:
+        result = await stream_command(step.command, prefix=f"[{step.name:<{width}}] ")
+    return StepResult(step, "ok" if result.returncode == 0 else "failed", result)
+
+
+async def _run_graph(steps: list[Step], concurrency: int) -> list[StepResult]:
+    results = {step.name: StepResult(step) for step in steps}
+    if len(results) != len(steps):
+        raise ValueError("Step names must be unique")
+    for step in steps:
+        if unknown := set(step.after) - results.keys():
+            raise ValueError(f"Step {step.name!r} runs after unknown steps {sorted(unknown)}")
+    graph = TopologicalSorter({step.name: step.after for step in steps})
+    graph.prepare()  # Raises graphlib.CycleError for circular dependencies.
+
+    limit = asyncio.Semaphore(concurrency)
+    width = max((len(step.name) for step in steps), default=0)
+    running: dict[asyncio.Task, str] = {}
+    failed = False
+    while graph.is_active() and not (failed and not running):
+        if not failed:
+            for name in graph.get_ready():
+                running[asyncio.create_task(_run_step(results[name].step, limit, width))] = name
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            name = running.pop(task)
+            results[name] = task.result()
+            if results[name].status == "ok":
+                graph.done(name)
+            else:
+                # Let the steps that already started finish, but start no new ones.
+                failed = True
+    return [results[step.name] for step in steps]
+
+
+def print_step_summary(results: list[StepResult]) -> None:
+    from rich import print
+    from rich.table import Table
+
+    table = Table(title="Steps")
+    table.add_column("step")
+    table.add_column("status")
+    table.add_column("seconds", justify="right")
+    for result in results:
+        seconds = f"{result.result.seconds:.2f}" if result.result else ""
+        table.add_row(result.step.name, result.status, seconds)
+    print(table)
+
+
+def run_steps(steps: list[Step], concurrency: int = 4) -> list[StepResult]:
+    """Run shell commands as a dependency graph, with up to ``concurrency`` of them at once.
+
+    Steps whose dependencies have succeeded run in parallel with their output interleaved line by
+    line, and a timing summary is printed at the end. If a step fails, no further steps are
+    started. Once the running ones have finished, every failed step is reported and diagnosed like
+    in run_command and the script exits.
+    """
+    results = asyncio.run(_run_graph(steps, concurrency))
+    print_step_summary(results)
+    failed = [(result.step, result.result) for result in results
+              if result.status == "failed" and result.result is not None]
+    if failed:
+        print(f"\n{len(failed)} of {len(results)} steps failed:")
+        for step, result in failed:
+            print(f"Error: Step '{step.name}' failed with exit code {result.returncode}")
+            diagnose_error(result.describe())
+        raise SystemExit(1)
+    return results
+
+
+def parse_targets(specs: list[str], targets_file: Path | None, defaults: tuple[str, ...]) -> list[tuple[str, ...]]:
+    """Expand ``NAME[:PART...]`` target specs, given directly or one per line of ``targets_file``.
+
+    Parts left out of a spec are taken from ``defaults``. Blank lines and ``#`` comments in the
+    file are skipped.
     """
-    error_message = dspy.InputField(desc="The error message from the failed CLI command.")
-
-    diagnosis = dspy.OutputField(desc="Detailed diagnosis of the error.")
-    recommended_commands = dspy.OutputField(desc="List of recommended CLI commands to resolve or further investigate the error.")
-
-
-def diagnose_error(error_message: str) -> str:
-    from dspyfun.utils.dspy_tools import init_dspy
-    init_dspy(model="gpt-4o", max_tokens=2000)
-    print(f"Diagnosing error with DSPy...")
-    response = dspy.ChainOfThought(CLIErrorDiagnosis).forward(error_message=error_message)
-    md = Markdown(response.diagnosis)
-    print(md)
-    md = Markdown(response.recommended_commands)
-    print(md)
-    # return f"Diagnosis: {response.diagnosis}\nRecommendations: {response.recommended_commands}"
-
-
-def load_commands():
-    cmd_dir = subcommand_dir()
-
-    for filename in os.listdir(cmd_dir):
-        if filename.endswith("_cmd.py"):
-            module_name = f'{__name__.split(".")[0]}.subcommands.{filename[:-3]}'
-            module = import_module(module_name)
-            if hasattr(module, "app"):
-                from dspyfun.cli import app
-                app.add_typer(module.app, name=filename[:-7], help=module.__doc__)
+    if targets_file is not None:
+        lines = (line.split("#", 1)[0].strip() for line in targets_file.read_text().splitlines())
+        specs = [*specs, *filter(None, lines)]
+    targets = []
+    for spec in specs:
+        parts = spec.split(":")
+        if len(parts) > len(defaults) or not parts[0]:
+            raise typer.BadParameter(f"Expected a name and at most {len(defaults) - 1} more ':'-separated "
+                                     f"parts, got {spec!r}")
+        targets.append(tuple(parts) + defaults[len(parts):])
+    return targets
+
+
+def targets_option(spec: str):
+    """A repeatable ``--target`` option for commands that run through run_targets."""
+    return typer.Option(None, "--target", "-t", help=f"Run for {spec} instead; repeat to fan out over several")
+
+
+def targets_file_option(spec: str):
+    return typer.Option(None, help=f"Run for the {spec} targets listed one per line in this file")
+
+
+def parallel_option(default: int = 4):
+    return typer.Option(default, min=1, help="Targets to run at once")
+
+
+@dataclass
+class TargetResult:
+    """Progress of one target of run_targets; ``result`` is its last command run."""
+    target: str
+    commands: list[str]
+    status: str = "waiting"
+    current: str = ""
+    started: float | None = None
+    seconds: float = 0.0
+    result: CommandResult | None = None
+
+
+async def _run_target(target: TargetResult, limit: asyncio.Semaphore) -> None:
+    async with limit:
+        target.status, target.started = "running", time.perf_counter()
+        for command in target.commands:
+            target.current = command
+            target.result = await stream_command(command, echo=False)
+            if target.result.returncode != 0:
+                target.status = "failed"
+                break
+        else:
+            target.status, target.current = "ok", ""
+        target.seconds = time.perf_counter() - target.started
+
+
+_STATUS_STYLES = {"waiting": "dim", "running": "yellow", "ok": "green", "failed": "bold red"}
+
+
+def target_table(targets: list[TargetResult]):
+    """Render the status, timing and current command of every target."""
+    from rich.table import Table
+
+    table = Table(title="Targets", expand=True)
+    table.add_column("target", no_wrap=True)
+    table.add_column("status", no_wrap=True, min_width=7)
+    table.add_column("seconds", justify="right", no_wrap=True, min_width=7)
+    # The command takes whatever width is left and is cut short rather than wrapped.
+    table.add_column("command", overflow="ellipsis", no_wrap=True, ratio=1)
+    for target in targets:
+        seconds = target.seconds
+        if target.status == "running" and target.started is not None:
+            seconds = time.perf_counter() - target.started
+        table.add_row(target.target, f"[{_STATUS_STYLES[target.status]}]{target.status}",
+                      f"{seconds:.1f}" if target.started is not None else "", target.current)
+    return table
+
+
+def run_targets(targets: dict[str, list[str]], concurrency: int = 4) -> list[TargetResult]:
+    """Run the same operation against many targets, up to ``concurrency`` targets at once.
+
+    ``targets`` maps each target's name to the shell commands that make up the operation for it,
+    run in order. A failing target stops only its own commands. Progress is shown in a live table,
+    and once every target has finished, each failure is reported and diagnosed and the script
+    exits.
+    """
+    from rich.console import Console
+    from rich.live import Live
+
+    results = [TargetResult(name, commands) for name, commands in targets.items()]
+
+    async def run_all() -> None:
+        limit = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(_run_target(target, limit) for target in results))
+
+    console = Console()
+    with Live(get_renderable=lambda: target_table(results), console=console, refresh_per_second=4):
+        asyncio.run(run_all())
+    failed = [(target.target, target.result) for target in results
+              if target.status == "failed" and target.result is not None]
+    if failed:
+        console.print(f"\n[bold red]{len(failed)} of {len(results)} targets failed:")
+        for name, result in failed:
+            console.rule(name)
+            print(result.describe())
+            diagnose_error(result.describe())
+        raise SystemExit(1)
+    return results
+
+
+def diagnose_error(error_message: str) -> None:
+    from rich import print
+    from rich.markdown import Markdown
+
+    from dspyfun.utils.diagnosis_tools import diagnose
+
+    print("Diagnosing error...")
+    diagnosis = diagnose(error_message)
+    print(Markdown(diagnosis.diagnosis))
+    print(Markdown(diagnosis.recommended_commands))
+    print(f"[dim](diagnosis from {diagnosis.source})[/dim]")
+
+
+class LazyGroup(TyperGroup):
+    """A Typer group whose subcommands are described by the cached manifest and imported only
+    when invoked.
+
+    ``--help``, for the whole CLI or for one subcommand, is rendered from the manifest, so no
+    subcommand module is imported until one of its commands actually runs.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._listing = False
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted({*super().list_commands(ctx), *load_manifest()})
+
+    def _described(self, cmd_name: str, entry: dict) -> TyperGroup:
+        """Build a help-only stand-in for a subcommand from its manifest entry."""
+        commands = [TyperCommand(name=command["name"], help=command["help"]) for command in entry["commands"]]
+        return TyperGroup(name=cmd_name, help=entry["help"], commands=commands)
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        command = super().get_command(ctx, cmd_name)
+        entry = load_manifest().get(cmd_name)
+        if command is not None or entry is None:
+            return command
+        if self._listing:
+            return self._described(cmd_name, entry)
+        module = import_module(f'{__name__.split(".")[0]}.subcommands.{entry["module"]}')
+        if not hasattr(module, "app"):
+            return None
+        command = typer.main.get_group(module.app)
+        command.name = cmd_name
+        command.help = module.__doc__ or command.help
+        self.add_command(command, cmd_name)
+        return command
+
+    def resolve_command(self, ctx: click.Context,
+                        args: list[str]) -> tuple[str | None, click.Command | None, list[str]]:
+        # Answer `dspyfun <subcommand> --help` from the manifest too.
+        if len(args) == 2 and args[1] in ctx.help_option_names and args[0] not in self.commands:
+            if (entry := load_manifest().get(args[0])) is not None:
+                return args[0], self._described(args[0], entry), args[1:]
+        return super().resolve_command(ctx, args)
+
+    def format_help(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        self._listing = True
+        try:
+            super().format_help(ctx, formatter)
+        finally:
+            self._listing = False
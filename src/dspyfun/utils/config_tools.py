@@ -0,0 +1,107 @@
+"""Loading the config, atomic saves and hot reloading for long-running processes."""
+
+import asyncio
+import logging
+import os
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+import yaml
+from confz import BaseConfig, FileSource
+from confz.exceptions import ConfigException
+
+from dspyfun.utils import path_tools
+
+logger = logging.getLogger(__name__)
+
+
+class DspyfunConfig(BaseConfig):
+    cluster_name: str
+    zone: str
+    project_id: str
+    # Defaults for the aws subcommands.
+    region: str = "us-east-1"
+    profile: str = "default"
+    # Bumped by every ConfigManager save, so running processes can tell which edit they run with.
+    version: int = 0
+
+
+def config_path() -> Path:
+    """Get the path of the YAML file the config is loaded from."""
+    return path_tools.config_dir() / "dspyfun_config.yaml"
+
+
+_snapshot_lock = threading.Lock()
+# The last loaded config, with the (path, mtime, size, inode) of the file it was parsed from.
+_snapshot: tuple[tuple[str, int, int, int], DspyfunConfig] | None = None
+
+
+def load_config() -> DspyfunConfig:
+    """Return the config, parsing the YAML file only on first use and after it changes on disk."""
+    global _snapshot
+    path = config_path()
+    info = path.stat()
+    # atomic_write gives every save a new inode, so two saves of the same size within the file
+    # system's timestamp granularity are still told apart.
+    key = (str(path), info.st_mtime_ns, info.st_size, info.st_ino)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot[0] == key:
+        return snapshot[1]
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot[0] != key:
+            _snapshot = key, DspyfunConfig(config_sources=FileSource(file=path))
+        return _snapshot[1]
+
+
+def current_config() -> DspyfunConfig:
+    """Return the last loaded config without touching the file system.
+
+    Long-running processes keep the snapshot fresh with ``watch_config``, so hot paths can read
+    the config without a stat or parse per call.
+    """
+    snapshot = _snapshot
+    return snapshot[1] if snapshot is not None else load_config()
+
+
+def atomic_write(path: Path, text: str) -> None:
+    """Replace ``path`` with ``text`` in one rename, so readers see either the old or the new file.
+
+    The file keeps its permissions; a new file is only readable by its owner.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        try:
+            os.fchmod(fd, stat.S_IMODE(path.stat().st_mode))
+        except FileNotFoundError:
+            pass
+        with os.fdopen(fd, "w") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+async def watch_config(interval: float = 1.0) -> None:
+    """Poll the config file every ``interval`` seconds and swap in a new snapshot when it changes.
+
+    Readers using ``current_config()`` pick up the new values on their next call, without
+    locks or restarts. A file that fails to parse is logged and the previous snapshot is kept.
+    """
+    config = current_config()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            latest = load_config()
+        except (OSError, ValueError, yaml.YAMLError, ConfigException) as exc:
+            logger.warning("Keeping config version %d, the config file could not be loaded: %s",
+                           config.version, exc)
+            continue
+        if latest is not config:
+            logger.info("Reloaded config version %d", latest.version)
+            config = latest
@@ -0,0 +1,233 @@
+"""A warm CLI daemon, so short commands skip interpreter startup and heavy imports.
+
+``dspyfun daemon start`` imports typer, dspy, openai, pydantic and confz once and then listens on a
+Unix socket. The thin client in this module, installed as ``dspyfun-client``, passes its argv, env,
+cwd and stdin/stdout/stderr file descriptors to the daemon, which forks a child per invocation to
+run the CLI with them and reports back the exit code. Subcommand modules are imported in the child,
+so every invocation still sees the current config file.
+
+Importing this module loads only the standard library and ``path_tools``, so that the client starts
+fast; ``dspyfun`` itself loads its config lazily for the same reason.
+"""
+
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+from importlib import import_module
+from pathlib import Path
+
+from dspyfun.utils import path_tools
+
+# Imported by the daemon before it accepts connections, in this order. Missing ones are skipped.
+PRELOAD = ("yaml", "pydantic", "confz", "rich", "typer", "inquirer", "openai", "dspy", "dspyfun.cli")
+
+# Seconds the daemon waits for a client to send its request, so a stalled client can't block others.
+HANDSHAKE_TIMEOUT = float(os.environ.get("DSPYFUN_DAEMON_HANDSHAKE_TIMEOUT", "5"))
+
+_HEADER = struct.Struct("!I")
+
+
+def socket_path() -> Path:
+    """Get the path of the daemon's socket, honoring DSPYFUN_DAEMON_SOCKET and XDG_RUNTIME_DIR."""
+    if path := os.environ.get("DSPYFUN_DAEMON_SOCKET"):
+        return Path(path)
+    if runtime_dir := os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(runtime_dir) / "dspyfun" / "daemon.sock"
+    return path_tools.cache_dir() / "daemon.sock"
+
+
+def _send(sock: socket.socket, message: dict) -> None:
+    data = json.dumps(message).encode()
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("The connection closed mid-message")
+        data += chunk
+    return data
+
+
+def _receive(sock: socket.socket) -> dict:
+    (size,) = _HEADER.unpack(_receive_exactly(sock, _HEADER.size))
+    return json.loads(_receive_exactly(sock, size))
+
+
+def _connect(path: Path) -> socket.socket | None:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+
+def _request(path: Path, message: dict) -> dict | None:
+    """Send ``message`` with this process's stdio to the daemon and return its first reply, or
+    ``None`` when no daemon is listening."""
+    sock = _connect(path)
+    if sock is None:
+        return None
+    with sock:
+        socket.send_fds(sock, [b"\0"], [0, 1, 2])
+        _send(sock, message)
+        return _receive(sock)
+
+
+def daemon_status(path: Path | None = None) -> dict | None:
+    """Return the daemon's pid, uptime and number of served commands, or ``None`` if it is not running."""
+    return _request(path or socket_path(), {"control": "status"})
+
+
+def stop_daemon(path: Path | None = None) -> dict | None:
+    """Ask the daemon to exit after it has handed off the commands it accepted so far."""
+    return _request(path or socket_path(), {"control": "stop"})
+
+
+def run_client(args: list[str], path: Path | None = None) -> int | None:
+    """Run ``dspyfun <args>`` in the daemon and return its exit code, or ``None`` if it is not running."""
+    sock = _connect(path or socket_path())
+    if sock is None:
+        return None
+    with sock:
+        socket.send_fds(sock, [b"\0"], [0, 1, 2])
+        _send(sock, {"argv": args, "env": dict(os.environ), "cwd": os.getcwd()})
+        pid = _receive(sock)["pid"]
+        # The terminal signals only this process, so pass Ctrl-C and friends on to the command.
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(signum, lambda received, _: os.kill(pid, received))
+        try:
+            return _receive(sock)["exit_code"]
+        except ConnectionError:
+            # The command was killed before it could report back.
+            return 1
+
+
+def main() -> None:
+    """Entry point of ``dspyfun-client``: run the command in the daemon, or in-process without one."""
+    code = run_client(sys.argv[1:])
+    if code is None:
+        from dspyfun.cli import app
+
+        app(prog_name="dspyfun")
+    sys.exit(code)
+
+
+def _preload() -> None:
+    for name in PRELOAD:
+        try:
+            import_module(name)
+        except ImportError:
+            pass
+
+
+def _exit_code(code: object) -> int:
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _run_command(conn: socket.socket, fds: list[int], request: dict) -> int:
+    """Become the client's command: take over its stdio, cwd and env, then run the CLI."""
+    for signum in (signal.SIGCHLD, signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    sys.stdin = sys.__stdin__ = open(0, closefd=False)
+    sys.stdout = sys.__stdout__ = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)
+    sys.stderr = sys.__stderr__ = open(2, "w", buffering=1, closefd=False)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = ["dspyfun", *request["argv"]]
+    _send(conn, {"pid": os.getpid()})
+
+    from dspyfun.cli import app
+
+    try:
+        app(args=request["argv"], prog_name="dspyfun")
+        code = 0
+    except SystemExit as exc:
+        code = _exit_code(exc.code)
+    except BaseException:
+        # Report it the way the CLI's own excepthook would have in a cold start.
+        sys.excepthook(*sys.exc_info())
+        code = 1
+    for stream in (sys.stdout, sys.stderr):
+        stream.flush()
+    _send(conn, {"exit_code": code})
+    return code
+
+
+def serve(path: Path | None = None) -> None:
+    """Preload the CLI's imports and serve commands on the socket at ``path`` until stopped."""
+    path = path or socket_path()
+    if daemon_status(path) is not None:
+        raise RuntimeError(f"A daemon is already listening on {path}")
+    _preload()
+    path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    path.unlink(missing_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        server.bind(str(path))
+    finally:
+        os.umask(umask)
+    server.listen()
+    # Let the kernel reap finished commands, and exit cleanly on SIGTERM.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    started, served = time.time(), 0
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                conn.settimeout(HANDSHAKE_TIMEOUT)
+                fds = []
+                try:
+                    _, fds, _, _ = socket.recv_fds(conn, 1, 3)
+                    request = _receive(conn)
+                except (OSError, ValueError):
+                    for fd in fds:
+                        os.close(fd)
+                    continue
+                conn.settimeout(None)
+                if "control" in request:
+                    for fd in fds:
+                        os.close(fd)
+                    _send(conn, {"pid": os.getpid(), "uptime": time.time() - started, "served": served})
+                    if request["control"] == "stop":
+                        return
+                    continue
+                if os.fork() == 0:
+                    server.close()
+                    try:
+                        _run_command(conn, fds, request)
+                    except BaseException:
+                        traceback.print_exc()
+                    finally:
+                        os._exit(0)
+                served += 1
+                for fd in fds:
+                    os.close(fd)
+    finally:
+        server.close()
+        path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
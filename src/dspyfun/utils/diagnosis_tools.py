@@ -0,0 +1,181 @@
+"""Diagnose failed CLI commands from a rule table, a local cache, or an LM, in that order."""
+
+import hashlib
+import re
+from dataclasses import dataclass
+
+# The model asked when neither a rule nor the cache has an answer.
+DIAGNOSIS_MODEL = "gpt-4o"
+
+# Variable parts of error output, replaced in this order so that e.g. a timestamp is not first
+# split up by the number pattern.
+_VOLATILE = [
+    (re.compile(r"\x1b\[[0-9;]*[A-Za-z]"), ""),
+    (re.compile(r"^duration: .*$", re.MULTILINE), ""),
+    (re.compile(r"\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(z|[+-]\d{2}:?\d{2})?"), "<time>"),
+    (re.compile(r"\b\d{1,2}:\d{2}:\d{2}(\.\d+)?\b"), "<time>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<id>"),
+    (re.compile(r"\b(arn:aws[\w:/-]*|(sg|vpc|subnet|i|ami|vol|eni)-[0-9a-f]{6,})\b"), "<id>"),
+    (re.compile(r"\b(\d{1,3}\.){3}\d{1,3}(/\d+)?\b"), "<ip>"),
+    (re.compile(r"(~|\.{1,2})?(/[\w.@%+-]+)+/?"), "<path>"),
+    (re.compile(r"\b[0-9a-f]{12,}\b"), "<id>"),
+    (re.compile(r"\d+"), "<n>"),
+    (re.compile(r"[ \t]+"), " "),
+    (re.compile(r"\n\s*\n+"), "\n"),
+]
+
+
+def normalize_error(error_message: str) -> str:
+    """Strip the parts of an error that vary between occurrences: IDs, paths, timestamps, numbers.
+
+    >>> normalize_error("Error 403 at 2024-05-01T10:00:00Z reading /home/me/.kube/config")
+    'error <n> at <time> reading <path>'
+    """
+    text = error_message.lower()
+    for pattern, replacement in _VOLATILE:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def error_signature(error_message: str) -> str:
+    """Hash the normalized error, so recurrences of the same failure share one key."""
+    return hashlib.sha256(normalize_error(error_message).encode()).hexdigest()
+
+
+def command_tool(error_message: str) -> str:
+    """Return the executable of the failed command, taken from the ``Command:`` line."""
+    match = re.search(r"^Command: *(?:sudo +)?(\S+)", error_message, re.MULTILINE)
+    return match.group(1).rsplit("/", 1)[-1] if match else ""
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A known failure: every keyword must occur in the normalized error for the rule to match."""
+    tool: str
+    keywords: tuple[str, ...]
+    diagnosis: str
+    recommended_commands: str
+
+
+@dataclass(frozen=True)
+class Diagnosis:
+    diagnosis: str
+    recommended_commands: str
+    # Where the answer came from: "rule", "cache" or "lm".
+    source: str
+
+
+# Keywords are taken from the tools' own error messages, as they read after normalize_error, so that
+# a word such as "quota" or "expired" elsewhere in the output does not match.
+RULES = [
+    Rule("gcloud", ("no credentialed accounts.",), "gcloud has no authenticated account.",
+         "gcloud auth login"),
+    Rule("gcloud", ("you do not currently have an active account selected",),
+         "gcloud has no active account selected.",
+         "gcloud auth login\ngcloud config set account <account>"),
+    Rule("gcloud", ("has not been used in project <n> before or it is disabled",),
+         "The API is not enabled for this project.",
+         "gcloud services enable container.googleapis.com"),
+    Rule("gcloud", ("api is not enabled",), "The API is not enabled for this project.",
+         "gcloud services list --enabled\ngcloud services enable container.googleapis.com"),
+    Rule("gcloud", ("permission_denied:",), "The active account lacks an IAM permission on the project.",
+         "gcloud auth list\ngcloud projects get-iam-policy <project>"),
+    Rule("gcloud", ("quota exceeded for quota metric",), "A quota for the project or region is exhausted.",
+         "gcloud compute regions describe <region>\ngcloud services list --enabled"),
+    Rule("gcloud", ("quota '", "' exceeded. limit:"), "A quota for the project or region is exhausted.",
+         "gcloud compute regions describe <region>\ngcloud services list --enabled"),
+    Rule("gcloud", ("message=already exists",), "The resource already exists.",
+         "gcloud container clusters list"),
+    Rule("aws", ("unable to locate credentials",), "The AWS CLI has no credentials configured.",
+         "aws configure\naws configure list"),
+    Rule("aws", ("the config profile (", ") could not be found"), "The AWS profile does not exist.",
+         "aws configure list-profiles\naws configure --profile <profile>"),
+    Rule("aws", ("(expiredtoken) when calling",), "The AWS session token has expired.",
+         "aws sso login --profile <profile>\naws sts get-caller-identity"),
+    Rule("aws", ("token has expired and refresh failed",), "The AWS session token has expired.",
+         "aws sso login --profile <profile>\naws sts get-caller-identity"),
+    Rule("aws", ("is not authorized to perform:",), "The AWS identity lacks an IAM permission.",
+         "aws sts get-caller-identity\naws iam get-user"),
+    Rule("aws", ("(accessdenied) when calling",), "The AWS identity lacks an IAM permission.",
+         "aws sts get-caller-identity\naws iam get-user"),
+    Rule("aws", ("(invalidpermission.duplicate) when calling",),
+         "The security group rule already exists, nothing to do.",
+         "aws ec2 describe-security-groups --group-ids <security-group-id>"),
+    Rule("aws", ("(invalidgroup.notfound) when calling",), "The security group ID is wrong or in another region.",
+         "aws ec2 describe-security-groups --region <region>"),
+    Rule("aws", ("(invalidgroupid.malformed) when calling",), "The security group ID is wrong or in another region.",
+         "aws ec2 describe-security-groups --region <region>"),
+    Rule("kubectl", ("the connection to the server ", " was refused - did you specify the right host or port?"),
+         "kubectl has no reachable cluster configured.",
+         "dspyfun gc creds\nkubectl config current-context"),
+    Rule("kubectl", ("you must be logged in to the server",),
+         "kubectl's credentials for the cluster are missing or expired.",
+         "dspyfun gc creds\nkubectl config view --minify"),
+    Rule("kubectl", ("error from server (forbidden):",), "The Kubernetes user lacks RBAC permissions.",
+         "kubectl auth can-i --list\ndspyfun k8 fix"),
+    Rule("helm", ("kubernetes cluster unreachable:",), "Helm cannot reach the current Kubernetes context.",
+         "kubectl config current-context\ndspyfun gc creds"),
+]
+
+# Commands run through /bin/sh, which reports a missing tool as "sh: 1: helm: not found" when it is
+# dash and as "sh: helm: command not found" when it is bash.
+RULES += [
+    Rule(tool, (f"{tool}: {message}",), f"{name} is not installed or not on PATH.", f"dspyfun {subcommand} install")
+    for tool, name, subcommand in [("gcloud", "The Google Cloud SDK", "gc"), ("aws", "The AWS CLI", "aws"),
+                                   ("kubectl", "kubectl", "k8"), ("helm", "Helm", "helm")]
+    for message in ("command not found", "not found")
+]
+
+
+class RuleIndex:
+    """Rules indexed by tool, so a failure is only checked against the rules for its command."""
+
+    def __init__(self, rules: list[Rule]):
+        self._by_tool: dict[str, list[Rule]] = {}
+        for rule in rules:
+            self._by_tool.setdefault(rule.tool, []).append(rule)
+
+    def match(self, error_message: str) -> Rule | None:
+        """Return the first rule for the failed command's tool whose keywords all occur in its output."""
+        text = normalize_error(re.sub(r"^Command:.*$", "", error_message, flags=re.MULTILINE))
+        for rule in self._by_tool.get(command_tool(error_message), []):
+            if all(keyword in text for keyword in rule.keywords):
+                return rule
+        return None
+
+
+RULE_INDEX = RuleIndex(RULES)
+
+
+def _ask_lm(error_message: str) -> dict[str, str]:
+    import dspy
+
+    from dspyfun.modules.cli_error_diagnosis_module import CLIErrorDiagnosis
+    from dspyfun.utils.dspy_tools import init_dspy
+
+    init_dspy(model=DIAGNOSIS_MODEL, max_tokens=2000)
+    response = dspy.ChainOfThought(CLIErrorDiagnosis).forward(error_message=error_message)
+    return {"diagnosis": response.diagnosis, "recommended_commands": response.recommended_commands}
+
+
+def diagnose(error_message: str) -> Diagnosis:
+    """Diagnose a failed command, asking the LM only for failures no rule or earlier answer covers.
+
+    LM answers are cached by the error's signature, so a failure that recurs with different IDs,
+    paths or timestamps is answered from the cache.
+    """
+    if (rule := RULE_INDEX.match(error_message)) is not None:
+        return Diagnosis(rule.diagnosis, rule.recommended_commands, "rule")
+
+    from dspyfun.utils.cache_tools import cache_enabled, response_cache
+
+    cache = response_cache() if cache_enabled() else None
+    key = None
+    if cache is not None:
+        key = cache.key(DIAGNOSIS_MODEL, "CLIErrorDiagnosis", {"signature": error_signature(error_message)}, None)
+        if (cached := cache.get(key)) is not None:
+            return Diagnosis(**cached, source="cache")
+    answer = _ask_lm(error_message)
+    if cache is not None:
+        cache.set(key, answer)
+    return Diagnosis(**answer, source="lm")
@@ -1,21 +1,250 @@
+import logging
+import os
+import queue
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
 import dspy
+import requests
+from dsp.modules.ollama import post_request_metadata
+from requests.adapters import HTTPAdapter
+
+from dspyfun.utils.cache_tools import lm_identity
+from dspyfun.utils.trace_tools import trace_request
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections each SessionOllamaLocal holds open, so that many threads can share one client.
+SESSION_POOL_SIZE = 16
+# Requests a long-lived LM client remembers for inspect_history; older ones are forgotten.
+LM_HISTORY_SIZE = 100
 
 
 def init_dspy(model: str = "gpt-3.5-turbo-instruct", lm_class=dspy.OpenAI, max_tokens: int = 800, lm_instance=None, api_key=None):
     if lm_instance:
-        dspy.settings.configure(lm=lm_instance)
+        dspy.settings.configure(lm=instrument(lm_instance))
         return lm_instance
     else:
-        lm = lm_class(max_tokens=max_tokens, model=model, api_key=api_key)
+        lm = lm_registry.get(lm_class, model, max_tokens, api_key=api_key)
         dspy.settings.configure(lm=lm)
         return lm
 
 
 def init_ol(model: str = "phi3:instruct", max_tokens: int = 800, lm_instance=None, lm_class=dspy.OllamaLocal, timeout=10):
     if lm_instance:
-        dspy.settings.configure(lm=lm_instance)
+        dspy.settings.configure(lm=instrument(lm_instance))
         return lm_instance
     else:
-        lm = lm_class(model=model, max_tokens=max_tokens, timeout_s=timeout)
+        lm = lm_registry.get(lm_class, model, max_tokens, timeout)
         dspy.settings.configure(lm=lm)
         return lm
+
+
+def instrument(lm: dspy.LM) -> dspy.LM:
+    """Record every request ``lm`` sends while tracing is on (see ``dspyfun.utils.trace_tools``)."""
+    if not getattr(lm.basic_request, "traced", False):
+        model, _ = lm_identity(lm)
+        lm.basic_request = trace_request(model, lm.basic_request)
+        lm.basic_request.traced = True
+    return lm
+
+
+class LMHistory(list):
+    """An LM client's request history that only keeps the last ``size`` entries."""
+
+    def __init__(self, entries=(), size: int = LM_HISTORY_SIZE):
+        super().__init__(entries)
+        self.size = size
+        del self[:-size]
+
+    def append(self, entry) -> None:
+        super().append(entry)
+        if len(self) > self.size:
+            del self[0]
+
+
+def bound_history(lm: dspy.LM, size: int = LM_HISTORY_SIZE) -> dspy.LM:
+    """Keep only the last ``size`` requests in ``lm.history``, so clients that live as long as the
+    process don't grow with every request."""
+    if not isinstance(lm.history, LMHistory):
+        lm.history = LMHistory(lm.history, size)
+    return lm
+
+
+class SessionOllamaLocal(dspy.OllamaLocal):
+    """OllamaLocal that reuses one keep-alive HTTP session instead of a new connection per call."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SESSION_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def basic_request(self, prompt: str, **kwargs):
+        raw_kwargs = kwargs
+        kwargs = {**self.kwargs, **kwargs}
+        request_info = post_request_metadata(self.model_name, prompt)
+        request_info["choices"] = []
+        settings_dict = {
+            "model": self.model_name,
+            "options": {k: v for k, v in kwargs.items() if k not in ["n", "max_tokens"]},
+            "stream": False,
+        }
+        if self.model_type == "chat":
+            settings_dict["messages"] = [{"role": "user", "content": prompt}]
+            url = f"{self.base_url}/api/chat"
+        else:
+            settings_dict["prompt"] = prompt
+            url = f"{self.base_url}/api/generate"
+
+        eval_tokens = 0
+        response_json = {}
+        for i in range(kwargs["n"]):
+            response = self.session.post(url, json=settings_dict, timeout=self.timeout_s)
+            response.raise_for_status()
+            response_json = response.json()
+            text = (response_json["message"]["content"] if self.model_type == "chat"
+                    else response_json["response"])
+            request_info["choices"].append({
+                "index": i,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            })
+            eval_tokens += response_json.get("eval_count", 0)
+
+        prompt_tokens = response_json.get("prompt_eval_count", self._prev_prompt_eval_count)
+        request_info["additional_kwargs"] = {k: v for k, v in response_json.items() if k != "response"}
+        request_info["usage"] = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": eval_tokens,
+            "total_tokens": prompt_tokens + eval_tokens,
+        }
+        self.history.append({"prompt": prompt, "response": request_info, "kwargs": kwargs, "raw_kwargs": raw_kwargs})
+        return request_info
+
+    def close(self) -> None:
+        """Close the underlying HTTP session."""
+        self.session.close()
+
+
+class LMPool:
+    """A fixed set of LM clients that callers borrow instead of configuring dspy globally.
+
+    Borrowing scopes the client to the current thread with ``dspy.context``, so concurrent requests
+    never touch the process-wide ``dspy.settings``.
+    """
+
+    def __init__(self, factory: Callable[[], dspy.LM], size: int = 4):
+        self.size = size
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(bound_history(factory()))
+
+    @contextmanager
+    def borrow(self, timeout: float | None = None) -> Iterator[dspy.LM]:
+        """Take an idle client, make it the current dspy LM, and hand it back afterwards."""
+        lm = self._idle.get(timeout=timeout)
+        try:
+            with dspy.context(lm=lm):
+                yield lm
+        finally:
+            self._give_back(lm)
+
+    def _give_back(self, lm: dspy.LM) -> None:
+        if self._closed:
+            self._close_lm(lm)
+        else:
+            self._idle.put(lm)
+
+    def warmup(self, prompt: str = "Hello") -> None:
+        """Send one short request through every client to open its connections ahead of traffic."""
+        lms = [self._idle.get() for _ in range(self.size)]
+        try:
+            for lm in lms:
+                try:
+                    lm(prompt, max_tokens=1)
+                except Exception as exc:
+                    logger.warning("LM warmup failed: %s", exc)
+                    return
+        finally:
+            for lm in lms:
+                self._give_back(lm)
+
+    @staticmethod
+    def _close_lm(lm: dspy.LM) -> None:
+        if close := getattr(lm, "close", None):
+            close()
+
+    def close(self) -> None:
+        """Close the idle clients' HTTP sessions; borrowed clients are closed when they come back."""
+        self._closed = True
+        while True:
+            try:
+                lm = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close_lm(lm)
+
+
+class LMRegistry:
+    """Shared LM clients, built once per (lm_class, model, max_tokens, timeout) and reused by every
+    later call in the process.
+
+    ``dspy.OllamaLocal`` is served as a SessionOllamaLocal, so its connections are kept alive. The
+    OpenAI clients already share the openai module's connection pool. Clients are safe to use from
+    several threads at once; call ``close`` when the process is done with them.
+    """
+
+    # Keep-alive replacements for LM classes that open a new connection per request.
+    KEEP_ALIVE = {dspy.OllamaLocal: SessionOllamaLocal}
+
+    def __init__(self):
+        self._lms: dict[tuple, dspy.LM] = {}
+        self._lock = threading.Lock()
+
+    def get(self, lm_class: type, model: str, max_tokens: int, timeout: float | None = None, **kwargs) -> dspy.LM:
+        """Return the shared client for these settings, building it on first use.
+
+        Extra constructor arguments that are not ``None`` become part of the key as well.
+        """
+        kwargs = {name: value for name, value in kwargs.items() if value is not None}
+        key = (lm_class, model, max_tokens, timeout, tuple(sorted(kwargs.items())))
+        if (lm := self._lms.get(key)) is not None:
+            return lm
+        with self._lock:
+            if (lm := self._lms.get(key)) is None:
+                lm = self._lms[key] = self._build(lm_class, model, max_tokens, timeout, kwargs)
+            return lm
+
+    def _build(self, lm_class: type, model: str, max_tokens: int, timeout: float | None, kwargs: dict) -> dspy.LM:
+        if issubclass(lm_class, dspy.OllamaLocal):
+            lm_class = self.KEEP_ALIVE.get(lm_class, lm_class)
+            lm = lm_class(model=model, max_tokens=max_tokens, timeout_s=timeout or 120, **kwargs)
+        else:
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+            lm = lm_class(model=model, max_tokens=max_tokens, **kwargs)
+        return bound_history(instrument(lm))
+
+    def __len__(self) -> int:
+        return len(self._lms)
+
+    def close(self) -> None:
+        """Close the clients' HTTP sessions and forget them; later calls build new ones."""
+        with self._lock:
+            lms, self._lms = list(self._lms.values()), {}
+        for lm in lms:
+            if close := getattr(lm, "close", None):
+                close()
+
+    def _forget(self) -> None:
+        # A forked child must not share its parent's sockets, so it starts with no clients.
+        self._lock = threading.Lock()
+        self._lms = {}
+
+
+lm_registry = LMRegistry()
+os.register_at_fork(after_in_child=lm_registry._forget)
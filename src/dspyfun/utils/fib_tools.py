@@ -0,0 +1,201 @@
+"""Fibonacci engine based on fast doubling."""
+
+import json
+import sys
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from dspyfun.utils.checkpoint_tools import CheckpointStore
+
+# Below 2**CHECKPOINT_MIN_LEVEL computing from scratch is cheaper than touching the store.
+CHECKPOINT_MIN_LEVEL = 12
+# Only multiples of the stride are stored, which includes every power of two from
+# 2**CHECKPOINT_MIN_LEVEL up, so arbitrary n never fill the store.
+CHECKPOINT_STRIDE = 1 << CHECKPOINT_MIN_LEVEL
+# A checkpoint k is only used for n when n - k <= k / 2**CHECKPOINT_REACH_SHIFT.
+CHECKPOINT_REACH_SHIFT = 3
+
+
+def fib_pair(n: int) -> tuple[int, int]:
+    """Return the pair (F(n), F(n + 1)) using fast doubling.
+
+    The bits of ``n`` are walked from the most significant one down, applying
+
+        F(2k)     = F(k) * (2 * F(k + 1) - F(k))
+        F(2k + 1) = F(k) ** 2 + F(k + 1) ** 2
+
+    so only O(log n) big-integer multiplications are needed and no memo table is kept.
+
+    >>> fib_pair(10)
+    (55, 89)
+    """
+    if n < 0:
+        raise ValueError(f"n must be non-negative, got {n}")
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        c = a * ((b << 1) - a)
+        d = a * a + b * b
+        if bit == "1":
+            a, b = d, c + d
+        else:
+            a, b = c, d
+    return a, b
+
+
+def fib_double(pair: tuple[int, int]) -> tuple[int, int]:
+    """Map (F(k), F(k + 1)) to (F(2k), F(2k + 1)).
+
+    >>> fib_double((5, 8))
+    (55, 89)
+    """
+    a, b = pair
+    return a * ((b << 1) - a), a * a + b * b
+
+
+def fib_add(left: tuple[int, int], right: tuple[int, int]) -> tuple[int, int]:
+    """Map (F(m), F(m + 1)) and (F(k), F(k + 1)) to (F(m + k), F(m + k + 1)).
+
+    >>> fib_add((5, 8), (13, 21))
+    (144, 233)
+    """
+    a, b = left
+    c, d = right
+    # F(m + k) = a*d + b*c - a*c and F(m + k + 1) = b*d + a*c, with a*d + b*c taken from a single
+    # product so the step costs three multiplications instead of four.
+    ac = a * c
+    bd = b * d
+    return (a + b) * (c + d) - (ac << 1) - bd, bd + ac
+
+
+def _power_pair(level: int, store: "CheckpointStore") -> tuple[int, int]:
+    """Return (F(2**level), F(2**level + 1)), doubling up from the nearest stored power of two."""
+    pair = store.get(1 << level)
+    if pair is not None:
+        return pair
+    start = level - 1
+    while start >= CHECKPOINT_MIN_LEVEL and (pair := store.get(1 << start)) is None:
+        start -= 1
+    if pair is None:
+        start, pair = 0, (1, 1)
+    while start < level:
+        pair = fib_double(pair)
+        start += 1
+        if start >= CHECKPOINT_MIN_LEVEL:
+            store.put(1 << start, pair)
+    return pair
+
+
+def _within_reach(k: int, n: int) -> bool:
+    """Check whether advancing from checkpoint k to n is cheaper than fast doubling n."""
+    return 0 < k <= n and n - k <= k >> CHECKPOINT_REACH_SHIFT
+
+
+def _stride_pair(k: int, store: "CheckpointStore") -> tuple[int, int]:
+    """Compute and store (F(k), F(k + 1)) for a multiple k of the stride, from the power of two below
+    k when that is close enough."""
+    level = k.bit_length() - 1
+    if k == 1 << level:
+        return _power_pair(level, store)
+    if _within_reach(1 << level, k):
+        pair = fib_add(_power_pair(level, store), fib_pair(k - (1 << level)))
+    else:
+        pair = fib_pair(k)
+    store.put(k, pair)
+    return pair
+
+
+def fib_pair_checkpointed(n: int, store: "CheckpointStore") -> tuple[int, int]:
+    """Return (F(n), F(n + 1)), reusing and extending the checkpoints in ``store``.
+
+    The computation starts from the nearest stored checkpoint k <= n, using
+    F(n) = F(k + (n - k)). Because that addition multiplies full-size numbers, it only beats plain
+    fast doubling when n - k is small compared to k. Without such a checkpoint, the multiple of
+    CHECKPOINT_STRIDE just below n is computed and stored first, so other workers can start from
+    it; when even that is too far, n is computed from scratch. A lookup served from the store
+    counts as a hit and one computed from scratch as a miss.
+    """
+    if n < 1 << CHECKPOINT_MIN_LEVEL:
+        return fib_pair(n)
+    k, base = store.nearest(n)
+    if k == n:
+        store.record(hits=1)
+        return base
+    if _within_reach(k, n):
+        store.record(hits=1)
+        return fib_add(base, fib_pair(n - k))
+    store.record(misses=1)
+    k = n - n % CHECKPOINT_STRIDE
+    if not _within_reach(k, n):
+        return fib_pair(n)
+    base = _stride_pair(k, store)
+    return base if k == n else fib_add(base, fib_pair(n - k))
+
+
+def fibonacci(n: int, store: "CheckpointStore | None" = None) -> int:
+    """Return the n-th Fibonacci number, optionally sharing work through a checkpoint store.
+
+    >>> [fibonacci(i) for i in range(10)]
+    [0, 1, 1, 2, 3, 5, 8, 13, 21, 34]
+    """
+    if store is None:
+        return fib_pair(n)[0]
+    if n < 0:
+        raise ValueError(f"n must be non-negative, got {n}")
+    return fib_pair_checkpointed(n, store)[0]
+
+
+def fibonacci_text(n: int, store: "CheckpointStore | None" = None) -> str:
+    """Return the n-th Fibonacci number in decimal.
+
+    Like ``fib_sweep_ndjson``, this lets the process that computes a large number also pay for its
+    conversion to text.
+
+    >>> fibonacci_text(90)
+    '2880067194370816120'
+    """
+    return str(fibonacci(n, store))
+
+
+def allow_long_decimals() -> None:
+    """Lift Python's int -> str digit limit, so Fibonacci numbers of any size can be written out.
+
+    Used as the initializer of compute processes, which do not inherit the limit of their parent.
+    """
+    sys.set_int_max_str_digits(0)
+
+
+def fib_sweep(ns: Iterable[int]) -> Iterator[tuple[int, int]]:
+    """Yield (n, F(n)) for every n in ascending order, computed in one incremental pass.
+
+    Only the current (F(n), F(n + 1)) pair is kept between results. Each step advances it by the
+    gap to the next n, or recomputes from scratch when the gap is too large for advancing to pay
+    off.
+
+    >>> list(fib_sweep([10, 3, 10, 12]))
+    [(3, 2), (10, 55), (10, 55), (12, 144)]
+    """
+    current, pair = 0, (0, 1)
+    for n in sorted(ns):
+        if n < 0:
+            raise ValueError(f"n must be non-negative, got {n}")
+        if n != current:
+            if _within_reach(current, n):
+                pair = fib_add(pair, fib_pair(n - current))
+            else:
+                pair = fib_pair(n)
+            current = n
+        yield n, pair[0]
+
+
+def fib_sweep_ndjson(ns: list[int]) -> str:
+    """Run fib_sweep over ``ns`` and render the results as NDJSON lines.
+
+    Converting large Fibonacci numbers to decimal costs about as much as computing them, so it
+    is done here, in the process running the sweep, and only the text is sent back.
+
+    >>> print(fib_sweep_ndjson([7, 3]), end="")
+    {"n": 3, "result": 2}
+    {"n": 7, "result": 13}
+    """
+    return "".join(json.dumps({"n": n, "result": result}) + "\n" for n, result in fib_sweep(ns))
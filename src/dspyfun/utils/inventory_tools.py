@@ -0,0 +1,157 @@
+"""A local TTL cache of cloud inventory listings, such as projects and profiles.
+
+Interactive menus render straight from the cache. A listing older than its TTL is still served,
+while a detached process refreshes it for the next run, so only the very first listing (or an
+explicit ``--refresh``) waits for the cloud CLI. Listings are cached per gcloud account or AWS
+config file, so switching accounts never shows another account's inventory.
+"""
+
+import configparser
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from dspyfun.utils.path_tools import cache_dir
+
+# Shell commands whose output lines make up each listing.
+LISTINGS = {
+    "gc-project-ids": "gcloud projects list --format='value(projectId)'",
+    "gc-projects": "gcloud projects list",
+    "aws-profiles": "aws configure list-profiles",
+}
+
+
+def gcloud_scope() -> str:
+    """Name the active gcloud configuration and account, read from gcloud's files rather than
+    by starting gcloud."""
+    config_dir = Path(os.environ.get("CLOUDSDK_CONFIG") or Path.home() / ".config" / "gcloud")
+    name = os.environ.get("CLOUDSDK_ACTIVE_CONFIG_NAME")
+    if not name:
+        try:
+            name = (config_dir / "active_config").read_text().strip()
+        except OSError:
+            name = "default"
+    account = os.environ.get("CLOUDSDK_CORE_ACCOUNT")
+    if not account:
+        config = configparser.ConfigParser()
+        config.read(config_dir / "configurations" / f"config_{name}")
+        account = config.get("core", "account", fallback="")
+    return f"gcloud {config_dir} {name} {account}"
+
+
+def aws_scope() -> str:
+    """Name the AWS config and credentials files the profiles are listed from."""
+    aws_dir = Path.home() / ".aws"
+    return "aws {} {}".format(os.environ.get("AWS_CONFIG_FILE") or aws_dir / "config",
+                              os.environ.get("AWS_SHARED_CREDENTIALS_FILE") or aws_dir / "credentials")
+
+
+# What each listing depends on besides its command, such as the active cloud account.
+SCOPES = {
+    "gc-project-ids": gcloud_scope,
+    "gc-projects": gcloud_scope,
+    "aws-profiles": aws_scope,
+}
+
+# Seconds after which a cached listing is refreshed in the background.
+INVENTORY_TTL = 15 * 60
+# Seconds after which an unfinished background refresh no longer blocks starting another one.
+REFRESH_TIMEOUT = 120
+
+
+def inventory_dir() -> Path:
+    """Get the directory the cached listings are stored in."""
+    return cache_dir() / "inventory"
+
+
+def entry_name(name: str) -> str:
+    """Name the cache entry of a listing for the current account, e.g. ``gc-projects-1a2b3c4d5e6f``."""
+    if (scope := SCOPES.get(name)) is None:
+        return name
+    return f"{name}-{hashlib.sha256(scope().encode()).hexdigest()[:12]}"
+
+
+def read_cached(name: str) -> tuple[float, list[str]] | None:
+    """Return the age in seconds and the lines of a cached listing, or ``None`` if there is none."""
+    try:
+        entry = json.loads((inventory_dir() / f"{entry_name(name)}.json").read_text())
+    except (OSError, ValueError):
+        return None
+    return time.time() - entry["fetched_at"], entry["lines"]
+
+
+def fetch(name: str, command: str | None = None) -> list[str]:
+    """Run the listing's command and cache its non-empty output lines.
+
+    Raises ``subprocess.CalledProcessError`` if the command fails.
+    """
+    from dspyfun.utils.config_tools import atomic_write
+
+    command = command or LISTINGS[name]
+    result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+    lines = [line for line in result.stdout.splitlines() if line.strip()]
+    inventory_dir().mkdir(parents=True, exist_ok=True)
+    atomic_write(inventory_dir() / f"{entry_name(name)}.json",
+                 json.dumps({"command": command, "fetched_at": time.time(), "lines": lines}))
+    return lines
+
+
+def refresh_in_background(name: str) -> bool:
+    """Start a detached process that refreshes the listing, unless one is already running.
+
+    A process rather than a thread, so the refresh neither delays nor dies with the command that
+    started it.
+    """
+    marker = inventory_dir() / f"{entry_name(name)}.refreshing"
+    inventory_dir().mkdir(parents=True, exist_ok=True)
+    try:
+        if time.time() - marker.stat().st_mtime < REFRESH_TIMEOUT:
+            return False
+        marker.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(marker, os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        return False
+    subprocess.Popen([sys.executable, "-m", __name__, name, LISTINGS[name]],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+    return True
+
+
+def fetch_or_fail(name: str) -> list[str]:
+    """Fetch a listing, or report the failed command like ``run_command`` does and exit."""
+    start = time.perf_counter()
+    try:
+        return fetch(name)
+    except subprocess.CalledProcessError as exc:
+        from dspyfun.utils.cli_tools import TAIL_LINES, CommandResult, fail
+
+        fail(CommandResult(exc.cmd, exc.returncode, time.perf_counter() - start,
+                           exc.stdout.splitlines()[-TAIL_LINES:], exc.stderr.splitlines()[-TAIL_LINES:]))
+
+
+def listing(name: str, refresh: bool = False, ttl: float = INVENTORY_TTL) -> list[str]:
+    """Return a listing from the cache, fetching it only when it is missing or ``refresh`` is set.
+
+    A cached listing older than ``ttl`` is returned as is and refreshed in the background.
+    """
+    cached = None if refresh else read_cached(name)
+    if cached is None:
+        return fetch_or_fail(name)
+    age, lines = cached
+    if age > ttl:
+        refresh_in_background(name)
+    return lines
+
+
+if __name__ == "__main__":
+    try:
+        fetch(sys.argv[1], sys.argv[2])
+    finally:
+        (inventory_dir() / f"{entry_name(sys.argv[1])}.refreshing").unlink(missing_ok=True)
@@ -0,0 +1,114 @@
+"""Cached manifest of the CLI's subcommands, extracted from their source without importing them."""
+
+import ast
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from dspyfun.utils.path_tools import cache_dir, subcommand_dir
+
+MANIFEST_VERSION = 1
+_SUFFIX = "_cmd.py"
+
+
+def manifest_path(cmd_dir: Path | None = None) -> Path:
+    """Get the manifest file for a subcommand directory, one per checkout."""
+    cmd_dir = Path(cmd_dir or subcommand_dir()).resolve()
+    digest = hashlib.sha1(str(cmd_dir).encode()).hexdigest()[:12]
+    return cache_dir() / f"command_manifest-{digest}.json"
+
+
+def _command_name(decorator: ast.expr, function: ast.FunctionDef) -> str | None:
+    """Return the command name given to ``@app.command(...)``, or None for other decorators."""
+    if isinstance(decorator, ast.Call):
+        call, args, keywords = decorator.func, decorator.args, decorator.keywords
+    else:
+        call, args, keywords = decorator, [], []
+    if not (isinstance(call, ast.Attribute) and call.attr == "command"
+            and isinstance(call.value, ast.Name) and call.value.id == "app"):
+        return None
+    names = [keyword.value for keyword in keywords if keyword.arg == "name"] + args[:1]
+    if names and isinstance(names[0], ast.Constant):
+        return names[0].value
+    return function.name.replace("_", "-")
+
+
+def _params(function: ast.FunctionDef) -> list[dict]:
+    arguments = function.args.args
+    defaults = [None] * (len(arguments) - len(function.args.defaults)) + function.args.defaults
+    return [{
+        "name": argument.arg,
+        "annotation": ast.unparse(argument.annotation) if argument.annotation else None,
+        "default": ast.unparse(default) if default is not None else None,
+    } for argument, default in zip(arguments, defaults)]
+
+
+def parse_module(path: Path) -> dict:
+    """Extract a subcommand module's help text and its commands' names, help and signatures."""
+    tree = ast.parse(Path(path).read_text(), filename=str(path))
+    commands = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        for decorator in node.decorator_list:
+            if (name := _command_name(decorator, node)) is not None:
+                commands.append({
+                    "name": name,
+                    "function": node.name,
+                    "help": ast.get_docstring(node),
+                    "params": _params(node),
+                })
+                break
+    return {"help": ast.get_docstring(tree), "commands": commands}
+
+
+def _write(path: Path, manifest: dict) -> None:
+    """Write the manifest atomically, so concurrent CLI processes never read half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def load_manifest(cmd_dir: Path | None = None, refresh: bool = False) -> dict[str, dict]:
+    """Map every subcommand name to its manifest entry.
+
+    Entries are reused from the cached manifest while their module's mtime and size are unchanged.
+    Modules that changed, appeared or disappeared are re-parsed or dropped, and the manifest is
+    rewritten. ``refresh`` re-parses every module.
+    """
+    cmd_dir = Path(cmd_dir or subcommand_dir())
+    path = manifest_path(cmd_dir)
+    cached = {}
+    if not refresh:
+        try:
+            manifest = json.loads(path.read_text())
+            if manifest.get("version") == MANIFEST_VERSION:
+                cached = manifest["commands"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    commands = {}
+    for module in sorted(cmd_dir.glob(f"*{_SUFFIX}")):
+        stat = module.stat()
+        name = module.name[:-len(_SUFFIX)]
+        entry = cached.get(name)
+        if entry is None or (entry["mtime_ns"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+            entry = {"module": module.stem, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                     **parse_module(module)}
+        commands[name] = entry
+
+    if commands != cached:
+        try:
+            _write(path, {"version": MANIFEST_VERSION, "commands": commands})
+        except OSError:
+            # The manifest is only a cache, so a read-only cache directory just means re-parsing.
+            pass
+    return commands
@@ -0,0 +1,171 @@
+"""Prometheus metrics for the REST API, aggregated across gunicorn workers.
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set, every worker writes its samples to memory-mapped files
+in that directory and a scrape of any worker reports the sum over all of them. The directory must
+be set before this module is imported and wiped whenever the server starts, which the gunicorn
+config in ``dspyfun.gunicorn_conf`` takes care of.
+"""
+
+import asyncio
+import functools
+import os
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import dspy
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from prometheus_client.registry import Collector
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from dspyfun.utils.cache_tools import lm_identity, response_cache
+from dspyfun.utils.checkpoint_tools import checkpoint_store
+
+REQUEST_LATENCY = Histogram(
+    "dspyfun_http_request_duration_seconds", "Time from receiving a request to finishing its response.",
+    ["method", "route", "status"])
+REQUESTS_IN_FLIGHT = Gauge(
+    "dspyfun_http_requests_in_flight", "Requests currently being served.",
+    ["route"], multiprocess_mode="livesum")
+EVENT_LOOP_LAG = Gauge(
+    "dspyfun_event_loop_lag_seconds", "How late the event loop woke up from its last timed sleep.",
+    multiprocess_mode="livemax")
+POOL_TASKS = Gauge(
+    "dspyfun_pool_tasks", "Tasks admitted to an executor pool, by whether they run or wait.",
+    ["pool", "state"], multiprocess_mode="livesum")
+CONFIG_VERSION = Gauge(
+    "dspyfun_config_version", "Version of the config each worker is running with.",
+    multiprocess_mode="liveall")
+LM_LATENCY = Histogram(
+    "dspyfun_lm_request_duration_seconds", "Time spent in LM requests.",
+    ["model"], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+LM_TOKENS = Counter(
+    "dspyfun_lm_tokens", "Tokens sent to and generated by LMs.", ["model", "kind"])
+
+
+def route_template(scope: Scope) -> str:
+    """Return the path template of the route that serves ``scope``, so path values do not
+    explode the label cardinality."""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Time every HTTP request until its response body is fully sent and count requests in flight."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = route_template(scope)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(route=route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            REQUEST_LATENCY.labels(method=scope["method"], route=route, status=str(status)).observe(
+                time.perf_counter() - start)
+
+
+async def monitor_event_loop(sample: Callable[[], None] | None = None, interval: float = 0.5) -> None:
+    """Measure event loop lag every ``interval`` seconds, calling ``sample`` to refresh other gauges."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(loop.time() - start - interval, 0.0))
+        if sample is not None:
+            sample()
+
+
+def observe_lm_requests(lm: dspy.LM) -> dspy.LM:
+    """Record the latency and token usage of every request ``lm`` sends to its backend."""
+    model, _ = lm_identity(lm)
+    basic_request = lm.basic_request
+
+    @functools.wraps(basic_request)
+    def timed_request(prompt: str, **kwargs) -> Any:
+        start = time.perf_counter()
+        response = basic_request(prompt, **kwargs)
+        usage = response.get("usage") if isinstance(response, dict) else None
+        observe_lm_call(model, time.perf_counter() - start, usage)
+        return response
+
+    lm.basic_request = timed_request
+    return lm
+
+
+def observe_lm_call(model: str, seconds: float, usage: dict | None = None) -> None:
+    """Record one LM request and, when the backend reported it, its token usage."""
+    LM_LATENCY.labels(model=model).observe(seconds)
+    for kind in ("prompt", "completion"):
+        if usage and (tokens := usage.get(f"{kind}_tokens")):
+            LM_TOKENS.labels(model=model, kind=kind).inc(tokens)
+
+
+class CacheCollector(Collector):
+    """Report the LM response cache and Fibonacci checkpoint store counters at scrape time.
+
+    Both caches already keep their counters in storage shared by every process, so they are read
+    directly instead of being tracked per worker.
+    """
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        lookups = CounterMetricFamily(
+            "dspyfun_cache_lookups", "Cache lookups, by whether they hit.", labels=["cache", "result"])
+        hit_ratio = GaugeMetricFamily(
+            "dspyfun_cache_hit_ratio", "Fraction of cache lookups that hit.", labels=["cache"])
+        entries = GaugeMetricFamily("dspyfun_cache_entries", "Entries in the cache.", labels=["cache"])
+        for cache, stats in (("lm_response", response_cache().stats()),
+                             ("fib_checkpoint", checkpoint_store().stats())):
+            total = stats["hits"] + stats["misses"]
+            lookups.add_metric([cache, "hit"], stats["hits"])
+            lookups.add_metric([cache, "miss"], stats["misses"])
+            hit_ratio.add_metric([cache], stats["hits"] / total if total else 0.0)
+            entries.add_metric([cache], stats["entries"])
+        yield from (lookups, hit_ratio, entries)
+
+
+def multiprocess_enabled() -> bool:
+    """Check whether metrics are aggregated across worker processes."""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_metrics() -> bytes:
+    """Render every metric in the Prometheus text format."""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        registry.register(CacheCollector())
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+if not multiprocess_enabled():
+    REGISTRY.register(CacheCollector())
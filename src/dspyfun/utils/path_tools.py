@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 
@@ -19,6 +20,12 @@ def config_dir() -> Path:
     return project_dir() / 'config'
 
 
+def cache_dir() -> Path:
+    """Get the per-user cache directory, honoring XDG_CACHE_HOME."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / 'dspyfun'
+
+
 if __name__ == '__main__':
     print(subcommand_dir())
 
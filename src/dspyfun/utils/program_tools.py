@@ -0,0 +1,114 @@
+"""Save compiled dspy programs to disk and share them within a process.
+
+A program's state is the demos and instructions of each of its predictors, which is what an
+optimizer such as ``BootstrapFewShot`` changes. ``save_program`` writes it as JSON to
+DSPYFUN_PROGRAMS_DIR (default: ``<cache dir>/programs``), one file per module class, e.g.
+``CypherModule.json``. ``compiled_program`` builds each module class once per process and loads its
+saved state, reloading when the file changes, so production calls reuse the optimized prompts
+without rebuilding predictors.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from dspyfun.utils.config_tools import atomic_write
+from dspyfun.utils.path_tools import cache_dir
+
+if TYPE_CHECKING:
+    import dspy
+
+ProgramT = TypeVar("ProgramT", bound="dspy.Module")
+
+# Predictor state that describes the process rather than the program.
+_RUNTIME_STATE = ("lm", "traces", "train")
+
+
+def programs_dir() -> Path:
+    """Get the directory of saved programs."""
+    return Path(os.environ.get("DSPYFUN_PROGRAMS_DIR") or cache_dir() / "programs")
+
+
+def program_path(module_class: type, name: str | None = None) -> Path:
+    """Get the file a program of ``module_class`` is saved to, ``name`` defaulting to the class name."""
+    return programs_dir() / f"{name or module_class.__name__}.json"
+
+
+def dump_program(program: "dspy.Module") -> dict[str, Any]:
+    """Return the demos and instructions of every predictor of ``program`` as JSON-ready data."""
+    state = {}
+    for name, predictor in program.named_predictors():
+        predictor_state = {key: value for key, value in predictor.dump_state().items()
+                           if key not in _RUNTIME_STATE}
+        predictor_state["demos"] = [dict(demo) for demo in predictor_state["demos"]]
+        state[name] = predictor_state
+    return state
+
+
+def restore_program(program: ProgramT, state: dict[str, Any]) -> ProgramT:
+    """Load state written by ``dump_program`` into ``program`` and return it."""
+    import dspy
+
+    for name, predictor in program.named_predictors():
+        if name not in state:
+            continue
+        predictor_state = dict(state[name])
+        predictor_state["demos"] = [dspy.Example(**demo) for demo in predictor_state.get("demos", [])]
+        predictor.load_state(predictor_state)
+        # ChainOfThought prompts with its extended signature, which load_state leaves alone.
+        if hasattr(predictor, "extended_signature"):
+            predictor.extended_signature = predictor.extended_signature.with_instructions(
+                predictor.signature.instructions)
+    return program
+
+
+def save_program(program: "dspy.Module", name: str | None = None) -> Path:
+    """Save the state of a compiled ``program`` where ``compiled_program`` will find it."""
+    path = program_path(type(program), name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(path, json.dumps(dump_program(program), indent=2, default=str))
+    return path
+
+
+def load_program(module_class: type[ProgramT], name: str | None = None) -> ProgramT:
+    """Build a new ``module_class`` program with its saved state, if there is any."""
+    program = module_class()
+    path = program_path(module_class, name)
+    if path.exists():
+        restore_program(program, json.loads(path.read_text()))
+    return program
+
+
+_programs: dict[tuple[type, str | None], tuple[tuple[int, int, int] | None, Any]] = {}
+_programs_lock = threading.Lock()
+
+
+def _saved_version(path: Path) -> tuple[int, int, int] | None:
+    # save_program writes a new inode each time, so saves within the mtime granularity still differ.
+    try:
+        info = path.stat()
+    except FileNotFoundError:
+        return None
+    return info.st_mtime_ns, info.st_size, info.st_ino
+
+
+def compiled_program(module_class: type[ProgramT], name: str | None = None) -> ProgramT:
+    """Get the process-wide ``module_class`` program, loading its saved state once per file change."""
+    key = (module_class, name)
+    version = _saved_version(program_path(module_class, name))
+    cached = _programs.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _programs_lock:
+        cached = _programs.get(key)
+        if cached is None or cached[0] != version:
+            cached = _programs[key] = (version, load_program(module_class, name))
+    return cached[1]
+
+
+def clear_programs() -> None:
+    """Forget the programs built by ``compiled_program``."""
+    with _programs_lock:
+        _programs.clear()
@@ -0,0 +1,210 @@
+"""Record where the time and tokens of LM calls go, as JSON lines or a Chrome trace.
+
+Tracing is on when DSPYFUN_TRACE names an output file (or after ``enable_tracing``). Every predictor
+call becomes a span named after its signature, and every request an LM client sends inside it
+becomes one record with:
+
+- ``name``: the signature, or ``lm`` for requests made outside a predictor
+- ``model``
+- ``prompt_tokens`` and ``completion_tokens``, when the backend reports them
+- ``queue_s``: time from entering the predictor, or from its previous request, until the request
+  was sent, covering prompt building, retry backoff and rate limiting
+- ``wall_s``: duration of the request
+- ``cache``: ``hit``, ``miss`` or ``off`` for the response cache
+
+A span answered from the response cache sends no request, so it is recorded with ``cache: hit``
+and no tokens. Files ending in ``.json`` are written in the Chrome trace event format, which
+chrome://tracing and Perfetto open; anything else is written as JSON lines.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class Span:
+    name: str
+    start: float = field(default_factory=time.perf_counter)
+    cache: str = "off"
+    requests: int = 0
+    # When the previous request of this span ended, to tell queue time from request time.
+    last: float = 0.0
+
+    def __post_init__(self):
+        self.last = self.start
+
+
+_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("lm_trace_span", default=None)
+
+
+class Tracer:
+    """Append trace records to a file, safely from several threads."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.chrome = self.path.suffix == ".json"
+        self._lock = threading.Lock()
+        self._file = open(self.path, "w")
+        self._origin = time.perf_counter()
+        self._records = 0
+        if self.chrome:
+            # The closing bracket is optional in the Chrome trace format, so a crash leaves a valid file.
+            self._file.write("[")
+
+    def record(self, record: dict[str, Any], start: float) -> None:
+        """Write one record for a call that began at ``start`` (a perf_counter time)."""
+        record = {"ts": time.time() - (time.perf_counter() - start), **record}
+        if self.chrome:
+            line = json.dumps({
+                "name": record["name"], "cat": "lm", "ph": "X", "pid": os.getpid(),
+                "tid": threading.get_ident(), "ts": (start - self._origin) * 1e6,
+                "dur": record["wall_s"] * 1e6, "args": record})
+        else:
+            line = json.dumps(record) + "\n"
+        with self._lock:
+            if self.chrome:
+                line = ("," if self._records else "") + "\n" + line
+            self._file.write(line)
+            self._file.flush()
+            self._records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self.chrome:
+                self._file.write("\n]\n")
+            self._file.close()
+
+
+_tracer: Tracer | None = None
+# The DSPYFUN_TRACE file, read once at import and cleared when the first tracer() call starts it.
+_trace_path = os.environ.get("DSPYFUN_TRACE")
+
+
+def tracer() -> Tracer | None:
+    """Return the active tracer, starting one for DSPYFUN_TRACE on first use."""
+    global _tracer, _trace_path
+    if _tracer is None and _trace_path:
+        path, _trace_path = _trace_path, None
+        enable_tracing(Path(path))
+    return _tracer
+
+
+def enable_tracing(path: Path) -> Tracer:
+    """Start writing trace records to ``path`` and open a span for every dspy predictor call."""
+    global _tracer
+    import dspy
+
+    if _tracer is not None:
+        _tracer.close()
+    _tracer = Tracer(path)
+    if not hasattr(dspy.Predict.forward, "__wrapped__"):
+        dspy.Predict.forward = _traced_forward(dspy.Predict.forward)
+    return _tracer
+
+
+def disable_tracing() -> None:
+    """Stop tracing and finish the trace file."""
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def signature_name(predictor: Any) -> str:
+    """Name a predictor's signature: its class name, or its fields for an inline signature."""
+    signature = predictor.signature
+    name = signature.__name__
+    return signature.signature if name == "StringSignature" else name
+
+
+@contextmanager
+def span(name: str) -> Iterator[Span]:
+    """Attribute the LM requests made in the block to ``name``, unless a span is already open."""
+    current = _span.get()
+    if current is not None or tracer() is None:
+        yield current or Span(name)
+        return
+    current = Span(name)
+    token = _span.set(current)
+    try:
+        yield current
+    finally:
+        _span.reset(token)
+        if current.requests == 0 and current.cache == "hit" and (active := tracer()) is not None:
+            active.record({"name": name, "model": None, "prompt_tokens": 0, "completion_tokens": 0,
+                           "queue_s": 0.0, "wall_s": time.perf_counter() - current.start, "cache": "hit"},
+                          current.start)
+
+
+def note_cache(status: str) -> None:
+    """Record whether the open span was answered from the response cache."""
+    if (current := _span.get()) is not None:
+        current.cache = status
+
+
+def _traced_forward(forward: Callable) -> Callable:
+    @functools.wraps(forward)
+    def traced(self, **kwargs):
+        with span(signature_name(self)):
+            return forward(self, **kwargs)
+    return traced
+
+
+def trace_request(model: str, basic_request: Callable) -> Callable:
+    """Wrap an LM client's ``basic_request`` so that every request is recorded while tracing."""
+
+    @functools.wraps(basic_request)
+    def traced(prompt: str, **kwargs) -> Any:
+        active = tracer()
+        if active is None:
+            return basic_request(prompt, **kwargs)
+        current = _span.get()
+        start = time.perf_counter()
+        response = basic_request(prompt, **kwargs)
+        end = time.perf_counter()
+        usage = (response.get("usage") if isinstance(response, dict) else None) or {}
+        record = {"name": "lm", "model": model, "prompt_tokens": usage.get("prompt_tokens", 0),
+                  "completion_tokens": usage.get("completion_tokens", 0), "queue_s": 0.0,
+                  "wall_s": end - start, "cache": "off"}
+        if current is not None:
+            record.update(name=current.name, queue_s=start - current.last, cache=current.cache)
+            current.requests += 1
+            current.last = end
+        active.record(record, start)
+        return response
+
+    return traced
+
+
+def read_trace(path: Path) -> list[dict[str, Any]]:
+    """Read the records of a JSON lines or Chrome trace file."""
+    text = Path(path).read_text()
+    if Path(path).suffix == ".json":
+        text = text.strip()
+        events = json.loads(text if text.endswith("]") else text + "]")
+        return [event["args"] for event in events if event.get("ph") == "X"]
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def summarize(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Total up the records per name, hottest (most wall time) first."""
+    totals: dict[str, dict[str, Any]] = {}
+    for record in records:
+        total = totals.setdefault(record["name"], {
+            "name": record["name"], "calls": 0, "cache_hits": 0, "prompt_tokens": 0,
+            "completion_tokens": 0, "queue_s": 0.0, "wall_s": 0.0, "max_wall_s": 0.0})
+        total["calls"] += 1
+        total["cache_hits"] += record["cache"] == "hit"
+        for key in ("prompt_tokens", "completion_tokens", "queue_s", "wall_s"):
+            total[key] += record[key] or 0
+        total["max_wall_s"] = max(total["max_wall_s"], record["wall_s"])
+    return sorted(totals.values(), key=lambda total: total["wall_s"], reverse=True)
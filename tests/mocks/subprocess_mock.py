@@ -3,9 +3,37 @@ import subprocess
 from typing import Any, List, Union
 
 
+class FakeStream:
+    """An asyncio stream that is already at EOF."""
+
+    async def read(self, n: int = -1) -> bytes:
+        return b""
+
+
+class FakeProcess:
+    """What asyncio.create_subprocess_shell returns, for a command that prints nothing."""
+
+    def __init__(self, returncode: int = 0):
+        self.returncode = returncode
+        self.stdout = FakeStream()
+        self.stderr = FakeStream()
+
+    async def wait(self) -> int:
+        return self.returncode
+
+
 class SubprocessMock:
     def __init__(self):
         self.run = Mock(side_effect=self._run)
+        # Records the commands started through asyncio.create_subprocess_shell.
+        self.shell = Mock(side_effect=self._shell)
+
+    async def create_subprocess_shell(self, command: str, **kwargs: Any) -> FakeProcess:
+        return self.shell(command)
+
+    def _shell(self, command: str) -> FakeProcess:
+        print(f"Mocked subprocess shell: {command}")
+        return FakeProcess()
 
     def _run(self, command: Union[str, List[str]], check: bool = False,
              shell: bool = False) -> subprocess.CompletedProcess:
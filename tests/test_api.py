@@ -1,14 +1,167 @@
 """Test dspyfun REST API."""
 
+import asyncio
+import json
+
 import httpx
+import pytest
 from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
 
+from dspyfun import api
 from dspyfun.api import app
+from dspyfun import mock_lm
+from dspyfun.mock_lm import serve_in_thread
+from dspyfun.utils import cache_tools, metrics_tools
+from dspyfun.utils.async_tools import AdmissionGate
+from dspyfun.utils.cache_tools import ResponseCache
+from dspyfun.utils.dspy_tools import LMPool, SessionOllamaLocal
+from dspyfun.utils.fib_tools import fibonacci_text
+
 
-client = TestClient(app)
+@pytest.fixture(scope="module")
+def client():
+    """Run the app's lifespan so the compute pool, admission gate and LM pool exist."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        # Don't reach out to a real LM backend while starting up.
+        monkeypatch.setenv("DSPYFUN_LM_WARMUP", "0")
+        with TestClient(app) as client:
+            yield client
 
 
-def test_read_root() -> None:
+def test_read_root(client: TestClient) -> None:
     """Test that reading the root is successful."""
     response = client.get("/compute", params={"n": 7})
     assert httpx.codes.is_success(response.status_code)
+
+
+def test_compute_value(client: TestClient) -> None:
+    """Test that the compute endpoint returns the n-th Fibonacci number."""
+    response = client.get("/compute", params={"n": 90})
+    assert response.json() == 2880067194370816120
+
+
+def test_compute_large_value(client: TestClient) -> None:
+    """Test that results longer than Python's default int -> str digit limit are returned in full."""
+    # F(30000) has 6270 digits, more than the 4300 digits the compute processes may convert by default.
+    expected = fibonacci_text(30000)
+    response = client.get("/compute", params={"n": 30000})
+    assert response.headers["content-type"] == "application/json"
+    assert response.text == expected
+    response = client.post("/compute/batch", json=[30000])
+    assert response.text == f'{{"n": 30000, "result": {expected}}}\n'
+
+
+def test_compute_negative(client: TestClient) -> None:
+    """Test that a negative n is rejected."""
+    response = client.get("/compute", params={"n": -1})
+    assert response.status_code == 422
+
+
+def test_compute_batch(client: TestClient) -> None:
+    """Test that the batch endpoint streams one NDJSON line per n in ascending order."""
+    response = client.post("/compute/batch", json=[90, 7, 7, 1000])
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["n"] for line in lines] == [7, 7, 90, 1000]
+    assert lines[0]["result"] == 13
+    assert lines[2]["result"] == 2880067194370816120
+
+
+def test_compute_batch_releases_its_reservation(client: TestClient, monkeypatch) -> None:
+    """Test that a batch gives back its admission place, also when the client goes away early."""
+    monkeypatch.setattr(api, "COMPUTE_BATCH_CHUNK", 2)
+    gate = app.state.compute_gate
+    response = client.post("/compute/batch", json=[5, 4, 3, 2, 1])
+    assert [json.loads(line)["n"] for line in response.text.splitlines()] == [1, 2, 3, 4, 5]
+    assert (gate.running, gate.waiting) == (0, 0)
+
+    gate.reserve()
+    response = api.ReservedStreamingResponse(iter(["never sent"]), gate)
+
+    async def disconnected(message: dict) -> None:
+        raise OSError("client went away")
+
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, disconnected))
+    assert (gate.running, gate.waiting) == (0, 0)
+
+
+def test_compute_batch_negative(client: TestClient) -> None:
+    """Test that a batch containing a negative n is rejected."""
+    response = client.post("/compute/batch", json=[1, -1])
+    assert response.status_code == 422
+
+
+def test_compute_overloaded(client: TestClient, monkeypatch) -> None:
+    """Test that requests beyond the admission queue get a fast 503 with Retry-After."""
+    gate = AdmissionGate(limit=1, queue_size=0)
+    gate.reserve()
+    monkeypatch.setattr(app.state, "compute_gate", gate)
+    response = client.get("/compute", params={"n": 7})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    response = client.post("/compute/batch", json=[1, 2])
+    assert response.status_code == 503
+
+
+def test_io_borrows_pooled_lm(client: TestClient, monkeypatch, tmp_path) -> None:
+    """Test that /io answers through a pooled LM client and caches the response."""
+    cache = ResponseCache(tmp_path / "lm_cache.sqlite3")
+    monkeypatch.setattr(cache_tools, "response_cache", lambda: cache)
+    with serve_in_thread() as base_url:
+        pool = LMPool(lambda: SessionOllamaLocal(model="mock", base_url=base_url), size=2)
+        monkeypatch.setattr(app.state, "lm_pool", pool)
+        response = client.get("/io", params={"n": 42})
+    assert response.json() == 267914296
+    # The mock LM server is gone, so this can only be answered from the cache.
+    response = client.get("/io", params={"n": 42})
+    assert response.json() == 267914296
+    assert cache.stats()["hits"] == 1
+
+
+def stream_from(client: TestClient, monkeypatch, **backend) -> httpx.Response:
+    """GET /io/stream on the app's event loop, relaying from an Ollama client built with ``backend``."""
+    async def get() -> httpx.Response:
+        async with httpx.AsyncClient(**backend) as ollama_client:
+            monkeypatch.setattr(app.state, "ollama_client", ollama_client)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as api:
+                return await api.get("/io/stream", params={"n": 42})
+
+    return client.portal.call(get)
+
+
+def test_io_stream_sends_tokens_then_result(client: TestClient, monkeypatch) -> None:
+    """Test that /io/stream relays LM tokens as SSE and ends with the parsed answer."""
+    monkeypatch.setattr(mock_lm, "MOCK_LM_RESPONSE", "The answer is 267914296")
+    with serve_in_thread() as base_url:
+        response = stream_from(client, monkeypatch, base_url=base_url)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    names = [lines[0].removeprefix("event: ") for lines in events]
+    assert names == ["token"] * 4 + ["result"]
+    result = json.loads(events[-1][1].removeprefix("data: "))
+    assert result["last_fib_int"] == 267914296
+    assert result["ttfb_ms"] is not None
+
+
+def test_io_stream_reports_malformed_backend_lines(client: TestClient, monkeypatch) -> None:
+    """Test that a malformed line from the LM backend ends the stream with an error event."""
+    def backend(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b'{"response": "26791", "done": false}\n{"respon')
+
+    response = stream_from(client, monkeypatch, base_url="http://ollama", transport=httpx.MockTransport(backend))
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [lines[0].removeprefix("event: ") for lines in events] == ["token", "error"]
+    assert json.loads(events[-1][1].removeprefix("data: "))["detail"].startswith("LM backend error")
+
+
+def test_metrics(client: TestClient, monkeypatch, tmp_path) -> None:
+    """Test that /metrics reports route latencies by path template and the cache hit ratios."""
+    monkeypatch.setattr(metrics_tools, "response_cache", lambda: ResponseCache(tmp_path / "lm_cache.sqlite3"))
+    client.get("/compute", params={"n": 7})
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'dspyfun_http_request_duration_seconds_count{method="GET",route="/compute",status="200"}' in response.text
+    assert 'dspyfun_cache_hit_ratio{cache="lm_response"} 0.0' in response.text
+    assert 'dspyfun_cache_hit_ratio{cache="fib_checkpoint"}' in response.text
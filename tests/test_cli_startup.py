@@ -0,0 +1,57 @@
+"""Test dspyfun CLI startup cost."""
+
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ["dspy", "openai", "dspyfun.subcommands.pyd_cmd", "dspyfun.subcommands.aws_cmd"]
+
+
+def run_report(code: str) -> dict:
+    """Run ``code`` in a fresh interpreter, which prints a JSON report on its last line."""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_cli_imports_only_the_invoked_subcommand() -> None:
+    """Test that running one subcommand neither imports the others nor dspy."""
+    report = run_report(f"""
+import json, sys
+from dspyfun.cli import app
+try:
+    app(["k8", "install", "--help"])
+except SystemExit:
+    pass
+print(json.dumps({{"loaded": [name for name in {HEAVY_MODULES + ["dspyfun.subcommands.k8_cmd"]!r}
+                             if name in sys.modules]}}))
+""")
+    assert report["loaded"] == ["dspyfun.subcommands.k8_cmd"]
+
+
+def test_cli_help_imports_no_subcommand() -> None:
+    """Test that --help is rendered from the command manifest without importing subcommands."""
+    report = run_report("""
+import json, sys
+from dspyfun.cli import app
+for args in (["--help"], ["gc", "--help"]):
+    try:
+        app(args)
+    except SystemExit:
+        pass
+print(json.dumps({"loaded": [name for name in sys.modules if name.startswith("dspyfun.subcommands.")]}))
+""")
+    assert report["loaded"] == []
+
+
+def test_cli_starts_without_importing_dspy() -> None:
+    """Test that a command which never talks to an LM does not pay for importing dspy or openai."""
+    report = run_report(f"""
+import json, sys
+from dspyfun.cli import app
+try:
+    app(["helm", "--help"])
+except SystemExit:
+    pass
+print(json.dumps({{"loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+""")
+    assert report["loaded"] == []
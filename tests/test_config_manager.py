@@ -98,3 +98,33 @@ def test_sync_config(temp_config_file, monkeypatch):
     assert config_data["cluster_name"] == "synced-cluster"
     assert config_data["zone"] == "us-central1"  # Unchanged
     assert config_data["project_id"] == "synced-project"
+
+
+def test_load_config_parses_once_until_file_changes(temp_config_file, monkeypatch):
+    import os
+
+    from dspyfun import load_config
+
+    first = load_config()
+    assert load_config() is first
+
+    with open(temp_config_file, 'w') as file:
+        yaml.dump({"cluster_name": "edited-cluster", "zone": "us-central1", "project_id": "test-project"}, file)
+    stat = temp_config_file.stat()
+    os.utime(temp_config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    reloaded = load_config()
+    assert reloaded is not first
+    assert reloaded.cluster_name == "edited-cluster"
+
+
+def test_save_config_bumps_version_atomically(temp_config_file, monkeypatch):
+    config_manager = ConfigManager()
+    version = config_manager.config.version
+    config_manager.update_config(zone="europe-west1")
+
+    assert config_manager.config.version == version + 1
+    with open(temp_config_file, 'r') as file:
+        assert yaml.safe_load(file)["version"] == version + 1
+    # Only the config itself is left behind, no temporary files.
+    assert [path.name for path in temp_config_file.parent.iterdir()] == [temp_config_file.name]
@@ -0,0 +1,75 @@
+"""Test the mock LM server."""
+
+import json
+import time
+
+import dspy
+import httpx
+import pytest
+
+from dspyfun.mock_lm import parse_errors, parse_latency, serve_in_thread
+
+
+def test_fixtures_script_answers_and_errors() -> None:
+    """Test that fixture rules answer matching prompts in order and can force errors."""
+    fixtures = [{"match": "weather", "responses": ["sunny", "rainy"]}, {"match": "boom", "status": 503}]
+    with serve_in_thread(fixtures=fixtures) as base_url:
+        lm = dspy.OllamaLocal(model="mock", base_url=base_url)
+        assert [lm("The weather?")[0], lm("The weather?")[0], lm("The weather?")[0]] == ["sunny", "rainy", "rainy"]
+        assert lm("Anything else")[0] == '{"last_fib_int": 267914296}'
+        response = httpx.post(f"{base_url}/api/generate", json={"model": "mock", "prompt": "boom"})
+        assert (response.status_code, response.headers["Retry-After"]) == (503, "1")
+
+
+def test_injected_errors_repeat_with_the_seed() -> None:
+    """Test that a seeded server fails the same requests on every run."""
+    def statuses() -> list[int]:
+        with serve_in_thread(errors={429: 0.3, 500: 0.2}, seed=7) as base_url:
+            return [httpx.post(f"{base_url}/v1/completions", json={"model": "mock", "prompt": "hi"}).status_code
+                    for _ in range(40)]
+    first = statuses()
+    assert first == statuses()
+    assert {200, 429, 500} == set(first)
+
+
+def test_openai_chat_streams_at_the_token_rate() -> None:
+    """Test that OpenAI chat completions stream one token per event at the configured rate."""
+    with serve_in_thread(latency="fixed:0.05", tokens_per_second=20) as base_url:
+        start = time.perf_counter()
+        with httpx.stream("POST", f"{base_url}/v1/chat/completions",
+                          json={"model": "mock", "messages": [{"role": "user", "content": "hi"}], "stream": True}) as response:
+            events = [line.removeprefix("data: ") for line in response.iter_lines() if line]
+        elapsed = time.perf_counter() - start
+    assert events[-1] == "[DONE]"
+    tokens = [json.loads(event)["choices"][0]["delta"].get("content", "") for event in events[:-1]]
+    assert [token for token in tokens if token] == ['{"last_fib_int": ', "267914296}"]
+    # At least 50ms to the first token, then 50ms for the second.
+    assert elapsed >= 0.1
+
+
+def test_ollama_chat_streams_messages_by_default() -> None:
+    """Test that Ollama chat streams like Ollama when stream is left out: message chunks, then done."""
+    with serve_in_thread() as base_url:
+        with httpx.stream("POST", f"{base_url}/api/chat",
+                          json={"model": "mock", "messages": [{"role": "user", "content": "hi"}]}) as response:
+            chunks = [json.loads(line) for line in response.iter_lines() if line]
+    assert [chunk["message"]["content"] for chunk in chunks] == ['{"last_fib_int": ', "267914296}", ""]
+    assert [chunk["done"] for chunk in chunks] == [False, False, True]
+    assert chunks[-1]["eval_count"] == 2
+
+
+def test_openai_completions_report_usage() -> None:
+    """Test that dspy's OpenAI client can use the mock and gets token usage back."""
+    with serve_in_thread() as base_url:
+        lm = dspy.OpenAI(model="mock-instruct", api_base=f"{base_url}/v1/", api_key="mock")
+        lm.basic_request("What is the 7th Fibonacci number?")
+    usage = lm.history[-1]["response"]["usage"]
+    assert (usage["prompt_tokens"], usage["completion_tokens"]) == (6, 2)
+
+
+def test_parse_settings() -> None:
+    """Test the latency distribution and error specs."""
+    assert parse_latency("0.25")(None) == 0.25
+    assert parse_errors("429:0.05,500:0.01") == {429: 0.05, 500: 0.01}
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1,2")
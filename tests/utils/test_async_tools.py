@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from dspyfun.utils.async_tools import AdmissionGate, KeyedSemaphores, Overloaded, RateLimiter, SingleFlight
+
+
+def test_admission_gate_rejects_beyond_queue():
+    async def scenario():
+        gate = AdmissionGate(limit=1, queue_size=1)
+        release = asyncio.Event()
+
+        async def task():
+            async with gate.admit():
+                await release.wait()
+
+        tasks = [asyncio.create_task(task()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert (gate.running, gate.waiting) == (1, 1)
+        with pytest.raises(Overloaded):
+            gate.reserve()
+        release.set()
+        await asyncio.gather(*tasks)
+        assert (gate.running, gate.waiting) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def call(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value * 2
+
+        results = await asyncio.gather(*(flights.do("k", lambda: call(21)) for _ in range(5)))
+        assert results == [42] * 5
+        assert calls == [21]
+        assert flights.in_flight == 0
+        # Once the call has finished, the next one runs again.
+        assert await flights.do("k", lambda: call(1)) == 2
+        assert calls == [21, 1]
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_shares_errors():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(flights.do("k", fail), flights.do("k", fail),
+                                       return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    asyncio.run(scenario())
+
+
+def test_keyed_semaphores_are_per_key():
+    async def scenario():
+        limits = KeyedSemaphores(2)
+        assert limits("gpt-4o") is limits("gpt-4o")
+        assert limits("gpt-4o") is not limits("phi3")
+        assert limits("phi3")._value == 2
+
+    asyncio.run(scenario())
+
+
+def test_rate_limiter_spaces_out_starts():
+    async def scenario():
+        limiter = RateLimiter(rate=50)
+        loop = asyncio.get_running_loop()
+        starts = []
+
+        async def call():
+            await limiter.wait()
+            starts.append(loop.time())
+
+        first = loop.time()
+        await asyncio.gather(*(call() for _ in range(6)))
+        # A late wakeup can shrink the gap to the next start, but no call starts before its slot.
+        assert all(start >= first + index * 0.02 - 0.001 for index, start in enumerate(starts))
+
+    asyncio.run(scenario())
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import threading
+import time
+
+from dspyfun.utils.batch_tools import pending_path, run_batch
+
+
+def write_inputs(path, count):
+    path.write_text("".join(json.dumps({"n": n}) + "\n" for n in range(count)))
+
+
+def read_outputs(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_results_are_written_in_input_order(tmp_path):
+    write_inputs(tmp_path / "in.jsonl", 20)
+
+    def call(n):
+        # Later items finish first.
+        time.sleep((20 - n) * 0.002)
+        return {"square": n * n}
+
+    summary = asyncio.run(run_batch(call, tmp_path / "in.jsonl", tmp_path / "out.jsonl", concurrency=8))
+    results = read_outputs(tmp_path / "out.jsonl")
+    assert [result["output"]["square"] for result in results] == [n * n for n in range(20)]
+    assert (summary.total, summary.failed) == (20, 0)
+    assert not pending_path(tmp_path / "out.jsonl").exists()
+
+
+def test_failures_are_retried_then_recorded(tmp_path):
+    (tmp_path / "in.jsonl").write_text('{"n": 1}\n{"n": 2}\nnot json\n')
+    attempts = {}
+
+    def call(n):
+        attempts[n] = attempts.get(n, 0) + 1
+        if n == 2 or attempts[n] < 2:
+            raise RuntimeError(f"flaky {n}")
+        return n
+
+    summary = asyncio.run(run_batch(call, tmp_path / "in.jsonl", tmp_path / "out.jsonl", retries=2, backoff=0.001))
+    first, second, third = read_outputs(tmp_path / "out.jsonl")
+    assert (first["output"], first["attempts"]) == (1, 2)
+    assert (second["error"], second["attempts"]) == ("RuntimeError: flaky 2", 3)
+    assert third["error"].startswith("Invalid input line")
+    assert summary.failed == 2
+
+
+def test_interrupted_run_resumes_without_repeating_items(tmp_path):
+    write_inputs(tmp_path / "in.jsonl", 10)
+    output = tmp_path / "out.jsonl"
+    # An earlier run wrote items 0-3 in order, finished 5 and 6 ahead of 4, and crashed mid-line.
+    output.write_text("".join(json.dumps({"index": n, "input": {"n": n}, "output": n, "error": None,
+                                          "attempts": 1}) + "\n" for n in range(4)) + '{"index": 4, "inp')
+    pending_path(output).write_text("".join(json.dumps({"index": n, "input": {"n": n}, "output": n,
+                                                        "error": None, "attempts": 1}) + "\n" for n in (5, 6)))
+    called = []
+    lock = threading.Lock()
+
+    def call(n):
+        with lock:
+            called.append(n)
+        return n
+
+    summary = asyncio.run(run_batch(call, tmp_path / "in.jsonl", output))
+    assert sorted(called) == [4, 7, 8, 9]
+    assert [result["index"] for result in read_outputs(output)] == list(range(10))
+    assert summary.resumed == 6
+
+
+def test_rerun_retries_only_the_failed_items(tmp_path):
+    write_inputs(tmp_path / "in.jsonl", 6)
+    output = tmp_path / "out.jsonl"
+
+    def backend_down_for_odd(n):
+        if n % 2:
+            raise ConnectionError("LM backend is down")
+        return n
+
+    summary = asyncio.run(run_batch(backend_down_for_odd, tmp_path / "in.jsonl", output, retries=0))
+    assert summary.failed == 3
+
+    called = []
+    lock = threading.Lock()
+
+    def call(n):
+        with lock:
+            called.append(n)
+        return n
+
+    summary = asyncio.run(run_batch(call, tmp_path / "in.jsonl", output))
+    assert sorted(called) == [1, 3, 5]
+    assert [(result["index"], result["output"], result["error"]) for result in read_outputs(output)] == [
+        (n, n, None) for n in range(6)]
+    assert (summary.resumed, summary.failed) == (3, 0)
+    assert not pending_path(output).exists()
@@ -0,0 +1,60 @@
+import dspy
+import pytest
+from dspy.utils.dummies import DummyLM
+
+from dspyfun.utils import cache_tools
+from dspyfun.utils.cache_tools import ResponseCache, cached_predict
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "lm_cache.sqlite3")
+    monkeypatch.setattr(cache_tools, "response_cache", lambda: cache)
+    return cache
+
+
+def test_get_set_and_stats(cache):
+    key = cache.key("gpt-4o", "text -> answer", {"text": "hi"}, 0.0)
+    assert cache.get(key) is None
+    cache.set(key, {"answer": "hello"})
+    assert cache.get(key) == {"answer": "hello"}
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+
+def test_key_depends_on_every_part(cache):
+    keys = {
+        cache.key("gpt-4o", "a -> b", {"a": "1"}, 0.0),
+        cache.key("gpt-4", "a -> b", {"a": "1"}, 0.0),
+        cache.key("gpt-4o", "a -> c", {"a": "1"}, 0.0),
+        cache.key("gpt-4o", "a -> b", {"a": "2"}, 0.0),
+        cache.key("gpt-4o", "a -> b", {"a": "1"}, 0.7),
+    }
+    assert len(keys) == 5
+
+
+def test_ttl_expiry(tmp_path):
+    cache = ResponseCache(tmp_path / "lm_cache.sqlite3", ttl=-1)
+    cache.set("key", {"answer": "stale"})
+    assert cache.get("key") is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(tmp_path / "lm_cache.sqlite3", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_cached_predict_calls_lm_once(cache):
+    lm = DummyLM(["Paris"])
+    with dspy.context(lm=lm):
+        predictor = dspy.Predict("question -> answer")
+        first = cached_predict(predictor, question="Capital of France?")
+        second = cached_predict(predictor, question="Capital of France?")
+    assert first.answer == second.answer == "Paris"
+    assert len(lm.history) == 1
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,69 @@
+import multiprocessing
+
+from dspyfun.utils.checkpoint_tools import CheckpointStore
+from dspyfun.utils.fib_tools import fib_pair, fibonacci
+
+
+def _compute_in_child(root, n):
+    fibonacci(n, CheckpointStore(root))
+
+
+def test_put_get_roundtrip(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.put(1000, fib_pair(1000))
+    assert store.get(1000) == fib_pair(1000)
+    assert store.get(1001) is None
+
+
+def test_nearest(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.put(1 << 12, fib_pair(1 << 12))
+    store.put(5000, fib_pair(5000))
+    assert store.nearest(4999) == (1 << 12, fib_pair(1 << 12))
+    assert store.nearest(6000) == (5000, fib_pair(5000))
+    assert store.nearest(10) == (0, None)
+
+
+def test_eviction_is_size_bounded(tmp_path):
+    store = CheckpointStore(tmp_path, max_bytes=4096)
+    for k in range(5000, 5010):
+        store.put(k, fib_pair(k))
+    stats = store.stats()
+    assert stats["bytes"] <= 4096
+    assert stats["evictions"] > 0
+    # The most recently written entry survives.
+    assert store.get(5009) == fib_pair(5009)
+
+
+def test_fibonacci_with_store_counts_hits_and_misses(tmp_path):
+    store = CheckpointStore(tmp_path)
+    n = (1 << 14) + 100
+    assert fibonacci(n, store) == fibonacci(n)
+    assert fibonacci(n, store) == fibonacci(n)
+    # Close above a cached index, the computation starts from the checkpoint.
+    assert fibonacci(n + 7, store) == fibonacci(n + 7)
+    stats = store.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_store_is_shared_across_processes(tmp_path):
+    n = (1 << 13) + 3
+    store = CheckpointStore(tmp_path)
+    assert store.stats()["entries"] == 0
+    process = multiprocessing.get_context("spawn").Process(target=_compute_in_child, args=(tmp_path, n))
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    # The index notices the other process's checkpoints.
+    assert store.nearest(n) == (1 << 13, fib_pair(1 << 13))
+
+
+def test_only_stride_multiples_are_stored(tmp_path):
+    store = CheckpointStore(tmp_path)
+    for n in range(40_000, 40_050):
+        assert fibonacci(n, store) == fibonacci(n)
+    # 36864 = 9 * 4096, with the powers of two it was doubled up from.
+    assert sorted(int(path.name.split("-")[0], 16) for path in tmp_path.glob("*.ckpt")) == [
+        1 << 12, 1 << 13, 1 << 14, 1 << 15, 36864]
+    assert store.stats()["hits"] == 49
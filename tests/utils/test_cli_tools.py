@@ -0,0 +1,122 @@
+import asyncio
+import graphlib
+
+import pytest
+import typer
+
+from dspyfun.utils import cli_tools
+from dspyfun.utils.cli_tools import (Step, parse_targets, run_command, run_steps, run_targets, stream_command,
+                                     tee_terminal)
+
+
+def test_stream_command_keeps_a_bounded_tail(capsys):
+    command = "for i in $(seq 1 50); do echo out$i; echo err$i >&2; done"
+    result = asyncio.run(stream_command(command, tail_lines=3))
+    assert result.returncode == 0
+    assert result.stdout_tail == ["out48", "out49", "out50"]
+    assert result.stderr_tail == ["err48", "err49", "err50"]
+    # Everything was still streamed live.
+    captured = capsys.readouterr()
+    assert "out1\n" in captured.out
+    assert "err1\n" in captured.err
+
+
+def test_stream_command_echoes_partial_lines_and_keeps_long_ones(capsys):
+    command = "printf 'Enter key: '; sleep 0.2; printf '%05000d\\n' 7; echo done"
+    result = asyncio.run(stream_command(command, prefix="[x] "))
+    assert result.stdout_tail == ["Enter key: " + "0" * (cli_tools.TAIL_LINE_CHARS - 11), "done"]
+    assert capsys.readouterr().out == "[x] Enter key: " + "0" * 4999 + "7\n[x] done\n"
+
+
+def test_tee_terminal_gives_the_command_a_terminal(capsysbinary):
+    result = tee_terminal("test -t 1 && test -t 2 && printf 'Enter key: ' && echo tty >&2")
+    assert result.returncode == 0
+    assert result.stdout_tail == ["Enter key: tty"]
+    assert capsysbinary.readouterr().out == b"Enter key: tty\n"
+
+
+def test_run_command_diagnoses_with_the_output_tail(monkeypatch):
+    diagnosed = []
+    monkeypatch.setattr(cli_tools, "diagnose_error", diagnosed.append)
+    with pytest.raises(SystemExit):
+        run_command("echo starting; echo 'permission denied' >&2; exit 2")
+    assert "Exit code: 2" in diagnosed[0]
+    assert "Duration: " in diagnosed[0]
+    assert "permission denied" in diagnosed[0]
+
+
+def meet(directory, name, other):
+    """A command that marks ``name`` as started and then waits for ``other`` to start.
+
+    It gives up and fails after 10 seconds, so it only succeeds when both run at the same time.
+    """
+    return (f"touch {directory}/{name}; for i in $(seq 1000); do "
+            f"if [ -e {directory}/{other} ]; then echo done-{name}; exit 0; fi; sleep 0.01; done; exit 1")
+
+
+def test_run_steps_runs_independent_steps_concurrently(tmp_path, capsys):
+    results = run_steps([Step("a", meet(tmp_path, "a", "b")), Step("b", meet(tmp_path, "b", "a"))], concurrency=2)
+    assert [result.status for result in results] == ["ok", "ok"]
+    output = capsys.readouterr().out
+    assert "[a] done-a" in output
+    assert "[b] done-b" in output
+
+
+def test_run_steps_respects_dependencies(tmp_path):
+    log = tmp_path / "log"
+    run_steps([
+        Step("second", f"echo second >> {log}", after=("first",)),
+        Step("first", f"sleep 0.1; echo first >> {log}"),
+    ])
+    assert log.read_text().split() == ["first", "second"]
+
+
+def test_run_steps_stops_after_a_failure(monkeypatch):
+    diagnosed = []
+    monkeypatch.setattr(cli_tools, "diagnose_error", diagnosed.append)
+    with pytest.raises(SystemExit):
+        run_steps([Step("broken", "exit 3"), Step("after", "echo never", after=("broken",))])
+    assert "Exit code: 3" in diagnosed[0]
+
+
+def test_run_steps_reports_every_failed_step(monkeypatch, capsys):
+    diagnosed = []
+    monkeypatch.setattr(cli_tools, "diagnose_error", diagnosed.append)
+    with pytest.raises(SystemExit):
+        run_steps([Step("a", "exit 3"), Step("b", "true"), Step("c", "echo boom >&2; exit 4")], concurrency=3)
+    assert [("Exit code: 3" in diagnosed[0]), ("boom" in diagnosed[1])] == [True, True]
+    assert "2 of 3 steps failed" in capsys.readouterr().out
+
+
+def test_run_steps_without_steps():
+    assert run_steps([]) == []
+
+
+def test_run_steps_rejects_cycles():
+    with pytest.raises(graphlib.CycleError):
+        run_steps([Step("a", "true", after=("b",)), Step("b", "true", after=("a",))])
+
+
+def test_parse_targets_fills_in_defaults(tmp_path):
+    targets_file = tmp_path / "targets"
+    targets_file.write_text("b:europe-west1-b  # comment\n\nc:zone:project\n")
+    assert parse_targets(["a"], targets_file, ("name", "us-central1", "proj")) == [
+        ("a", "us-central1", "proj"), ("b", "europe-west1-b", "proj"), ("c", "zone", "project")]
+    with pytest.raises(typer.BadParameter):
+        parse_targets(["a:b:c:d"], None, ("name", "zone", "proj"))
+
+
+def test_run_targets_runs_targets_concurrently(tmp_path):
+    results = run_targets({"a": [meet(tmp_path, "a", "b"), "true"], "b": [meet(tmp_path, "b", "a")]}, concurrency=2)
+    assert [result.status for result in results] == ["ok", "ok"]
+
+
+def test_run_targets_reports_every_failure_at_the_end(monkeypatch, capsys):
+    diagnosed = []
+    monkeypatch.setattr(cli_tools, "diagnose_error", diagnosed.append)
+    with pytest.raises(SystemExit):
+        run_targets({"a": ["exit 3", "echo never"], "b": ["true"], "c": ["echo boom >&2; exit 4"]})
+    assert [("Exit code: 3" in diagnosed[0]), ("boom" in diagnosed[1])] == [True, True]
+    output = capsys.readouterr().out
+    assert "2 of 3 targets failed" in output
+    assert "never" not in output
@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+import pytest
+import yaml
+
+import dspyfun.utils.path_tools as path_tools
+from dspyfun import current_config, load_config
+from dspyfun.utils.config_tools import atomic_write, watch_config
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(path_tools, "config_dir", lambda: tmp_path)
+    path = tmp_path / "dspyfun_config.yaml"
+    path.write_text(yaml.dump({"cluster_name": "c", "zone": "z", "project_id": "p"}))
+    return path
+
+
+def test_atomic_write_replaces_file(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("old")
+    atomic_write(path, "new")
+    assert path.read_text() == "new"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_atomic_write_keeps_the_file_mode(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("old")
+    path.chmod(0o640)
+    atomic_write(path, "new")
+    assert path.stat().st_mode & 0o777 == 0o640
+
+
+def test_load_config_sees_a_same_size_save_within_the_same_mtime(config_file):
+    before = config_file.stat()
+    assert load_config().cluster_name == "c"
+    atomic_write(config_file, yaml.dump({"cluster_name": "d", "zone": "z", "project_id": "p"}))
+    os.utime(config_file, ns=(before.st_atime_ns, before.st_mtime_ns))
+    assert config_file.stat().st_size == before.st_size
+    assert load_config().cluster_name == "d"
+
+
+def test_watch_config_swaps_snapshot(config_file):
+    load_config()
+
+    async def edit_while_watching():
+        watcher = asyncio.create_task(watch_config(interval=0.01))
+        await asyncio.sleep(0.05)
+        # Another process saves a new version of the config.
+        atomic_write(config_file, yaml.dump({"cluster_name": "edited", "zone": "z", "project_id": "p",
+                                             "version": 1}))
+        # A broken edit is ignored and the last good snapshot is kept.
+        await asyncio.sleep(0.05)
+        atomic_write(config_file, "cluster_name: [")
+        await asyncio.sleep(0.05)
+        watcher.cancel()
+
+    asyncio.run(edit_while_watching())
+    assert current_config().cluster_name == "edited"
+    assert current_config().version == 1
@@ -0,0 +1,82 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from dspyfun.utils.daemon_tools import daemon_status, stop_daemon
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    path = tmp_path / "daemon.sock"
+    env = {**os.environ, "DSPYFUN_DAEMON_SOCKET": str(path), "DSPYFUN_DAEMON_HANDSHAKE_TIMEOUT": "0.5"}
+    process = subprocess.Popen([sys.executable, "-m", "dspyfun.cli", "daemon", "start", "--foreground"],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while daemon_status(path) is None:
+        assert process.poll() is None and time.monotonic() < deadline, "the daemon did not start"
+        time.sleep(0.1)
+    yield path, env
+    stop_daemon(path)
+    process.wait(timeout=30)
+
+
+def client(env, *args):
+    return subprocess.run([sys.executable, "-m", "dspyfun.utils.daemon_tools", *args],
+                          env=env, capture_output=True, text=True, timeout=60)
+
+
+def test_client_forwards_stdio_and_exit_code(daemon):
+    path, env = daemon
+    result = client(env, "helm", "install", "--help")
+    assert result.returncode == 0
+    assert "Install Helm v3" in result.stdout
+
+    result = client(env, "no-such-command")
+    assert result.returncode == 2
+    assert "No such command" in result.stderr
+
+    assert daemon_status(path)["served"] == 2
+
+
+def test_stalled_client_does_not_block_others(daemon):
+    path, env = daemon
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stalled:
+        stalled.connect(str(path))
+        # Connected, but never sends its request.
+        result = client(env, "helm", "install", "--help")
+    assert result.returncode == 0
+    assert "Install Helm v3" in result.stdout
+    assert daemon_status(path)["served"] == 1
+
+
+def test_stop_removes_socket(daemon):
+    path, env = daemon
+    assert client(env, "daemon", "stop").returncode == 0
+    deadline = time.monotonic() + 10
+    while path.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not path.exists()
+    assert daemon_status(path) is None
+
+
+def test_client_runs_in_process_without_daemon(tmp_path):
+    env = {**os.environ, "DSPYFUN_DAEMON_SOCKET": str(tmp_path / "missing.sock")}
+    result = client(env, "helm", "install", "--help")
+    assert result.returncode == 0
+    assert "Install Helm v3" in result.stdout
+
+
+def test_client_imports_only_the_standard_library():
+    code = """
+import sys
+before = set(sys.modules)
+import dspyfun.utils.daemon_tools
+print(sorted(name for name in set(sys.modules) - before
+             if name.split(".")[0] not in sys.stdlib_module_names and name.split(".")[0] != "dspyfun"))
+"""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,92 @@
+import pytest
+
+from dspyfun.utils import cache_tools, diagnosis_tools
+from dspyfun.utils.cache_tools import ResponseCache
+from dspyfun.utils.diagnosis_tools import RULE_INDEX, diagnose, error_signature, normalize_error
+
+FAILURE = """Command: gcloud container clusters create {name} --zone us-central1
+Exit code: 1
+Duration: {seconds}s
+Last 1 lines of stderr:
+ERROR: (gcloud.container.clusters.create) ResponseError: code={code}, message=Internal error {request} at {when} in /tmp/{tmp}/log"""
+
+
+def failure(**values):
+    defaults = dict(name="my-cluster", seconds="3.2", code=500, request="7f9c2ba4e88f827d61604550760585b8",
+                    when="2024-06-01T12:30:00Z", tmp="abc123")
+    return FAILURE.format(**{**defaults, **values})
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "lm_cache.sqlite3")
+    monkeypatch.setattr(cache_tools, "response_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def lm_calls(monkeypatch):
+    calls = []
+
+    def fake_ask_lm(error_message):
+        calls.append(error_message)
+        return {"diagnosis": "Transient backend error.", "recommended_commands": "Retry the command."}
+
+    monkeypatch.setattr(diagnosis_tools, "_ask_lm", fake_ask_lm)
+    return calls
+
+
+def test_signature_ignores_volatile_parts():
+    first = failure()
+    again = failure(seconds="9.9", request="0c1d2e3f4a5b6c7d8e9f00112233aabb", when="2024-06-02T08:00:01Z",
+                    tmp="zzz999", code=503)
+    assert error_signature(first) == error_signature(again)
+    assert error_signature(first) != error_signature(failure(name="other-cluster"))
+    assert "<n>" in normalize_error(first)
+
+
+def test_known_failure_is_answered_by_a_rule(lm_calls):
+    diagnosis = diagnose("Command: aws eks list-clusters --profile dev\nExit code: 253\n"
+                         "Last 1 lines of stderr:\nUnable to locate credentials. You can configure credentials "
+                         "by running \"aws configure\".")
+    assert diagnosis.source == "rule"
+    assert "aws configure" in diagnosis.recommended_commands
+    assert lm_calls == []
+
+
+def test_rules_only_apply_to_their_tool(cache, lm_calls):
+    diagnosis = diagnose("Command: terraform apply\nExit code: 1\nLast 1 lines of stderr:\n"
+                         "Unable to locate credentials")
+    assert diagnosis.source == "lm"
+
+
+
+@pytest.mark.parametrize("command, output, diagnosis", [
+    ("aws ec2 describe-instances", "An error occurred (ExpiredToken) when calling the DescribeInstances "
+     "operation: The security token included in the request is expired", "The AWS session token has expired."),
+    ("gcloud compute instances create vm", "ERROR: (gcloud.compute.instances.create) Could not fetch resource:\n"
+     " - Quota 'CPUS' exceeded.  Limit: 24.0 in region us-central1.", "A quota for the project or region is exhausted."),
+    ("helm install app ./chart", "/bin/sh: 1: helm: not found", "Helm is not installed or not on PATH."),
+])
+def test_rules_match_the_tools_error_messages(command, output, diagnosis):
+    assert RULE_INDEX.match(f"Command: {command}\nExit code: 1\n{output}").diagnosis == diagnosis
+
+
+@pytest.mark.parametrize("command, output", [
+    ("aws s3 ls s3://bucket", "2024-06-01 12:30:00 expired-sessions/\nAn error occurred (NoSuchBucket) when "
+     "calling the ListObjectsV2 operation: The specified bucket does not exist"),
+    ("gcloud compute regions describe us-central1", "ERROR: (gcloud.compute.regions.describe) Could not fetch "
+     "resource:\n - Invalid value for field 'region'. quota: 24, usage: 3"),
+    ("kubectl get secrets", "NAME TYPE DATA\ntls-expired kubernetes.io/tls 2\n"
+     "error: the server doesn't have a resource type \"secretz\""),
+])
+def test_rules_ignore_their_words_in_unrelated_output(command, output):
+    assert RULE_INDEX.match(f"Command: {command}\nExit code: 1\n{output}") is None
+
+
+def test_recurring_failure_is_answered_from_the_cache(cache, lm_calls):
+    assert diagnose(failure()).source == "lm"
+    repeat = diagnose(failure(request="00000000000000000000000000000000", when="2025-01-01T00:00:00Z"))
+    assert repeat.source == "cache"
+    assert repeat.diagnosis == "Transient backend error."
+    assert len(lm_calls) == 1
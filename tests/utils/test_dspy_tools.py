@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import dspy
+import pytest
+
+from dspyfun.cli import close_lms
+from dspyfun.mock_lm import serve_in_thread
+from dspyfun.utils.dspy_tools import LMPool, LMRegistry, SessionOllamaLocal, init_ol, lm_registry
+
+
+@pytest.fixture
+def registry():
+    registry = LMRegistry()
+    yield registry
+    registry.close()
+
+
+def test_registry_shares_one_client_per_key(registry):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        lms = set(pool.map(lambda _: registry.get(dspy.OllamaLocal, "phi3:instruct", 800, 10), range(32)))
+    assert len(lms) == 1
+    assert isinstance(lms.pop(), SessionOllamaLocal)
+    assert registry.get(dspy.OllamaLocal, "phi3:instruct", 800, 30) is not registry.get(
+        dspy.OllamaLocal, "phi3:instruct", 800, 10)
+    assert len(registry) == 2
+
+
+def test_close_forgets_clients(registry):
+    lm = registry.get(dspy.OllamaLocal, "phi3:instruct", 800)
+    registry.close()
+    assert len(registry) == 0
+    assert registry.get(dspy.OllamaLocal, "phi3:instruct", 800) is not lm
+
+
+def test_init_ol_reuses_the_client_until_the_cli_closes_it():
+    with serve_in_thread() as base_url:
+        lm = init_ol(model="registry-mock")
+        lm.base_url = base_url
+        assert init_ol(model="registry-mock") is lm
+        assert dspy.settings.lm is lm
+        lm("What is the 42nd Fibonacci number?")
+        lm("What is the 43rd Fibonacci number?")
+        close_lms()
+    assert len(lm_registry) == 0
+
+
+def test_long_lived_clients_keep_a_bounded_history(registry):
+    lm = registry.get(dspy.OllamaLocal, "history-mock", 800)
+    with serve_in_thread() as base_url:
+        lm.base_url = base_url
+        lm.history.size = 3
+        for n in range(5):
+            lm(f"What is the {n}th Fibonacci number?")
+    assert [entry["prompt"] for entry in lm.history] == [f"What is the {n}th Fibonacci number?" for n in (2, 3, 4)]
+    # dspy slices the history to show it.
+    lm.inspect_history()
+
+
+class ClosableLM:
+    history: list = []
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_close_does_not_wait_for_borrowed_clients():
+    pool = LMPool(ClosableLM, size=2)
+    with pool.borrow() as borrowed:
+        pool.close()
+        assert pool._idle.empty() and not borrowed.closed
+    assert borrowed.closed
@@ -0,0 +1,35 @@
+import pytest
+
+from dspyfun.utils.fib_tools import fib_pair, fib_sweep, fibonacci
+
+
+def naive_fibonacci(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 10, 63, 64, 65, 1000, 4097])
+def test_fibonacci_matches_naive(n):
+    assert fibonacci(n) == naive_fibonacci(n)
+
+
+def test_fib_pair():
+    assert fib_pair(0) == (0, 1)
+    assert fib_pair(100) == (naive_fibonacci(100), naive_fibonacci(101))
+
+
+def test_fibonacci_large_n_does_not_recurse():
+    # The old memoized recursion blew the recursion limit long before this.
+    assert fibonacci(100_000) % 10 == naive_fibonacci(100_000) % 10
+
+
+def test_fibonacci_negative():
+    with pytest.raises(ValueError):
+        fibonacci(-1)
+
+
+def test_fib_sweep_matches_fibonacci():
+    ns = [5000, 3, 5001, 0, 20000, 5000, 100_000]
+    assert list(fib_sweep(ns)) == [(n, fibonacci(n)) for n in sorted(ns)]
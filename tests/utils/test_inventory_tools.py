@@ -0,0 +1,87 @@
+import json
+import time
+
+import pytest
+
+from dspyfun.utils import inventory_tools
+from dspyfun.utils.inventory_tools import inventory_dir, listing, read_cached
+
+
+@pytest.fixture(autouse=True)
+def inventory(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(inventory_tools, "LISTINGS", {"projects": "printf 'alpha\\n\\nbeta\\n'"})
+
+
+def test_listing_is_fetched_once_and_then_served_from_cache(monkeypatch):
+    assert listing("projects") == ["alpha", "beta"]
+    monkeypatch.setitem(inventory_tools.LISTINGS, "projects", "exit 1")
+    assert listing("projects") == ["alpha", "beta"]
+
+
+def test_refresh_fetches_even_when_cached(monkeypatch):
+    listing("projects")
+    monkeypatch.setitem(inventory_tools.LISTINGS, "projects", "echo gamma")
+    assert listing("projects", refresh=True) == ["gamma"]
+    assert read_cached("projects")[1] == ["gamma"]
+
+
+def test_stale_listing_is_served_and_refreshed_in_background(monkeypatch):
+    listing("projects")
+    path = inventory_dir() / "projects.json"
+    entry = json.loads(path.read_text())
+    path.write_text(json.dumps({**entry, "fetched_at": time.time() - 3600}))
+    monkeypatch.setitem(inventory_tools.LISTINGS, "projects", "echo gamma")
+
+    assert listing("projects", ttl=60) == ["alpha", "beta"]
+
+    deadline = time.monotonic() + 30
+    while read_cached("projects")[1] != ["gamma"]:
+        assert time.monotonic() < deadline, "the background refresh did not update the cache"
+        time.sleep(0.05)
+    deadline = time.monotonic() + 30
+    while (inventory_dir() / "projects.refreshing").exists():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_running_refresh_is_not_started_twice():
+    inventory_dir().mkdir(parents=True)
+    (inventory_dir() / "projects.refreshing").touch()
+    assert not inventory_tools.refresh_in_background("projects")
+
+
+def test_failed_fetch_is_diagnosed_and_exits(monkeypatch):
+    from dspyfun.utils import cli_tools
+
+    diagnosed = []
+    monkeypatch.setattr(cli_tools, "diagnose_error", diagnosed.append)
+    monkeypatch.setitem(inventory_tools.LISTINGS, "projects", "echo 'not logged in' >&2; exit 1")
+    with pytest.raises(SystemExit):
+        listing("projects")
+    assert "Exit code: 1" in diagnosed[0]
+    assert "not logged in" in diagnosed[0]
+
+
+def test_listings_are_cached_per_gcloud_account(tmp_path, monkeypatch):
+    monkeypatch.setitem(inventory_tools.SCOPES, "projects", inventory_tools.gcloud_scope)
+    monkeypatch.setenv("CLOUDSDK_CONFIG", str(tmp_path / "gcloud"))
+    monkeypatch.setenv("CLOUDSDK_CORE_ACCOUNT", "alice@example.com")
+    assert listing("projects") == ["alpha", "beta"]
+
+    monkeypatch.setitem(inventory_tools.LISTINGS, "projects", "echo gamma")
+    monkeypatch.setenv("CLOUDSDK_CORE_ACCOUNT", "bob@example.com")
+    assert listing("projects") == ["gamma"]
+    monkeypatch.setenv("CLOUDSDK_CORE_ACCOUNT", "alice@example.com")
+    assert listing("projects") == ["alpha", "beta"]
+
+
+def test_gcloud_scope_reads_the_active_account(tmp_path, monkeypatch):
+    config_dir = tmp_path / "gcloud"
+    (config_dir / "configurations").mkdir(parents=True)
+    (config_dir / "active_config").write_text("work\n")
+    (config_dir / "configurations" / "config_work").write_text("[core]\naccount = carol@example.com\n")
+    monkeypatch.setenv("CLOUDSDK_CONFIG", str(config_dir))
+    monkeypatch.delenv("CLOUDSDK_ACTIVE_CONFIG_NAME", raising=False)
+    monkeypatch.delenv("CLOUDSDK_CORE_ACCOUNT", raising=False)
+    assert inventory_tools.gcloud_scope() == f"gcloud {config_dir} work carol@example.com"
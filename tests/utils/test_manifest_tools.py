@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+from dspyfun.utils.manifest_tools import load_manifest, manifest_path, parse_module
+
+MODULE = '''"""Demo operations."""
+import typer
+
+app = typer.Typer()
+
+
+@app.command(name="up")
+def demo_up(name: str = typer.Argument("web"), replicas: int = 1) -> None:
+    """Bring the demo up"""
+
+
+@app.command()
+def tear_down() -> None:
+    """Tear the demo down"""
+
+
+def helper():
+    pass
+'''
+
+
+@pytest.fixture
+def cmd_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    cmd_dir = tmp_path / "subcommands"
+    cmd_dir.mkdir()
+    (cmd_dir / "demo_cmd.py").write_text(MODULE)
+    return cmd_dir
+
+
+def test_parse_module(cmd_dir):
+    manifest = parse_module(cmd_dir / "demo_cmd.py")
+    assert manifest["help"] == "Demo operations."
+    assert [command["name"] for command in manifest["commands"]] == ["up", "tear-down"]
+    up = manifest["commands"][0]
+    assert up["help"] == "Bring the demo up"
+    assert up["params"] == [
+        {"name": "name", "annotation": "str", "default": "typer.Argument('web')"},
+        {"name": "replicas", "annotation": "int", "default": "1"},
+    ]
+
+
+def test_load_manifest_is_cached_until_a_module_changes(cmd_dir):
+    assert list(load_manifest(cmd_dir)) == ["demo"]
+    path = manifest_path(cmd_dir)
+    written = path.stat().st_mtime_ns
+
+    # Nothing changed, so the manifest is read back as is.
+    assert load_manifest(cmd_dir)["demo"]["help"] == "Demo operations."
+    assert path.stat().st_mtime_ns == written
+
+    module = cmd_dir / "demo_cmd.py"
+    module.write_text(MODULE.replace("Demo operations.", "Demo things."))
+    os.utime(module, ns=(written + 10**9, written + 10**9))
+    (cmd_dir / "other_cmd.py").write_text('"""Other operations."""\n')
+    manifest = load_manifest(cmd_dir)
+    assert manifest["demo"]["help"] == "Demo things."
+    assert list(manifest) == ["demo", "other"]
+    assert json.loads(path.read_text())["commands"] == manifest
+
+    module.unlink()
+    assert list(load_manifest(cmd_dir)) == ["other"]
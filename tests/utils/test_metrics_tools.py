@@ -0,0 +1,21 @@
+from prometheus_client import REGISTRY
+
+from dspyfun.mock_lm import serve_in_thread
+from dspyfun.utils.dspy_tools import SessionOllamaLocal
+from dspyfun.utils.metrics_tools import observe_lm_requests
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_observe_lm_requests_records_latency_and_tokens():
+    calls = sample("dspyfun_lm_request_duration_seconds_count", model="metrics-mock")
+    completion_tokens = sample("dspyfun_lm_tokens_total", model="metrics-mock", kind="completion")
+    with serve_in_thread() as base_url:
+        lm = observe_lm_requests(SessionOllamaLocal(model="metrics-mock", base_url=base_url))
+        lm("What is the 42nd Fibonacci number?")
+    assert sample("dspyfun_lm_request_duration_seconds_count", model="metrics-mock") == calls + 1
+    # The mock answers with two whitespace-delimited tokens.
+    assert sample("dspyfun_lm_tokens_total", model="metrics-mock", kind="completion") == completion_tokens + 2
+    assert sample("dspyfun_lm_tokens_total", model="metrics-mock", kind="prompt") > 0
@@ -0,0 +1,69 @@
+import os
+
+import dspy
+import pytest
+
+from dspyfun.mock_lm import serve_in_thread
+from dspyfun.modules.cypher_module import CypherModule
+from dspyfun.utils import cache_tools
+from dspyfun.utils.cache_tools import ResponseCache
+from dspyfun.utils.program_tools import clear_programs, compiled_program, load_program, save_program
+
+
+@pytest.fixture(autouse=True)
+def programs_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DSPYFUN_PROGRAMS_DIR", str(tmp_path / "programs"))
+    clear_programs()
+    yield tmp_path / "programs"
+    clear_programs()
+
+
+def optimized() -> CypherModule:
+    program = CypherModule()
+    program.convert.demos = [dspy.Example(text="Alice knows Bob", cypher_language="cypher",
+                                          valid_cypher_text="CREATE (:Person {name: 'Alice'})-[:KNOWS]->(:Person {name: 'Bob'})")]
+    program.convert.signature = program.convert.signature.with_instructions("Write Cypher for the text.")
+    return program
+
+
+def test_saved_demos_and_instructions_are_loaded(programs_dir):
+    path = save_program(optimized())
+    assert path == programs_dir / "CypherModule.json"
+
+    convert = load_program(CypherModule).convert
+    assert [dict(demo) for demo in convert.demos] == [dict(demo) for demo in optimized().convert.demos]
+    assert convert.signature.instructions == "Write Cypher for the text."
+    assert convert.extended_signature.instructions == "Write Cypher for the text."
+    assert load_program(CypherModule, name="other").convert.demos == []
+
+
+def test_compiled_program_is_shared_until_the_file_changes():
+    first = compiled_program(CypherModule)
+    assert compiled_program(CypherModule) is first
+    assert first.convert.demos == []
+
+    path = save_program(optimized())
+    reloaded = compiled_program(CypherModule)
+    assert reloaded is not first and len(reloaded.convert.demos) == 1
+    assert compiled_program(CypherModule) is reloaded
+
+    # A save of the same size within the same mtime tick is still picked up.
+    saved = path.stat()
+    save_program(optimized())
+    os.utime(path, ns=(saved.st_atime_ns, saved.st_mtime_ns))
+    assert compiled_program(CypherModule) is not reloaded
+
+
+def test_compiled_program_prompts_with_its_demos(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "lm_cache.sqlite3")
+    monkeypatch.setattr(cache_tools, "response_cache", lambda: cache)
+    save_program(optimized())
+    with serve_in_thread() as base_url:
+        lm = dspy.OllamaLocal(model="mock", base_url=base_url)
+        with dspy.context(lm=lm):
+            CypherModule()(text="Meet me at the park")
+            plain = lm.history[-1]["prompt"]
+            compiled_program(CypherModule)(text="Meet me at the park")
+            compiled = lm.history[-1]["prompt"]
+    assert "Alice knows Bob" not in plain
+    assert "Alice knows Bob" in compiled and "Write Cypher for the text." in compiled
@@ -0,0 +1,64 @@
+import dspy
+import pytest
+
+from dspyfun.mock_lm import serve_in_thread
+from dspyfun.utils import cache_tools, trace_tools
+from dspyfun.utils.cache_tools import ResponseCache, cached_predict
+from dspyfun.utils.dspy_tools import SessionOllamaLocal, instrument
+from dspyfun.utils.trace_tools import disable_tracing, enable_tracing, read_trace, summarize, tracer
+
+
+class Answer(dspy.Signature):
+    question = dspy.InputField()
+    answer = dspy.OutputField()
+
+
+@pytest.fixture
+def traced_lm(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "lm_cache.sqlite3")
+    monkeypatch.setattr(cache_tools, "response_cache", lambda: cache)
+    with serve_in_thread() as base_url:
+        lm = instrument(SessionOllamaLocal(model="trace-mock", base_url=base_url))
+        with dspy.context(lm=lm):
+            yield lm
+    disable_tracing()
+
+
+@pytest.mark.parametrize("name", ["trace.jsonl", "trace.json"])
+def test_records_every_request_and_cache_hit(traced_lm, tmp_path, name):
+    path = tmp_path / name
+    enable_tracing(path)
+    cached_predict(dspy.Predict(Answer), question="What is F(42)?")
+    cached_predict(dspy.Predict(Answer), question="What is F(42)?")
+    dspy.Predict("question -> answer")(question="What is F(43)?")
+    traced_lm("Hello")
+    disable_tracing()
+
+    miss, hit, inline, bare = read_trace(path)
+    assert (miss["name"], miss["model"], miss["cache"]) == ("Answer", "trace-mock", "miss")
+    assert miss["prompt_tokens"] > 0 and miss["completion_tokens"] > 0
+    assert miss["queue_s"] >= 0 and miss["wall_s"] > 0
+    assert (hit["name"], hit["cache"], hit["prompt_tokens"]) == ("Answer", "hit", 0)
+    assert (inline["name"], inline["cache"]) == ("question -> answer", "off")
+    assert bare["name"] == "lm"
+
+    totals = {total["name"]: total for total in summarize(read_trace(path))}
+    assert (totals["Answer"]["calls"], totals["Answer"]["cache_hits"]) == (2, 1)
+
+
+def test_nothing_is_recorded_without_tracing(traced_lm, tmp_path):
+    traced_lm("Hello")
+    assert list(tmp_path.glob("trace*")) == []
+
+
+def test_trace_env_is_read_once(traced_lm, tmp_path, monkeypatch):
+    monkeypatch.setattr(trace_tools, "_trace_path", str(tmp_path / "trace.jsonl"))
+    active = tracer()
+    assert active is not None and tracer() is active
+    traced_lm("Hello")
+    disable_tracing()
+    # Stopping the tracer does not restart it from DSPYFUN_TRACE, and the variable is not read again.
+    monkeypatch.setenv("DSPYFUN_TRACE", str(tmp_path / "other.jsonl"))
+    assert tracer() is None
+    assert [record["name"] for record in read_trace(tmp_path / "trace.jsonl")] == ["lm"]
+    assert not (tmp_path / "other.jsonl").exists()